@@ -1,10 +1,154 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPageNumberPagination(pagination.PageNumberPagination):
     """
     Custom pagination class that extends PageNumberPagination.
     """
-    page_size = 20 
-    page_size_query_param = 'page_size' 
-    max_page_size = 100 
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(CustomPageNumberPagination):
+    """
+    Page numbers by default, and keyset pagination when the request has a `cursor`
+    parameter, empty for the first page.
+
+    A keyset page filters on the ordering values of the last row of the previous
+    page instead of counting and skipping the rows before it, so every page reads
+    only its own rows, served by the index of the ordering. The keys are the
+    ordering of the queryset followed by the primary key to break ties, like
+    `(-rating, rd, id)`, and must not be null. The total is only counted with
+    `count=true`.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor.'
+    #: Whether a request without a cursor gets page numbers or the whole list.
+    page_numbers = True
+    #: Whether a request without a cursor gets the first keyset page.
+    keyset_only = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_only or self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view) if self.page_numbers else None
+
+        self.request = request
+        position, reverse = self.decode_cursor(request.query_params.get(self.cursor_query_param, ''))
+        queryset, keys, descending = self.get_keys(queryset)
+        if position is not None and len(position) != len(keys):
+            raise NotFound(self.invalid_cursor_message)
+
+        self.count = queryset.count() if request.query_params.get(self.count_query_param) in ('1', 'true') else None
+        if reverse:
+            descending = [not desc for desc in descending]
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.after(keys, descending, position))
+            except (ValueError, TypeError, ValidationError):
+                # A decodable cursor whose values do not fit the fields of the keys.
+                raise NotFound(self.invalid_cursor_message)
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset.order_by(*(f'-{key}' if desc else key for key, desc in zip(keys, descending)))[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next, has_previous = (position is not None, has_more) if reverse else (has_more, position is not None)
+        self.next_position = self.get_position(rows[-1], keys) if rows and has_next else None
+        self.previous_position = self.get_position(rows[0], keys) if rows and has_previous else None
+        return rows
+
+    @staticmethod
+    def get_position(row, keys: list[str]) -> list:
+        """Return the values of `keys` of a model instance, or of a dict of a `values()` queryset."""
+        return [row[key] for key in keys] if isinstance(row, dict) else [getattr(row, key) for key in keys]
+
+    def get_keys(self, queryset):
+        """Return the queryset with its ordering paths annotated, the keys and whether each one is descending."""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        pk = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in (pk, 'pk') for field in ordering):
+            ordering.append(f'-{pk}' if ordering and ordering[-1].startswith('-') else pk)
+
+        keys, descending, annotations = [], [], {}
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            # The values of related fields are read from the rows as annotations.
+            key = f'keyset_{index}' if '__' in name else pk if name == 'pk' else name
+            if key != name and key != pk:
+                annotations[key] = F(name)
+            keys.append(key)
+            descending.append(field.startswith('-'))
+        return queryset.annotate(**annotations), keys, descending
+
+    @staticmethod
+    def after(keys: list[str], descending: list[bool], position: list) -> Q:
+        """Return the filter of the rows after `position` in the ordering of `keys`."""
+        condition = None
+        for key, desc, value in reversed(list(zip(keys, descending, position))):
+            after = Q(**{f'{key}__{"lt" if desc else "gt"}': value})
+            condition = after if condition is None else after | (Q(**{key: value}) & condition)
+        # Bounding the first key as well lets the database start the scan at the position.
+        return Q(**{f'{keys[0]}__{"lte" if descending[0] else "gte"}': position[0]}) & condition
+
+    def encode_cursor(self, position: list, reverse: bool) -> str:
+        cursor = json.dumps({'p': position, 'r': reverse}, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> tuple[list | None, bool]:
+        if not cursor:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return list(cursor['p']), bool(cursor['r'])
+        except (ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_cursor_link(self, position: list | None, reverse: bool) -> str | None:
+        if position is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        response = {
+            'next': self.get_cursor_link(self.next_position, False),
+            'previous': self.get_cursor_link(self.previous_position, True),
+            'results': data,
+        }
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+
+class MatchHistoryPagination(KeysetPagination):
+    """
+    Keyset pages of matches, ordered by tournament date and round. Without a
+    cursor the whole list is returned, as before the pagination.
+    """
+    page_numbers = False
+
+
+class CompactMatchPagination(KeysetPagination):
+    """
+    Keyset pages of compact match rows, the first one without a cursor.
+    """
+    page_size = 50
+    keyset_only = True
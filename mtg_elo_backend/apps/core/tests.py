@@ -1,3 +1,242 @@
+import base64
+import json
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.leagues.models import League, LeaguePlayer
+from apps.players.models import Player
+from apps.tournaments.models import Match, Tournament, TournamentPlayer
+from apps.users.models import CustomUser
+from services.glicko2_service import Glicko2Service
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Call every route of the API on a small and on a bigger dataset, and check that
+    the number of SQL queries of each route does not grow with the data.
+    """
+    APPS = ('auth/', 'users/', 'leagues/', 'players/', 'tournaments/')
+    PASSWORD = 'budget-password'
+
+    def build_dataset(self, scale: int) -> dict:
+        """Rate `2 * scale` events of a league, each one with `8 * scale` players and 3 Swiss rounds."""
+        rng = random.Random(scale)
+        league = League.objects.create(name=f'Budget {scale}')
+        names = [f'Budget {scale} {i}' for i in range(12 * scale)]
+        for event in range(2 * scale):
+            entrants = rng.sample(names, 8 * scale)
+            matches = []
+            for _ in range(3):
+                rng.shuffle(entrants)
+                matches += [(p1, p2, rng.choice([[1, 1, None], [1, -1, 1], [-1, -1, None], [1, 0, 0]])) for p1, p2 in zip(entrants[0::2], entrants[1::2])]
+            Glicko2Service().rate_league_event(matches, league, date=(date(2025, 1, 1) + timedelta(weeks=event)).isoformat())
+
+        user = CustomUser.objects.create_user(username=f'budget{scale}', password=self.PASSWORD)
+        player = Player.objects.get(name=names[0])
+        player.user = user
+        player.save()
+        tournament = Tournament.objects.filter(league=league).order_by('-date').first()
+        match = tournament.rounds.first().matches.first() # type: ignore
+        return {
+            'scale': scale,
+            'user': user,
+            'league': league,
+            'player': player,
+            'players': list(Player.objects.filter(name__in=names[:5]).values_list('id', flat=True)),
+            'tournament': tournament,
+            'match': match,
+            'tournament_player': tournament.ratings.first(), # type: ignore
+            'league_player': league.players.first(), # type: ignore
+        }
+
+    def get_routes(self, data: dict) -> list[tuple[str, str, str, dict]]:
+        """Return `(label, method, url, body)` for every route of the API."""
+        player, tournament, league = data['player'].id, data['tournament'].id, data['league'].id
+        username = data['user'].username
+        refresh = RefreshToken.for_user(data['user']) if data['user'].pk else RefreshToken()
+        return [
+            ('login', 'post', '/auth/', {'username': username, 'password': self.PASSWORD}),
+            ('logout', 'post', '/auth/logout/', {}),
+            ('token refresh', 'post', '/auth/refresh/', {'refresh': str(refresh)}),
+            ('2fa enable', 'get', '/auth/2fa/enable/', {}),
+            ('2fa verify', 'post', '/auth/2fa/verify/', {'username': username, 'code': '000000'}),
+            ('me', 'post', '/auth/me/', {'token': str(refresh.access_token)}),
+            ('2fa disable', 'post', '/auth/2fa/disable/', {}),
+            ('change password', 'post', '/auth/change-password/', {}),
+            ('register', 'post', '/users/register/', {'username': f'new{username}', 'password': self.PASSWORD}),
+            ('user profile', 'get', f'/users/profile/{username}/', {}),
+            ('leagues', 'get', '/leagues/', {}),
+            ('league', 'get', f'/leagues/{league}/', {}),
+            ('league players', 'get', f'/leagues/{league}/players/', {}),
+            ('league player', 'get', f'/leagues/{league}/players/{data["league_player"].id}/', {}),
+            ('players', 'get', '/players/', {}),
+            ('players (cursor)', 'get', '/players/?cursor=', {}),
+            ('player', 'get', f'/players/{player}/', {}),
+            ('player matches', 'get', f'/players/{player}/matches/', {}),
+            ('player matches (cursor)', 'get', f'/players/{player}/matches/?cursor=', {}),
+            ('player history', 'get', f'/players/{player}/history/', {}),
+            ('player match', 'get', f'/players/{player}/matches/{data["match"].id}/', {}),
+            ('statistics', 'get', '/players/statistics/', {}),
+            ('league statistics', 'get', f'/players/statistics/?league_id={league}', {}),
+            ('tournament statistics', 'get', f'/players/statistics/?tournament_id={tournament}', {}),
+            ('leaderboard', 'get', '/players/leaderboard/?date=2030-01-01', {}),
+            ('league leaderboard', 'get', f'/players/leaderboard/?date=2030-01-01&league_id={league}', {}),
+            ('player autocomplete', 'get', '/players/autocomplete/?q=budget', {}),
+            ('player search', 'get', '/players/?search=budget', {}),
+            ('matchups', 'get', f'/players/matchups/?player_ids={",".join(map(str, data["players"]))}', {}),
+            ('tournaments', 'get', '/tournaments/', {}),
+            ('tournament', 'get', f'/tournaments/{tournament}/', {}),
+            ('tournament matches', 'get', f'/tournaments/{tournament}/matches/', {}),
+            ('tournament match', 'get', f'/tournaments/{tournament}/matches/{data["match"].id}/', {}),
+            ('tournament players', 'get', f'/tournaments/{tournament}/players/', {}),
+            ('tournament player', 'get', f'/tournaments/{tournament}/players/{data["tournament_player"].id}/', {}),
+            ('tournament deltas', 'get', f'/tournaments/deltas/{tournament}/', {}),
+            ('tournament pairings', 'get', f'/tournaments/pairings/{tournament}/', {}),
+            ('tournament results', 'get', f'/tournaments/results/{tournament}/', {}),
+            ('tournament odds', 'get', f'/tournaments/odds/{tournament}/?simulations=100', {}),
+            ('tournament export', 'get', f'/tournaments/export/{tournament}/', {}),
+            ('end tournament', 'post', f'/tournaments/end/{tournament}/', {}),
+        ]
+
+    def count_queries(self, scale: int) -> dict[str, int]:
+        """Return the queries of every route on the dataset of `scale`, rolled back afterwards."""
+        counts = {}
+        cwd = os.getcwd()
+        with transaction.atomic(), tempfile.TemporaryDirectory() as directory:
+            data = self.build_dataset(scale)
+            client = APIClient()
+            client.force_authenticate(data['user'])
+            # The exports are written to the working directory.
+            os.makedirs(os.path.join(directory, 'exports', 'tournaments'))
+            os.chdir(directory)
+            try:
+                for label, method, url, body in self.get_routes(data):
+                    with CaptureQueriesContext(connection) as queries:
+                        response = getattr(client, method)(url, body, format='json')
+                    self.assertLess(response.status_code, 500, f'{label}: {url}')
+                    counts[label] = len(queries)
+            finally:
+                os.chdir(cwd)
+            transaction.set_rollback(True)
+        return counts
+
+    def test_queries_do_not_grow_with_the_data(self):
+        small, large = self.count_queries(1), self.count_queries(3)
+
+        grown = [f'{label}: {small[label]} -> {large[label]}' for label in small if large[label] > small[label]]
+        self.assertEqual(grown, [], 'Routes whose queries grow with the data:\n' + '\n'.join(grown))
+
+    def test_every_route_is_budgeted(self):
+        def walk(resolver, prefix=''):
+            for pattern in resolver.url_patterns:
+                route = prefix + str(pattern.pattern).removeprefix('^') if prefix else str(pattern.pattern)
+                if isinstance(pattern, URLResolver):
+                    yield from walk(pattern, route)
+                elif pattern.name != 'api-root' and 'format>' not in route:
+                    yield route
+
+        routes = {route for route in walk(get_resolver()) if route.startswith(self.APPS)}
+        data = {
+            'user': CustomUser(username='budget'), 'player': Player(id=1), 'tournament': Tournament(id=1), 'league': League(id=1),
+            'players': [1], 'match': Player(id=1), 'tournament_player': Player(id=1), 'league_player': Player(id=1),
+        }
+        budgeted = {resolve(url.split('?')[0]).route for _, _, url, _ in self.get_routes(data)}
+        self.assertEqual(routes - budgeted, set())
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        # Ties on the rating and on the RD, so the primary key has to break them.
+        Player.objects.bulk_create([Player(name=f'P{i}', rating=1500 + 10 * (i % 3), rd=50 + i % 2) for i in range(10)])
+        self.expected = list(Player.objects.order_by('-rating', 'rd', 'id').values_list('name', flat=True))
+        self.client = APIClient()
+    
+    def walk(self, url: str, link: str) -> list[list[str]]:
+        pages = []
+        while url:
+            response = self.client.get(url).json()
+            pages.append([player['name'] for player in response['results']])
+            url = response[link]
+        return pages
+    
+    def test_pages_follow_the_ordering(self):
+        # The count, the page and the rating period of the serializer.
+        with self.assertNumQueries(3):
+            response = self.client.get('/players/?cursor=&page_size=4&count=true').json()
+        self.assertEqual(response['count'], 10)
+        
+        pages = self.walk('/players/?cursor=&page_size=4', 'next')
+        self.assertEqual([len(page) for page in pages], [4, 4, 2])
+        self.assertEqual(sum(pages, []), self.expected)
+        
+        response = self.client.get('/players/?cursor=&page_size=4').json()
+        last = self.client.get(self.client.get(response['next']).json()['next']).json()
+        self.assertEqual(sum(reversed(self.walk(last['previous'], 'previous')), []), self.expected[:8])
+    
+    def test_pages_read_only_their_rows(self):
+        response = self.client.get('/players/?cursor=&page_size=4').json()
+        # The page and the rating period of the serializer, without a count.
+        with self.assertNumQueries(2):
+            self.client.get(response['next'])
+        self.assertNotIn('count', response)
+    
+    def test_page_numbers_without_a_cursor(self):
+        response = self.client.get('/players/?page_size=4').json()
+        self.assertEqual((response['count'], [player['name'] for player in response['results']]), (10, self.expected[:4]))
+        self.assertEqual(self.client.get('/players/?cursor=nonsense').status_code, 404)
+    
+    def test_tampered_cursors(self):
+        def cursor(position):
+            return base64.urlsafe_b64encode(json.dumps({'p': position, 'r': False}).encode()).decode()
+        
+        player = Player.objects.first()
+        for position in (['x', 1, 1], [{'a': 1}, 1, 1], [None, 1, 1], [1500, 50]):
+            self.assertEqual(self.client.get(f'/players/?cursor={cursor(position)}').status_code, 404, position)
+        for position in (['notadate', 1, 1], [[2025], 1, 1]):
+            self.assertEqual(self.client.get(f'/players/{player.id}/matches/?cursor={cursor(position)}').status_code, 404, position) # type: ignore
+
+
+class QueryPlanTest(TestCase):
+    """
+    Check that the listings of the API are served by their indexes. The tables of
+    the tests are tiny, so PostgreSQL is told to avoid sequential scans.
+    """
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, *indexes):
+        plan = queryset.explain()
+        for index in indexes:
+            self.assertIn(index, plan)
+
+    def test_leaderboard(self):
+        self.assertUsesIndex(Player.objects.order_by('-rating', 'rd')[:20], 'player_leaderboard_idx')
+
+    def test_player_matches(self):
+        self.assertUsesIndex(Match.objects.filter(Q(player1=1) | Q(player2=1)), 'match_player1_round_idx', 'match_player2_round_idx')
+
+    def test_player_history(self):
+        history = Match.objects.filter(participations__player=1).order_by('-participations__date', '-participations__round_number')
+        self.assertUsesIndex(history, 'participation_history_idx')
+
+    def test_tournament_matches(self):
+        self.assertUsesIndex(Match.objects.filter(round__tournament=1), 'round_tournament_number_idx')
+
+    def test_tournament_players(self):
+        self.assertUsesIndex(TournamentPlayer.objects.filter(tournament=1).order_by('-rating', 'rd')[:20], 'tplayer_tournament_rating_idx')
 
-# Create your tests here.
+    def test_league_players(self):
+        self.assertUsesIndex(LeaguePlayer.objects.filter(league=1).order_by('-rating')[:20], 'lplayer_league_rating_idx')
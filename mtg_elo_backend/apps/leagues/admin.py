@@ -2,6 +2,10 @@ from django.contrib import admin
 from .models import League, LeaguePlayer, LeagueFormat
 
 # Register your models here.
+@admin.register(LeaguePlayer)
+class LeaguePlayerAdmin(admin.ModelAdmin):
+    list_select_related = ('player', 'league')
+
+
 admin.site.register(League)
-admin.site.register(LeaguePlayer)
 admin.site.register(LeagueFormat)
\ No newline at end of file
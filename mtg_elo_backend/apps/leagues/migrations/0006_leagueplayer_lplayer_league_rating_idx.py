@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leagues', '0005_leagueplayer_last_rated_period'),
+        ('players', '0004_player_player_leaderboard_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leagueplayer',
+            index=models.Index(fields=['league', '-rating'], name='lplayer_league_rating_idx'),
+        ),
+    ]
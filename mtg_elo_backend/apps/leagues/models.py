@@ -27,6 +27,24 @@ class League(models.Model):
         help_text='The date when the league ends.'
     )
     
+    def get_or_create_league_players(self, players) -> dict[int, 'LeaguePlayer']:
+        """Return the league rows of many players keyed by player id, creating the missing ones in bulk."""
+        players = list(players)
+        league_players = {lp.player_id: lp for lp in LeaguePlayer.objects.filter(league=self, player__in=players)} # type: ignore
+        missing = [LeaguePlayer(league=self, player=p) for p in players if p.id not in league_players]
+        if missing:
+            period = self.get_current_rating_period()
+            for league_player in missing:
+                league_player.last_rated_period = period
+            LeaguePlayer.objects.bulk_create(missing)
+            league_players = {lp.player_id: lp for lp in LeaguePlayer.objects.filter(league=self, player__in=players)} # type: ignore
+        
+        return league_players
+    
+    def get_current_rating_period(self) -> int:
+        """Return the rating period of the league: the number of its tournaments already rated."""
+        return self.tournaments.filter(rating_period__isnull=False).count() # type: ignore
+    
     def __str__(self) -> str:
         return f'{self.name}'
     
@@ -47,11 +65,18 @@ class LeaguePlayer(BaseRating):
         related_name='players', help_text='The league the player is part of.'
     )
     
+    def get_current_rating_period(self) -> int:
+        return self.league.get_current_rating_period()
+    
+    def get_rating_period_key(self):
+        return (type(self), self.league_id) # type: ignore
+    
     def __str__(self) -> str:
         return f'{self.player.name} - {self.league.name}'
     
     class Meta: # type: ignore
         unique_together = ('player', 'league')
+        indexes = [models.Index(fields=['league', '-rating'], name='lplayer_league_rating_idx')]
         ordering = ['-rating', 'league__name', 'player__name']
         
         
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from apps.players.serializers import InflatedRatingMixin
 from .models import League, LeaguePlayer
 
 
@@ -10,9 +11,10 @@ class LeagueSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'start_date', 'end_date']
         
         
-class LeaguePlayerSerializer(serializers.ModelSerializer):
+class LeaguePlayerSerializer(InflatedRatingMixin, serializers.ModelSerializer):
     """Serializer for the LeaguePlayer model."""
     name = serializers.CharField(source='player.name', read_only=True)
+    last_tendency = serializers.SerializerMethodField()
 
     class Meta:
         model = LeaguePlayer
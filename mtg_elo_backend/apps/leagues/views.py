@@ -3,6 +3,7 @@ from django.shortcuts import render
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import AllowAny
 
+from apps.core.paginators import KeysetPagination
 from apps.users import permissions
 from .serializers import LeagueSerializer, LeaguePlayerSerializer
 from .models import League, LeaguePlayer
@@ -33,8 +34,9 @@ class LeagueViewSet(ModelViewSet):
 
 
 class LeaguePlayerViewSet(ModelViewSet):
-    queryset = LeaguePlayer.objects.all()
+    queryset = LeaguePlayer.objects.select_related('player')
     serializer_class = LeaguePlayerSerializer
+    pagination_class = KeysetPagination
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -51,7 +53,7 @@ class LeaguePlayerViewSet(ModelViewSet):
         if not league_id:
             return Response({"detail": "League ID is required."}, status=400)
         
-        queryset = self.queryset.filter(league__id=league_id)
+        queryset = self.queryset.filter(league__id=league_id).order_by('-rating', 'rd')
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from benchmarks import glicko2
+from benchmarks.runner import BenchmarkRunner
+import traceback
+
+class Command(BaseCommand):
+    help = 'Benchmark the rating engine on synthetic players. Everything written to the database is rolled back.'
+
+    SUITES = ('glicko2',)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suite',
+            nargs='?', choices=self.SUITES, default='glicko2',
+            help='The benchmarks to run.'
+        )
+        parser.add_argument(
+            '--sizes',
+            nargs='+', type=int,
+            help=f'The number of synthetic players, {", ".join(map(str, glicko2.SIZES))} by default.'
+        )
+        parser.add_argument(
+            '--opponents',
+            nargs='+', type=int,
+            help=f'The opponents of each player in a rating period, {", ".join(map(str, glicko2.OPPONENTS))} by default.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int, default=0,
+            help='The seed of the synthetic players and games.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int, default=3,
+            help='The timed runs of each benchmark, the best one is reported.'
+        )
+        parser.add_argument(
+            '--no-database',
+            action='store_true',
+            help='Skip the benchmarks that write to the database.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Save the results to this JSON file.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Compare the results with the ones saved in this JSON file.'
+        )
+
+    def handle(self, *args, **options):
+        runner = BenchmarkRunner(options['repeat'])
+        benchmarks = glicko2.get_benchmarks(
+            options['sizes'] or glicko2.SIZES, options['opponents'] or glicko2.OPPONENTS, options['seed'], not options['no_database'],
+        )
+
+        try:
+            baseline = runner.load(options['compare']) if options['compare'] else None
+            with transaction.atomic():
+                results = runner.run(options['suite'], benchmarks, self.report)
+                transaction.set_rollback(True)
+        except Exception as e:
+            raise CommandError(f'An error occurred while running the benchmarks: {e}\nFile: {traceback.extract_tb(e.__traceback__)[-1].filename}, Line: {traceback.extract_tb(e.__traceback__)[-1].lineno}')
+
+        if baseline is not None:
+            self.stdout.write(f'\nCompared with {baseline["commit"] or options["compare"]}:')
+            for result, speedup in runner.compare(results, baseline):
+                change = f'{speedup:.2f}x' if speedup is not None else 'new'
+                self.stdout.write(f'{self.describe(result):<50} {change:>8}')
+
+        if options['output']:
+            runner.save(results, options['output'])
+            self.stdout.write(self.style.SUCCESS(f'Saved {len(results["results"])} results to {options["output"]}.'))
+
+    def describe(self, result: dict) -> str:
+        return f'{result["name"]}[{", ".join(f"{key}={value}" for key, value in result["params"].items())}]'
+
+    def report(self, result: dict) -> None:
+        self.stdout.write(
+            f'{self.describe(result):<50} {result["ops_per_sec"]:>14,.1f} ops/s'
+            f' {result["peak_kib"]:>12,.1f} KiB peak {result["retained_kib"]:>12,.1f} KiB retained'
+        )
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from benchmarks.replay import generate_season, load_templates, write_season
+from benchmarks.runner import BenchmarkRunner
+from services.glicko2_service import Glicko2Service
+from services.profiler import RatingProfiler
+import traceback
+
+class Command(BaseCommand):
+    help = 'Time rate_all_events end to end on synthetic seasons shaped like the imported events, in a throwaway database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            nargs='+', type=int, default=[1, 4, 16],
+            help='How many times longer than the imported season each synthetic season is.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int, default=0,
+            help='The seed of the synthetic seasons.'
+        )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Rate with the vectorized engine, which rates each event as a single Glicko-2 rating period by default.'
+        )
+        parser.add_argument(
+            '--period',
+            choices=Glicko2Service.PERIOD_SIZES,
+            help='The matches rated as one Glicko-2 rating period: each match, each round or the whole event.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Save the results to this JSON file.'
+        )
+
+    def handle(self, *args, **options):
+        templates = load_templates('imports')
+        if not templates:
+            raise CommandError('No .csv files found in the imports directory.')
+
+        runner = BenchmarkRunner()
+        results = {
+            'suite': 'replay',
+            'commit': runner.get_commit(),
+            'database': connection.vendor,
+            'templates': len(templates),
+            'results': [],
+        }
+        for scale in options['scales']:
+            try:
+                result = self.run_season(generate_season(templates, scale, options['seed']), options)
+            except Exception as e:
+                raise CommandError(f'An error occurred while replaying the season: {e}\nFile: {traceback.extract_tb(e.__traceback__)[-1].filename}, Line: {traceback.extract_tb(e.__traceback__)[-1].lineno}')
+            result['scale'] = scale
+            results['results'].append(result)
+            self.stdout.write(
+                f'x{scale:<4} {result["events"]:>5} events {result["matches"]:>7} matches {result["seconds"]:>9.2f} s'
+                f' {result["events_per_sec"]:>8.2f} events/s {result["queries_per_match"]:>6.2f} queries/match'
+                f' {result["rows_per_match"]:>6.2f} rows/match'
+                f' {result["peak_mib"]:>8.1f} MiB peak'
+            )
+
+        if options['output']:
+            runner.save(results, options['output'])
+            self.stdout.write(self.style.SUCCESS(f'Saved {len(results["results"])} results to {options["output"]}.'))
+
+    def run_season(self, season: list[tuple[str, list[str]]], options: dict) -> dict:
+        """Time and profile rate_all_events on `season`, and measure the memory of one more
+        run traced by `tracemalloc`, which would slow down the timed one.
+        """
+        matches = sum(len(lines) for _, lines in season)
+        seconds, profiler = self.rate_season(season, options)
+
+        tracemalloc.start()
+        try:
+            self.rate_season(season, options)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'events': len(season),
+            'matches': matches,
+            'seconds': seconds,
+            'events_per_sec': len(season) / seconds,
+            'queries': profiler.queries,
+            'queries_per_match': profiler.queries / matches,
+            'rows': profiler.rows,
+            'rows_per_match': profiler.rows / matches,
+            'peak_mib': peak / (1024 * 1024),
+            'stages': profiler.report(),
+        }
+
+    def rate_season(self, season: list[tuple[str, list[str]]], options: dict) -> tuple[float, RatingProfiler]:
+        """Run rate_all_events on `season` in a new test database, destroyed afterwards,
+        and return its seconds and its profiler.
+        """
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                write_season(season, os.path.join(directory, 'imports'))
+                # rate_all_events reads the imports directory of the working directory.
+                cwd = os.getcwd()
+                os.chdir(directory)
+                try:
+                    with RatingProfiler() as profiler:
+                        start = time.perf_counter()
+                        call_command('rate_all_events', batch=options['batch'], period=options['period'], stdout=StringIO())
+                        return time.perf_counter() - start, profiler
+                finally:
+                    os.chdir(cwd)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
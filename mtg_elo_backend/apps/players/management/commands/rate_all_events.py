@@ -1,4 +1,5 @@
 import os
+from contextlib import nullcontext
 from datetime import datetime as dt
 
 from django.db import transaction
@@ -6,6 +7,8 @@ from django.core.management.base import BaseCommand, CommandError
 from services.import_service import ImportService
 from services.export_service import ExportService
 from services.glicko2_service import Glicko2Service
+from services.glicko2_batch_service import Glicko2BatchService
+from services.profiler import RatingProfiler, profile_stage
 from apps.leagues.models import League
 import traceback
 
@@ -13,6 +16,26 @@ class Command(BaseCommand):
     help = 'Rate all events in the /imports directory.'
     
     def add_arguments(self, parser):
+        parser.add_argument(
+            '--league',
+            default='Pauper League 2025',
+            help='The name of the league of the events, created when it does not exist.'
+        )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Rate with the vectorized engine, which rates each event as a single Glicko-2 rating period by default.'
+        )
+        parser.add_argument(
+            '--period',
+            choices=Glicko2Service.PERIOD_SIZES,
+            help='The matches rated as one Glicko-2 rating period: each match, each round or the whole event.'
+        )
+        parser.add_argument(
+            '--profile',
+            nargs='?', const='-', metavar='FILE',
+            help='Print the time, SQL queries and rows written of each stage of the rating, or save them to a JSON FILE.'
+        )
         parser.add_argument(
             '--export',
             action='store_true',
@@ -38,20 +61,25 @@ class Command(BaseCommand):
         except Exception as e:
             raise CommandError(f'An unexpected error occurred: {e}')
 
-        glicko_service = Glicko2Service()
+        glicko_service = (Glicko2BatchService if options['batch'] else Glicko2Service)(period_size=options['period'])
         
+        profiler = RatingProfiler() if options['profile'] else None
         try:
-            with transaction.atomic():
-                league = League.objects.get_or_create(name='Pauper League 2025')[0]
+            with profiler or nullcontext(), transaction.atomic():
+                league = League.objects.get_or_create(name=options['league'])[0]
                 for file_name in ordered_files:
-                    matches = import_service.import_tournament_from_csv(file_name)
+                    with profile_stage('import_csv'):
+                        matches = import_service.import_tournament_from_csv(file_name)
                     if matches:
                         glicko_service.rate_league_event(matches, league, date=file_name)
         except Exception as e:
             raise CommandError(f'An error occurred while processing the events: {e}\nFile: {traceback.extract_tb(e.__traceback__)[-1].filename}, Line: {traceback.extract_tb(e.__traceback__)[-1].lineno}')
         
+        if profiler is not None:
+            profiler.write(options['profile'], self.stdout, self.style)
+        
         if options['export']:
             try:
                 export_service.csv_export()
             except Exception as e:
-                raise CommandError(f'An error occurred while exporting the player ratings: {e}')
\ No newline at end of file
+                raise CommandError(f'An error occurred while exporting the player ratings: {e}')
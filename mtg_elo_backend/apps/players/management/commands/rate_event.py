@@ -1,10 +1,13 @@
 import os
+from contextlib import nullcontext
 
 from django.db import transaction
 from django.core.management.base import BaseCommand, CommandError
 from services.import_service import ImportService
 from services.export_service import ExportService
 from services.glicko2_service import Glicko2Service
+from services.glicko2_batch_service import Glicko2BatchService
+from services.profiler import RatingProfiler
 from services.file_service import FileService
 from apps.leagues.models import League
 import traceback
@@ -14,6 +17,26 @@ class Command(BaseCommand):
     
     def add_arguments(self, parser):
         parser.add_argument('file_name', type=str)
+        parser.add_argument(
+            '--league',
+            default='Pauper League 2025',
+            help='The name of the league of the event, created when it does not exist.'
+        )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Rate with the vectorized engine, which rates each event as a single Glicko-2 rating period by default.'
+        )
+        parser.add_argument(
+            '--period',
+            choices=Glicko2Service.PERIOD_SIZES,
+            help='The matches rated as one Glicko-2 rating period: each match, each round or the whole event.'
+        )
+        parser.add_argument(
+            '--profile',
+            nargs='?', const='-', metavar='FILE',
+            help='Print the time, SQL queries and rows written of each stage of the rating, or save them to a JSON FILE.'
+        )
         parser.add_argument(
             '--export',
             action='store_true',
@@ -33,14 +56,18 @@ class Command(BaseCommand):
         else:
             raise CommandError(f'File {file_name}.csv does not exist in the imports directory.')
         
+        profiler = RatingProfiler() if options['profile'] else None
         if matches:
             try:
-                glicko_service = Glicko2Service()
-                with transaction.atomic():
-                    league = League.objects.get_or_create(name='Pauper League 2025')[0]
+                glicko_service = (Glicko2BatchService if options['batch'] else Glicko2Service)(period_size=options['period'])
+                with profiler or nullcontext(), transaction.atomic():
+                    league = League.objects.get_or_create(name=options['league'])[0]
                     glicko_service.rate_league_event(matches, league, date=file_name)
             except Exception as e:
                 raise CommandError(f'An error occurred while rating the event: {e}\nFile: {traceback.extract_tb(e.__traceback__)[-1].filename}, Line: {traceback.extract_tb(e.__traceback__)[-1].lineno}')
+        
+        if profiler is not None:
+            profiler.write(options['profile'], self.stdout, self.style)
             
         if export_flag:
             try:
@@ -48,5 +75,3 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS(f'Exported to: {exported_file}'))
             except Exception as e:
                 raise CommandError(f'An error occurred while exporting the player ratings: {e}')
-            
-        
\ No newline at end of file
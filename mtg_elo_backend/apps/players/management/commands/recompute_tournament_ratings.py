@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.glicko2_service import Glicko2Service
+from services.glicko2_batch_service import Glicko2BatchService
+from services.tournament_scope_service import TournamentScopeService
+import traceback
+
+class Command(BaseCommand):
+    help = 'Recompute the tournament ratings of every tournament in parallel, from the matches stored in the database.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tournament_ids',
+            nargs='*', type=int,
+            help='The tournaments to recompute, every one when omitted.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='The number of worker processes, one per CPU by default.'
+        )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Rate with the vectorized engine, which rates each event as a single Glicko-2 rating period by default.'
+        )
+        parser.add_argument(
+            '--period',
+            choices=Glicko2Service.PERIOD_SIZES,
+            help='The matches rated as one Glicko-2 rating period: each match, each round or the whole event.'
+        )
+        
+    def handle(self, *args, **options):
+        glicko_service = (Glicko2BatchService if options['batch'] else Glicko2Service)(period_size=options['period'])
+        
+        try:
+            recomputed = TournamentScopeService(glicko_service, options['workers']).recompute(options['tournament_ids'] or None)
+        except Exception as e:
+            raise CommandError(f'An error occurred while recomputing the tournament ratings: {e}\nFile: {traceback.extract_tb(e.__traceback__)[-1].filename}, Line: {traceback.extract_tb(e.__traceback__)[-1].lineno}')
+        
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {recomputed["rows"]} ratings of {recomputed["tournaments"]} tournaments.'))
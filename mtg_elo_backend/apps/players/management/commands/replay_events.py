@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.export_service import ExportService
+from services.glicko2_service import Glicko2Service
+from services.glicko2_batch_service import Glicko2BatchService
+from services.replay_service import ReplayService
+import traceback
+
+class Command(BaseCommand):
+    help = 'Recompute every rating from the matches stored in the database.'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Rate with the vectorized engine, which rates each event as a single Glicko-2 rating period by default.'
+        )
+        parser.add_argument(
+            '--period',
+            choices=Glicko2Service.PERIOD_SIZES,
+            help='The matches rated as one Glicko-2 rating period: each match, each round or the whole event.'
+        )
+        parser.add_argument(
+            '--parallel-leagues',
+            action='store_true',
+            help='Replay the league ratings of each league in a worker process of its own.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='The number of worker processes of --parallel-leagues, one per CPU by default.'
+        )
+        parser.add_argument(
+            '--export',
+            action='store_true',
+            help='Export the current player ratings to a CSV file after the replay.'
+        )
+        
+    def handle(self, *args, **options):
+        glicko_service = (Glicko2BatchService if options['batch'] else Glicko2Service)(period_size=options['period'])
+        
+        try:
+            replayed = ReplayService(glicko_service).replay(options['parallel_leagues'], options['workers'])
+        except Exception as e:
+            raise CommandError(f'An error occurred while replaying the events: {e}\nFile: {traceback.extract_tb(e.__traceback__)[-1].filename}, Line: {traceback.extract_tb(e.__traceback__)[-1].lineno}')
+        
+        self.stdout.write(self.style.SUCCESS(f'Replayed {replayed["events"]} events and {replayed["matches"]} matches.'))
+        
+        if options['export']:
+            try:
+                ExportService().csv_export()
+            except Exception as e:
+                raise CommandError(f'An error occurred while exporting the player ratings: {e}')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0002_player_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='last_rated_period',
+            field=models.IntegerField(blank=True, help_text='The last rating period the RD is up to date with. The RD             inflation of the periods missed since then is applied lazily.', null=True, verbose_name='last rated period'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+from services.helper import normalize_name
+
+
+def fill_search_names(apps, schema_editor):
+    Player = apps.get_model('players', 'Player')
+    players = list(Player.objects.only('id', 'name'))
+    for player in players:
+        player.search_name = normalize_name(player.name)
+    Player.objects.bulk_update(players, ['search_name'], batch_size=1000)
+
+
+def create_trigram_index(apps, schema_editor):
+    """Index the trigrams of the search names, so substring searches skip the table scan. PostgreSQL only."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute('CREATE INDEX player_search_trgm_idx ON players_player USING gin (search_name gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS player_search_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0004_player_player_leaderboard_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='search_name',
+            field=models.CharField(default='', editable=False, help_text='The name without accents and case folded, to search players by name.', max_length=70, verbose_name='search name'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['search_name'], name='player_search_name_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -1,5 +1,8 @@
+import math
+
 from django.db import models
-from services.helper import Rating
+from services.helper import Rating, normalize_name
+from services.unit_of_work import RatingUnitOfWork
 from ..users.models import CustomUser
 
 
@@ -55,6 +58,104 @@ class BaseRating(models.Model):
         help_text='The last tendency of the player\'s rating, which indicates \
             the direction of the player\'s performance in recent matches.'
     )
+    last_rated_period = models.IntegerField(
+        'last rated period',
+        null=True, blank=True,
+        help_text='The last rating period the RD is up to date with. The RD \
+            inflation of the periods missed since then is applied lazily.'
+    )
+    
+    #: The fields recomputed when the player is rated.
+    RATING_FIELDS = ('rating', 'rd', 'sigma', 'matches_played', 'matches_won', 'matches_drawn', 'matches_lost', 'last_tendency')
+    
+    def save(self, *args, **kwargs):
+        from services.matchup_service import MatchupService
+        if self._state.adding and self.last_rated_period is None:
+            self.last_rated_period = self.get_current_rating_period()
+        super().save(*args, **kwargs)
+        MatchupService.invalidate()
+    
+    def get_current_rating_period(self) -> int | None:
+        """
+        Return the current rating period of the scope of the row, or None if
+        the scope does not inflate the RD of inactive players.
+        """
+        return None
+    
+    def get_rating_period_key(self):
+        """
+        Return a key shared by every row with the same current rating period.
+        """
+        return type(self)
+    
+    def periods_missed(self, current_period: int | None = None) -> int:
+        """
+        Return the number of rating periods missed since the row was last rated.
+        
+        :param current_period: The current rating period, queried when not given.
+        """
+        if current_period is None:
+            current_period = self.get_current_rating_period()
+        if current_period is None:
+            return 0
+        return max(0, current_period - (self.last_rated_period or 0))
+    
+    def inflated_rd(self, current_period: int | None = None) -> float:
+        """
+        Return the RD with Step 6 of Glicko-2 applied once per missed period.
+        
+        Sigma does not change in a period without games, so applying
+        phi* = sqrt(phi^2 + sigma^2) k times is phi* = sqrt(phi^2 + k * sigma^2).
+        """
+        missed = self.periods_missed(current_period)
+        if not missed:
+            return self.rd
+        return math.sqrt(self.rd ** 2 + missed * (self.sigma * Rating.RATIO) ** 2)
+    
+    def current_last_tendency(self, current_period: int | None = None) -> int:
+        """
+        Return the last tendency, which is neutral once the player missed a period.
+        """
+        if self.periods_missed(current_period):
+            return self.LastTendency.NEUTRAL
+        return self.last_tendency
+    
+    def inflate_to_period(self, period: int) -> None:
+        """
+        Write the RD inflation of the periods missed up to `period`.
+        """
+        self.rd = self.inflated_rd(period)
+        self.last_rated_period = period
+        self.save_fields('rd', 'last_rated_period')
+    
+    def set_rating_period(self, period: int) -> None:
+        """
+        Mark the row as up to date with `period`.
+        """
+        self.last_rated_period = period
+        self.save_fields('last_rated_period')
+    
+    def reset_stats(self, period: int | None = 0) -> None:
+        """
+        Set every rating field back to its default, as if the player never played.
+        """
+        for field in self.RATING_FIELDS:
+            setattr(self, field, self._meta.get_field(field).get_default())
+        self.last_rated_period = period
+        self.save_fields(*self.RATING_FIELDS, 'last_rated_period')
+    
+    def save_fields(self, *fields: str) -> None:
+        """
+        Persist the given fields, or register them in the active RatingUnitOfWork
+        to be written in bulk when it ends.
+        """
+        unit_of_work = RatingUnitOfWork.current()
+        if unit_of_work is not None:
+            unit_of_work.register(self, *fields)
+        elif self._state.adding:
+            self.save()
+        else:
+            self.save(update_fields=fields)
     
     def determine_last_tendency(self, last_rating: int):
         """
@@ -77,7 +178,7 @@ class BaseRating(models.Model):
             new_tendency = self.LastTendency.BIG_DOWN
             
         self.last_tendency = new_tendency
-        self.save()
+        self.save_fields('last_tendency')
         
     
     def update_stats(self, rating):
@@ -88,11 +189,12 @@ class BaseRating(models.Model):
         :param rd: The new Rating Deviation of the player.
         :param sigma: The new volatility of the player's rating.
         """
-        self.rating = rating.rating
+        # `rating` is an IntegerField, keep the value in memory equal to the stored one.
+        self.rating = int(rating.rating)
         self.rd = rating.rd
         self.sigma = rating.sigma
         
-        self.save()
+        self.save_fields('rating', 'rd', 'sigma')
         
     def update_matches_played(self, result: int) -> None:
         """
@@ -103,12 +205,13 @@ class BaseRating(models.Model):
         self.matches_played += 1
         if result > 0:
             self.matches_won += 1
+            self.save_fields('matches_played', 'matches_won')
         elif result < 0:
             self.matches_lost += 1
-        elif result == 0:
+            self.save_fields('matches_played', 'matches_lost')
+        else:
             self.matches_drawn += 1
-            
-        self.save()
+            self.save_fields('matches_played', 'matches_drawn')
     
     def __str__(self) -> str:
         return f'{self.name:<35}|{self.rating:^6}|{self.get_last_tendency_display():^11}|{round(self.rd, 8):^14}|{self.matches_played:^9}' # type: ignore
@@ -117,9 +220,26 @@ class BaseRating(models.Model):
         abstract = True
         ordering = ['-rating', 'rd']
 
+class PlayerQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Create the players in bulk with their normalized `search_name`."""
+        from services.player_search_service import PlayerSearchService
+        objs = list(objs)
+        for player in objs:
+            player.search_name = normalize_name(player.name)
+        players = super().bulk_create(objs, *args, **kwargs)
+        PlayerSearchService.invalidate()
+        return players
+
+
 class Player(BaseRating):
 
     name = models.CharField('name', max_length=35, null=False, unique=True)
+    search_name = models.CharField(
+        'search name',
+        max_length=70, default='', editable=False,
+        help_text='The name without accents and case folded, to search players by name.'
+    )
     user = models.OneToOneField(
         CustomUser,
         on_delete=models.CASCADE,
@@ -127,4 +247,42 @@ class Player(BaseRating):
         null=True, blank=True,
         help_text='The user associated with this player.'
     )
-    
\ No newline at end of file
+    
+    objects = PlayerQuerySet.as_manager()
+    
+    def save(self, *args, **kwargs):
+        from services.player_search_service import PlayerSearchService
+        self.search_name = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+        if update_fields is None or 'name' in update_fields:
+            PlayerSearchService.invalidate()
+    
+    @classmethod
+    def get_current_rating_period(cls) -> int:
+        """
+        Return the historic rating period: the last one in which a tournament was rated.
+        """
+        from apps.tournaments.models import Tournament
+        return Tournament.objects.aggregate(period=models.Max('rating_period'))['period'] or 0
+    
+    class Meta(BaseRating.Meta): # type: ignore
+        indexes = [
+            models.Index(fields=['-rating', 'rd'], name='player_leaderboard_idx'),
+            # Serves prefix searches on PostgreSQL, whatever the collation of the database.
+            models.Index(fields=['search_name'], name='player_search_name_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
+
+class RatingPeriodCache(dict):
+    """
+    The current rating period of each scope, so listing many rows queries it
+    once per scope instead of once per row.
+    """
+    def get_period(self, row: BaseRating) -> int | None:
+        key = row.get_rating_period_key()
+        if key not in self:
+            self[key] = row.get_current_rating_period()
+        return self[key]
@@ -1,11 +1,29 @@
 from rest_framework import serializers
-from .models import Player
+from .models import Player, RatingPeriodCache
 
 
-class PlayerSerializer(serializers.ModelSerializer):
+class InflatedRatingMixin(serializers.Serializer):
+    """
+    Serves `rd` and `last_tendency` with the periods the player missed applied,
+    since inactive players are not updated after every event.
+    """
+    def get_period(self, obj):
+        return self.context.setdefault('rating_periods', RatingPeriodCache()).get_period(obj)
+
+    def get_rd(self, obj):
+        return obj.inflated_rd(self.get_period(obj))
+
+    def get_last_tendency(self, obj):
+        return obj.current_last_tendency(self.get_period(obj))
+
+
+class PlayerSerializer(InflatedRatingMixin, serializers.ModelSerializer):
     """
     Serializer for Player model.
     """
+    rd = serializers.SerializerMethodField()
+    last_tendency = serializers.SerializerMethodField()
+
     class Meta:
         model = Player
         fields = ('id', 'name', 'rating', 'last_tendency', 'rd', 'sigma', 'matches_won', 'matches_drawn', 'matches_lost')
@@ -1,6 +1,16 @@
+from unittest import mock
+
+from django.db import transaction
 from django.test import TestCase
+import numpy as np
+from apps.leagues.models import League
 from .models import Player
 from services.glicko2_service import Glicko2Service
+from services.glicko2_batch_service import Glicko2BatchService
+from services.matchup_service import MatchupService
+from services.player_search_service import PlayerSearchService
+from services.rating_table import RatingTable
+from services.unit_of_work import RatingUnitOfWork
 from services.helper import Rating
 
 class PlaterTest(TestCase):
@@ -23,4 +33,255 @@ class PlaterTest(TestCase):
         self.assertAlmostEqual(r1.rating, 1464.06, delta=0.01)
         self.assertAlmostEqual(r1.rd, 151.52, delta=0.01)
         self.assertAlmostEqual(r1.sigma, 0.059998, delta=0.00001)
-    
\ No newline at end of file
+        
+    def test_rate_pair_matches_rate(self):
+        glicko = Glicko2Service()
+        r1 = glicko.create_rating(self.p1.name, self.p1.rating, self.p1.rd, self.p1.sigma)
+        r4 = glicko.create_rating(self.p4.name, self.p4.rating, self.p4.rd, self.p4.sigma)
+        scores = [Rating.WIN, Rating.LOSS, Rating.WIN]
+        
+        new_r1, new_r4 = glicko.rate_pair(r1, r4, scores)
+        expected_r1 = glicko.rate(r1, [(score, r4) for score in scores])
+        expected_r4 = glicko.rate(r4, [(1 - score, r1) for score in scores])
+        
+        for new, expected in ((new_r1, expected_r1), (new_r4, expected_r4)):
+            self.assertEqual(new.name, expected.name)
+            self.assertAlmostEqual(new.rating, expected.rating, delta=1e-9)
+            self.assertAlmostEqual(new.rd, expected.rd, delta=1e-9)
+            self.assertAlmostEqual(new.sigma, expected.sigma, delta=1e-12)
+
+class Glicko2BatchTest(TestCase):
+    def test_rate_period_matches_scalar_rate(self):
+        glicko = Glicko2BatchService()
+        # P1 beats P2 and loses against P3 and P4, like in `PlaterTest.test_base_case`.
+        ratings, rds, sigmas = glicko.rate_period(
+            [1500, 1400, 1550, 1700], [200, 30, 100, 300], [0.06] * 4,
+            players=[0, 1, 0, 2, 0, 3],
+            opponents=[1, 0, 2, 0, 3, 0],
+            scores=[Rating.WIN, Rating.LOSS, Rating.LOSS, Rating.WIN, Rating.LOSS, Rating.WIN],
+        )
+        
+        self.assertAlmostEqual(ratings[0], 1464.06, delta=0.01)
+        self.assertAlmostEqual(rds[0], 151.52, delta=0.01)
+        self.assertAlmostEqual(sigmas[0], 0.059998, delta=0.00001)
+        
+        r4 = glicko.rate(glicko.create_rating('P4', 1700, 300), [(Rating.WIN, glicko.create_rating('P1', 1500, 200))])
+        self.assertAlmostEqual(ratings[3], r4.rating, delta=1e-9)
+        self.assertAlmostEqual(rds[3], r4.rd, delta=1e-9)
+
+    def test_vectorized_sigma_matches_scalar_solver(self):
+        glicko = Glicko2BatchService()
+        rng = np.random.default_rng(42)
+        size = 500
+        phi = rng.uniform(0.1, 2.1, size)
+        difference = rng.normal(0, 1.5, size)
+        variance = rng.uniform(0.2, 20, size)
+        sigmas = rng.uniform(0.04, 0.09, size)
+        
+        new_sigmas, iterations = glicko.determine_sigmas(phi, difference, variance, sigmas)
+        
+        for i in range(size):
+            sigma, needed = glicko.solve_sigma(phi[i], sigmas[i], difference[i], variance[i])
+            self.assertAlmostEqual(new_sigmas[i], sigma, delta=1e-12)
+            self.assertEqual(iterations[i], needed)
+        
+        capped, capped_iterations = glicko.determine_sigmas(phi, difference, variance, sigmas, max_iterations=1)
+        np.testing.assert_allclose(capped, new_sigmas, rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(capped_iterations, iterations)
+
+
+class RatingTableTest(TestCase):
+    def test_views_share_the_table_storage(self):
+        table = RatingTable()
+        table.add(('historic', 1), 1500, 200)
+        table.add(('league', 1), 1400, 30)
+        
+        view = table[('league', 1)]
+        view.rating = 1673.7178
+        self.assertEqual(table.ratings[1], 1673.7178)
+        self.assertAlmostEqual(table.mus[1], 1.0, delta=1e-9)
+        self.assertEqual(table[('historic', 1)].sigma, Rating.SIGMA)
+        
+        glicko = Glicko2Service()
+        r1 = glicko.rate(table[('historic', 1)], [(Rating.WIN, view)])
+        self.assertEqual(r1.name, ('historic', 1))
+        self.assertGreater(r1.rating, 1500)
+
+
+
+class RatingUnitOfWorkTest(TestCase):
+    def test_changes_are_written_once_on_exit(self):
+        players = [Player.objects.create(name=f'P{i}') for i in range(3)]
+        glicko = Glicko2Service()
+        
+        with self.assertNumQueries(0):
+            unit_of_work = RatingUnitOfWork()
+            with self.assertRaises(AssertionError), unit_of_work:
+                for player in players:
+                    player.update_stats(glicko.create_rating(player.name, 1600, 100))
+                # Nothing is written when the block fails.
+                raise AssertionError()
+        
+        with self.assertNumQueries(1):
+            with RatingUnitOfWork() as unit_of_work:
+                for player in players:
+                    player.update_matches_played(1)
+                    player.update_stats(glicko.create_rating(player.name, 1600, 100))
+                    player.update_matches_played(1)
+                self.assertEqual(len(unit_of_work), 3)
+        
+        for player in Player.objects.all():
+            self.assertEqual((player.rating, player.rd, player.matches_won), (1600, 100, 2))
+
+
+class LazyInflationTest(TestCase):
+    def test_inflated_rd_matches_rating_every_missed_period(self):
+        player = Player.objects.create(name='P1', rating=1500, rd=80, last_rated_period=0)
+        glicko = Glicko2Service()
+        rating = glicko.create_rating(player.name, player.rating, player.rd, player.sigma)
+        for _ in range(3):
+            rating = glicko.rate(rating, [])
+        
+        self.assertAlmostEqual(player.inflated_rd(3), rating.rd, places=9)
+        self.assertEqual(player.current_last_tendency(3), Player.LastTendency.NEUTRAL)
+        self.assertEqual(player.inflated_rd(0), 80)
+    
+    def test_events_only_write_the_attendees(self):
+        league = League.objects.create(name='League')
+        absent = Player.objects.create(name='Absent', rating=1500, rd=80)
+        
+        for glicko in (Glicko2Service(), Glicko2BatchService()):
+            glicko.rate_league_event([('P1', 'P2', [1, 1, None])], league, date='2025-01-01')
+        absent.refresh_from_db()
+        
+        self.assertEqual((absent.rd, absent.last_rated_period), (80, 0))
+        self.assertEqual(Player.get_current_rating_period(), 2)
+        self.assertGreater(absent.inflated_rd(), 80)
+        self.assertEqual(set(Player.objects.filter(last_rated_period=2).values_list('name', flat=True)), {'P1', 'P2'})
+
+
+
+class RatingPeriodTest(TestCase):
+    EVENT = [('P0', 'P1', [1, 1, None]), ('P2', 'P3', [-1, 1, 0]), ('P0', 'P2', [-1, -1, None]), ('P1', 'P3', [1, 0, -1])]
+    
+    def _rate(self, glicko: Glicko2Service) -> list:
+        with transaction.atomic():
+            glicko.rate_league_event(self.EVENT, League.objects.create(name='League'), date='2025-01-01')
+            state = list(Player.objects.order_by('name').values_list('rating', 'rd', 'sigma'))
+            transaction.set_rollback(True)
+        return state
+    
+    def test_split_periods(self):
+        pairs = ['a', 'b', 'c']
+        
+        self.assertEqual(Glicko2Service().split_periods(pairs, [2, 1, 2]), [['a'], ['b'], ['c']])
+        self.assertEqual(Glicko2Service(period_size=Glicko2Service.PERIOD_ROUND).split_periods(pairs, [2, 1, 2]), [['b'], ['a', 'c']])
+        self.assertEqual(Glicko2Service(period_size=Glicko2Service.PERIOD_EVENT).split_periods(pairs, [2, 1, 2]), [pairs])
+        self.assertEqual(Glicko2BatchService().period_size, Glicko2Service.PERIOD_EVENT)
+        with self.assertRaises(ValueError):
+            Glicko2Service(period_size='week')
+    
+    def test_event_period_rates_each_player_once(self):
+        glicko = Glicko2Service(period_size=Glicko2Service.PERIOD_EVENT)
+        default = glicko.create_rating('P0')
+        expected = glicko.rate(default, [(Rating.WIN, default)] * 2 + [(Rating.LOSS, default)] * 2)
+        
+        rating, rd, sigma = self._rate(glicko)[0]
+        
+        self.assertEqual(rating, int(expected.rating))
+        self.assertAlmostEqual(rd, expected.rd, delta=1e-9)
+        self.assertAlmostEqual(sigma, expected.sigma, delta=1e-12)
+    
+    def test_engines_agree_on_every_period_size(self):
+        for period_size in Glicko2Service.PERIOD_SIZES:
+            expected = self._rate(Glicko2Service(period_size=period_size))
+            for (rating, rd, sigma), (batch_rating, batch_rd, batch_sigma) in zip(expected, self._rate(Glicko2BatchService(period_size=period_size))):
+                self.assertAlmostEqual(rating, batch_rating, delta=1)
+                self.assertAlmostEqual(rd, batch_rd, delta=1e-6)
+                self.assertAlmostEqual(sigma, batch_sigma, delta=1e-9)
+        
+        # Each player plays once per round, so only the event period rates them against pre-event values.
+        self.assertEqual(self._rate(Glicko2Service()), self._rate(Glicko2Service(period_size=Glicko2Service.PERIOD_ROUND)))
+        self.assertNotEqual(self._rate(Glicko2Service()), self._rate(Glicko2Service(period_size=Glicko2Service.PERIOD_EVENT)))
+
+
+
+class MatchupServiceTest(TestCase):
+    def setUp(self):
+        self.players = [
+            Player.objects.create(name=name, rating=rating, rd=rd)
+            for name, rating, rd in (('P1', 1500, 200), ('P2', 1400, 30), ('P3', 1550, 100), ('P4', 1700, 300))
+        ]
+    
+    def test_matrices_match_the_pairwise_functions(self):
+        glicko = Glicko2BatchService()
+        ids = [p.id for p in self.players]
+        
+        matrices = MatchupService(glicko).get_matrices(ids)
+        
+        self.assertEqual(matrices['player_ids'], ids)
+        for i, p1 in enumerate(self.players):
+            r1 = glicko.scale_down(glicko.create_rating(p1.name, p1.rating, p1.rd))
+            for j, p2 in enumerate(self.players):
+                r2 = glicko.scale_down(glicko.create_rating(p2.name, p2.rating, p2.rd))
+                self.assertAlmostEqual(matrices['expected_scores'][i][j], glicko.expect_score(r1, r2, glicko.reduce_impact(r2)), places=6)
+                self.assertAlmostEqual(matrices['quality'][i][j], glicko.quality_1vs1(r1, r2), places=6)
+                self.assertAlmostEqual(matrices['quality'][i][j], matrices['quality'][j][i], places=9)
+        self.assertGreater(matrices['quality'][0][2], matrices['quality'][1][3])
+    
+    def test_matrices_are_cached_by_rating(self):
+        ids = [p.id for p in self.players]
+        first = MatchupService().get_matrices(ids)
+        
+        with mock.patch.object(Glicko2BatchService, 'expected_score_matrix') as expected_score_matrix:
+            self.assertEqual(MatchupService().get_matrices(ids), first)
+        expected_score_matrix.assert_not_called()
+        # A cache hit does not read the ratings, only the current rating period.
+        with self.assertNumQueries(1):
+            MatchupService().get_matrices(ids)
+        self.players[0].rating = 1800
+        self.players[0].save()
+        self.assertNotEqual(MatchupService().get_matrices(ids)['expected_scores'][0], first['expected_scores'][0])
+        
+        league = League.objects.create(name='League')
+        self.assertEqual(MatchupService().get_matrices(ids[:2], league)['expected_scores'], [[0.5, 0.5], [0.5, 0.5]])
+        with self.assertRaises(Player.DoesNotExist):
+            MatchupService().get_matrices([*ids, 0])
+    
+    def test_matchups_endpoint_checks_the_ids(self):
+        url = f'/players/matchups/?player_ids={",".join(str(p.id) for p in self.players)}'
+        
+        for param in ('tournament_id', 'league_id'):
+            response = self.client.get(f'{url}&{param}=abc')
+            self.assertEqual((response.status_code, response.json()), (400, {'error': f'{param} must be an id'}))
+            self.assertEqual(self.client.get(f'{url}&{param}=0').status_code, 404)
+        self.assertEqual(self.client.get('/players/matchups/?player_ids=1,x').status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class PlayerSearchTest(TestCase):
+    def setUp(self):
+        Player.objects.bulk_create([
+            Player(name='José Pérez', rating=1600), Player(name='Josefina Ruiz', rating=1700),
+            Player(name='Pedro Jose', rating=1800), Player(name='Ana'),
+        ])
+        
+    def names(self, query: str) -> list[str]:
+        return [player['name'] for player in PlayerSearchService().search(query)]
+        
+    def test_autocomplete_ranks_name_prefixes_first(self):
+        self.assertEqual(self.names('JOSE'), ['Josefina Ruiz', 'José Pérez', 'Pedro Jose'])
+        self.assertEqual(self.names('josé pérez'), ['José Pérez'])
+        self.assertEqual(self.names('jo  ru'), ['Josefina Ruiz'])
+        self.assertEqual(self.names('perez'), ['José Pérez'])
+        self.assertEqual(self.names('  '), [])
+        
+    def test_index_follows_new_players(self):
+        self.assertEqual(self.names('mar'), [])
+        Player.objects.create(name='María')
+        self.assertEqual(self.names('mar'), ['María'])
+        
+    def test_list_search_folds_accents_and_case(self):
+        response = self.client.get('/players/?search=PEREZ').json()
+        self.assertEqual([player['name'] for player in response['results']], ['José Pérez'])
+        self.assertEqual(self.client.get('/players/autocomplete/?q=ana').json(), [{'id': Player.objects.get(name='Ana').id, 'name': 'Ana', 'rating': 1500}])
@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from apps.tournaments.views import MatchViewSet
-from .views import GlobalPlayerStatisticsView, PlayerViewSet
+from .views import GlobalPlayerStatisticsView, LeaderboardAsOfView, MatchupMatrixView, PlayerAutocompleteView, PlayerMatchHistoryView, PlayerViewSet
 
 router = DefaultRouter()
 router.register(r'(?P<player_id>[^/.]+)/matches', MatchViewSet, basename='player-matches')
@@ -9,5 +9,9 @@ router.register(r'', PlayerViewSet, basename='players')
 
 urlpatterns = [
     path('statistics/', GlobalPlayerStatisticsView.as_view(), name='global-player-statistics'),
+    path('leaderboard/', LeaderboardAsOfView.as_view(), name='leaderboard-as-of'),
+    path('matchups/', MatchupMatrixView.as_view(), name='matchup-matrix'),
+    path('autocomplete/', PlayerAutocompleteView.as_view(), name='player-autocomplete'),
+    path('<int:player_id>/history/', PlayerMatchHistoryView.as_view(), name='player-match-history'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
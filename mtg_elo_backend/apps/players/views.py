@@ -1,11 +1,19 @@
+from datetime import date
+
 from django.shortcuts import render
 from django.db.models import Avg, Max, Min
 from rest_framework import viewsets, generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 
-from apps.leagues.models import LeaguePlayer
-from apps.tournaments.models import Match, Tournament, TournamentPlayer
+from apps.core.paginators import CompactMatchPagination, KeysetPagination
+from apps.leagues.models import League, LeaguePlayer
+from apps.tournaments.models import Match, MatchParticipation, Tournament, TournamentPlayer
+from apps.tournaments.serializers import PlayerMatchRowSerializer, RatingSnapshotSerializer
+from services.helper import normalize_name
+from services.matchup_service import MatchupService
+from services.player_search_service import PlayerSearchService
+from services.snapshot_service import SnapshotService
 
 from .models import Player
 from .serializers import PlayerSerializer, GlobalPlayerStatisticsSerializer, FeaturedPlayerSerializer
@@ -19,6 +27,7 @@ class PlayerViewSet(viewsets.ModelViewSet):
     """
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
+    pagination_class = KeysetPagination
     
     def get_permissions(self):
         """
@@ -42,7 +51,8 @@ class PlayerViewSet(viewsets.ModelViewSet):
         
         search = request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            # On PostgreSQL the trigram index of the search name serves the substring search.
+            queryset = queryset.filter(search_name__contains=normalize_name(search))
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -124,3 +134,126 @@ class GlobalPlayerStatisticsView(generics.GenericAPIView):
 
         serializer = self.serializer_class(data)
         return Response(serializer.data)
+
+
+class LeaderboardAsOfView(generics.GenericAPIView):
+    """
+    A view for the leaderboard as it was after the tournaments played up to a date.
+    """
+    serializer_class = RatingSnapshotSerializer
+    permission_classes = [AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        """
+        Handle GET requests for the leaderboard as of a date, historic or of a league.
+        """
+        try:
+            as_of = date.fromisoformat(request.query_params.get('date', ''))
+        except ValueError:
+            return Response({'error': 'A date in YYYY-MM-DD format is required'}, status=400)
+        
+        league = None
+        league_id = request.query_params.get('league_id', None)
+        if league_id:
+            try:
+                league = League.objects.get(id=league_id)
+            except (League.DoesNotExist, ValueError):
+                return Response({'error': 'League not found'}, status=404)
+        
+        snapshot_service = SnapshotService()
+        queryset = snapshot_service.leaderboard_as_of(as_of, league)
+        context = {**self.get_serializer_context(), 'period': snapshot_service.get_period_as_of(as_of, league)}
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True, context=context)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(queryset, many=True, context=context)
+        return Response(serializer.data)
+
+
+class MatchupMatrixView(generics.GenericAPIView):
+    """
+    A view for the expected score and the quality of every matchup of a group of players.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        """
+        Handle GET requests for the matchup matrices, historic or in a league or a tournament.
+        """
+        try:
+            player_ids = [int(player_id) for player_id in request.query_params.get('player_ids', '').split(',') if player_id]
+        except ValueError:
+            return Response({'error': 'player_ids must be a comma separated list of ids'}, status=400)
+        if not player_ids:
+            return Response({'error': 'player_ids is required'}, status=400)
+        
+        scope_ids = {}
+        for param in ('tournament_id', 'league_id'):
+            if request.query_params.get(param):
+                try:
+                    scope_ids[param] = int(request.query_params[param])
+                except ValueError:
+                    return Response({'error': f'{param} must be an id'}, status=400)
+        
+        league = tournament = None
+        try:
+            if 'tournament_id' in scope_ids:
+                tournament = Tournament.objects.get(id=scope_ids['tournament_id'])
+            elif 'league_id' in scope_ids:
+                league = League.objects.get(id=scope_ids['league_id'])
+            matrices = MatchupService().get_matrices(player_ids, league, tournament)
+        except (Tournament.DoesNotExist, League.DoesNotExist, Player.DoesNotExist) as e:
+            return Response({'error': str(e)}, status=404)
+        
+        return Response(matrices)
+
+
+class PlayerAutocompleteView(generics.GenericAPIView):
+    """
+    A view for the typeahead of player names.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request, *args, **kwargs):
+        """
+        Handle GET requests for the players whose name matches the `q` typed so far.
+        """
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=400)
+        if limit < 1:
+            return Response({'error': 'limit must be positive'}, status=400)
+        
+        return Response(PlayerSearchService().search(request.query_params.get('q', ''), limit))
+
+
+class PlayerMatchHistoryView(generics.GenericAPIView):
+    """
+    A view for the match history of a player in compact rows, newest first.
+    """
+    permission_classes = [AllowAny]
+    pagination_class = CompactMatchPagination
+    
+    def get(self, request, *args, **kwargs):
+        """
+        Handle GET requests for a page of the history of a player, read from their participations.
+        """
+        player_id = kwargs.get('player_id')
+        if not Player.objects.filter(id=player_id).exists():
+            return Response({'error': 'Player not found'}, status=404)
+        
+        queryset = MatchParticipation.objects.filter(player_id=player_id)
+        if request.query_params.get('tournament_id'):
+            try:
+                queryset = queryset.filter(tournament_id=int(request.query_params['tournament_id']))
+            except ValueError:
+                return Response({'error': 'tournament_id must be an integer'}, status=400)
+        
+        page = self.paginate_queryset(queryset.order_by('-date', '-round_number').values(*PlayerMatchRowSerializer.FIELDS))
+        deltas = SnapshotService().player_event_deltas(player_id, {row['tournament_id'] for row in page}) # type: ignore
+        serializer = PlayerMatchRowSerializer(page, many=True, context={'deltas': deltas})
+        return self.get_paginated_response(serializer.data)
@@ -2,7 +2,21 @@ from django.contrib import admin
 from .models import Tournament, Round, Match, TournamentPlayer
 
 # Register your models here.
-admin.site.register(Tournament)
-admin.site.register(Round)
-admin.site.register(Match)
-admin.site.register(TournamentPlayer)
\ No newline at end of file
+@admin.register(Tournament)
+class TournamentAdmin(admin.ModelAdmin):
+    list_select_related = ('winner',)
+
+
+@admin.register(Round)
+class RoundAdmin(admin.ModelAdmin):
+    list_select_related = ('tournament',)
+
+
+@admin.register(Match)
+class MatchAdmin(admin.ModelAdmin):
+    list_select_related = ('player1', 'player2')
+
+
+@admin.register(TournamentPlayer)
+class TournamentPlayerAdmin(admin.ModelAdmin):
+    list_select_related = ('player',)
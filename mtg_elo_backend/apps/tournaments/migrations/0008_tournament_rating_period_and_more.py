@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0007_alter_tournament_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='rating_period',
+            field=models.IntegerField(blank=True, help_text='The historic rating period in which the tournament was rated.', null=True, verbose_name='rating period'),
+        ),
+        migrations.AddField(
+            model_name='tournamentplayer',
+            name='last_rated_period',
+            field=models.IntegerField(blank=True, help_text='The last rating period the RD is up to date with. The RD             inflation of the periods missed since then is applied lazily.', null=True, verbose_name='last rated period'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0008_tournament_rating_period_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='games',
+            field=models.JSONField(blank=True, help_text='The result of each game: 1 if player 1 won, -1 if player 2 won, 0 for a draw and null for a not played game.', null=True, verbose_name='games'),
+        ),
+    ]
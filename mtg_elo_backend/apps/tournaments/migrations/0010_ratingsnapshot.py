@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-17 16:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0003_player_last_rated_period'),
+        ('tournaments', '0009_match_games'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.IntegerField(default=1500, help_text='The rating of a player, wich measures the skill level.', verbose_name='elo')),
+                ('rd', models.FloatField(default=350, help_text='Rating Deviation: the uncertainty in the rating of a player.', verbose_name='RD')),
+                ('sigma', models.FloatField(default=0.06, help_text="The volatility of the player's rating, which measures the             consistency of the player's performance.", verbose_name='vol')),
+                ('matches_played', models.IntegerField(default=0, help_text='The number of matches played by the player.', verbose_name='matches played')),
+                ('matches_won', models.IntegerField(default=0, help_text='The number of matches won by the player.', verbose_name='matches won')),
+                ('matches_drawn', models.IntegerField(default=0, help_text='The number of matches drawn by the player.', verbose_name='matches drawn')),
+                ('matches_lost', models.IntegerField(default=0, help_text='The number of matches lost by the player.', verbose_name='matches lost')),
+                ('last_tendency', models.IntegerField(choices=[(2, '↑'), (1, '↗'), (0, '→'), (-1, '↘'), (-2, '↓')], default=0, help_text="The last tendency of the player's rating, which indicates             the direction of the player's performance in recent matches.", verbose_name='last tendency')),
+                ('last_rated_period', models.IntegerField(blank=True, help_text='The last rating period the RD is up to date with. The RD             inflation of the periods missed since then is applied lazily.', null=True, verbose_name='last rated period')),
+                ('scope', models.CharField(help_text='The rating scope of the snapshot, like historic or league.', max_length=20, verbose_name='scope')),
+                ('player', models.ForeignKey(help_text='The player to whom this snapshot belongs.', on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='players.player')),
+                ('tournament', models.ForeignKey(help_text='The tournament after which the snapshot was taken.', on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='tournaments.tournament')),
+            ],
+            options={
+                'ordering': ['tournament__date', 'scope', '-rating', 'rd'],
+                'unique_together': {('tournament', 'player', 'scope')},
+            },
+        ),
+    ]
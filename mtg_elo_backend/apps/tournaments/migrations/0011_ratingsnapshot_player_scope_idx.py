@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0003_player_last_rated_period'),
+        ('tournaments', '0010_ratingsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ratingsnapshot',
+            index=models.Index(fields=['player', 'scope'], name='snapshot_player_scope_idx'),
+        ),
+    ]
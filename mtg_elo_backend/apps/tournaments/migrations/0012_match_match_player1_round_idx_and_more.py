@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('decks', '0003_delete_playerdeck_alter_card_unique_together_and_more'),
+        ('players', '0004_player_player_leaderboard_idx'),
+        ('tournaments', '0011_ratingsnapshot_player_scope_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['player1', 'round'], name='match_player1_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['player2', 'round'], name='match_player2_round_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='round',
+            index=models.Index(fields=['tournament', 'number'], name='round_tournament_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournamentplayer',
+            index=models.Index(fields=['tournament', '-rating', 'rd'], name='tplayer_tournament_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-17 17:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_participations(apps, schema_editor):
+    """Write the participation rows of the matches stored before the table existed."""
+    Match = apps.get_model('tournaments', 'Match')
+    MatchParticipation = apps.get_model('tournaments', 'MatchParticipation')
+    participations = []
+    for match_id, player1_id, player2_id, score1, score2, tournament_id, date, round_number in Match.objects.values_list(
+        'id', 'player1_id', 'player2_id', 'player1_score', 'player2_score', 'round__tournament_id', 'round__tournament__date', 'round__number',
+    ).iterator(chunk_size=2000):
+        for player_id, opponent_id, won, lost in ((player1_id, player2_id, score1, score2), (player2_id, player1_id, score2, score1)):
+            if player_id is not None:
+                participations.append(MatchParticipation(
+                    match_id=match_id, player_id=player_id, opponent_id=opponent_id, tournament_id=tournament_id, date=date,
+                    round_number=round_number, games_won=won, games_lost=lost, result=(won > lost) - (won < lost),
+                ))
+        if len(participations) >= 2000:
+            MatchParticipation.objects.bulk_create(participations)
+            participations = []
+    MatchParticipation.objects.bulk_create(participations)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0004_player_player_leaderboard_idx'),
+        ('tournaments', '0012_match_match_player1_round_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchParticipation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='The date of the tournament of the match.', verbose_name='date')),
+                ('round_number', models.IntegerField(help_text='The number of the round of the match.', verbose_name='round number')),
+                ('games_won', models.IntegerField(default=0, help_text='The games won by the player.', verbose_name='games won')),
+                ('games_lost', models.IntegerField(default=0, help_text='The games won by the opponent.', verbose_name='games lost')),
+                ('result', models.IntegerField(choices=[(1, 'Win'), (0, 'Draw'), (-1, 'Loss')], help_text='The result of the match for the player.', verbose_name='result')),
+                ('match', models.ForeignKey(help_text='The match the player played.', on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='tournaments.match')),
+                ('opponent', models.ForeignKey(help_text='The opponent of the player, or null for a bye.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='opponent_participations', to='players.player')),
+                ('player', models.ForeignKey(help_text='The player of this side of the match.', on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='players.player')),
+                ('tournament', models.ForeignKey(help_text='The tournament of the match.', on_delete=django.db.models.deletion.CASCADE, related_name='participations', to='tournaments.tournament')),
+            ],
+            options={
+                'ordering': ['date', 'round_number'],
+                'indexes': [models.Index(fields=['player', '-date', '-round_number'], name='participation_history_idx'), models.Index(fields=['player', 'opponent'], name='participation_opponent_idx')],
+            },
+        ),
+        migrations.RunPython(create_participations, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,11 @@
+from collections import Counter
+
 from django.db.models import Q
 from django.db import models, transaction
 from ..players.models import Player, BaseRating
 from ..decks.models import Deck
 from services.helper import Rating, sum_bo3_results
+from services.unit_of_work import RatingUnitOfWork
 
 # Create your models here.
 class Tournament(models.Model):
@@ -24,15 +27,40 @@ class Tournament(models.Model):
         related_name='tournaments', help_text='The league to which this tournament belongs.'
     )
     state = models.CharField(max_length=50, choices=State.choices, default=State.PROGRAMMED, help_text='The current state of the tournament.')
+    rating_period = models.IntegerField(
+        'rating period',
+        null=True, blank=True,
+        help_text='The historic rating period in which the tournament was rated.'
+    )
+    
+    #: The date as stored, when the tournament was loaded from the database with it.
+    _stored_date = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        tournament = super().from_db(db, field_names, values)
+        if 'date' in field_names:
+            tournament._stored_date = values[field_names.index('date')]
+        return tournament
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if not adding and (update_fields is None or 'date' in update_fields) and self.date != self._stored_date:
+            self.participations.update(date=self.date) # type: ignore
+        if update_fields is None or 'date' in update_fields:
+            self._stored_date = self.date
     
     def bulk_dump_to_database(self, ratings: list[Rating] | tuple[Rating]) -> None:
-        with transaction.atomic():
+        with transaction.atomic(), RatingUnitOfWork():
+            tournament_ratings = {
+                tr.player.name: tr for tr in TournamentPlayer.objects.filter(
+                    tournament=self, player__name__in=[rating.name for rating in ratings]
+                ).select_related('player')
+            }
             for rating in ratings:
-                tr = TournamentPlayer.objects.get(tournament=self, player__name=rating.name)
-                tr.rating = rating.rating
-                tr.rd = rating.rd
-                tr.sigma = rating.sigma
-                tr.save()
+                tournament_ratings[rating.name].update_stats(rating)
     
     def get_or_create_tournament_rating(self, player: Player) -> tuple:
         """Create or get the tournament rating for a player."""
@@ -42,6 +70,26 @@ class Tournament(models.Model):
         )
         return tr, created
     
+    def get_or_create_tournament_ratings(self, players) -> dict[int, 'TournamentPlayer']:
+        """Return the tournament ratings of many players keyed by player id, creating the missing ones in bulk."""
+        players = list(players)
+        ratings = {tr.player_id: tr for tr in TournamentPlayer.objects.filter(tournament=self, player__in=players)} # type: ignore
+        missing = [TournamentPlayer(tournament=self, player=p) for p in players if p.id not in ratings]
+        if missing:
+            TournamentPlayer.objects.bulk_create(missing)
+            ratings = {tr.player_id: tr for tr in TournamentPlayer.objects.filter(tournament=self, player__in=players)} # type: ignore
+        
+        return ratings
+    
+    def preload_rounds(self) -> None:
+        """Keep the rounds and the number of matches played by each player in memory,
+        so `create_match` does not query them again for every match.
+        """
+        self._rounds_by_number = {r.number: r for r in self.rounds.all()} # type: ignore
+        self._matches_by_player = Counter()
+        for player1_id, player2_id in Match.objects.filter(round__tournament=self).values_list('player1_id', 'player2_id'):
+            self._matches_by_player.update({player1_id, player2_id})
+    
     def export_to_csv(self) -> bool:
         """Return a CSV representation of the tournament."""
         import os
@@ -49,38 +97,65 @@ class Tournament(models.Model):
         if os.path.exists(f'./exports/tournaments/{self.date.strftime("%Y-%m-%d")}.csv'):
             return False
 
-        matches = Match.objects.filter(round__tournament=self)
+        matches = Match.objects.filter(round__tournament=self).select_related('player1', 'player2')
         with open(f'./exports/tournaments/{self.date.strftime("%Y-%m-%d")}.csv', 'w') as file:
             for match in matches:
                 file.write(match.to_csv() + '\n')
         return True
         
-    def create_match(self, player1: Player | None, player2: Player | None, games: list[int | None], round_number: int | None = None) -> 'Match':
+    def create_match(self, player1: Player | None, player2: Player | None, games: list[int | None], round_number: int | None = None,
+                     commit: bool = True) -> 'Match':
+        """Create a match of the tournament.
+        
+        When `round_number` is None, the round is the next one of the player with more matches played.
+        With `commit=False` the match is returned unsaved, ready for a `bulk_create`.
+        """
         from services.helper import get_games_won_per_player
-        queryset = Match.objects.filter(Q(round__tournament=self))
+        preloaded = hasattr(self, '_rounds_by_number')
         
         player1_score, player2_score = get_games_won_per_player(games)
         
         if round_number is None:
-            round_number = max(
-                queryset.filter(Q(player1=player1) | Q(player2=player1)).count() + 1,
-                queryset.filter(Q(player1=player2) | Q(player2=player2)).count() + 1,
-            )
+            if preloaded:
+                round_number = max(
+                    self._matches_by_player[player1.id if player1 else None] + 1,
+                    self._matches_by_player[player2.id if player2 else None] + 1,
+                )
+            else:
+                round_number = max(self.count_matches(player1) + 1, self.count_matches(player2) + 1)
         
-        return Match.objects.create(
-            round=self.rounds.get(number=round_number), # type: ignore
+        if preloaded:
+            if round_number not in self._rounds_by_number:
+                raise Round.DoesNotExist(f'Round {round_number} does not exist in {self.name}')
+            match_round = self._rounds_by_number[round_number]
+            self._matches_by_player.update({player1.id if player1 else None, player2.id if player2 else None})
+        else:
+            match_round = self.rounds.get(number=round_number) # type: ignore
+        
+        match = Match(
+            round=match_round,
             player1=player1,
             player2=player2,
             player1_score=player1_score,
             player2_score=player2_score,
+            games=list(games),
             winner=player1 if player1_score > player2_score else player2 if player2_score > player1_score else None,
         )
+        if commit:
+            match.save()
+        return match
+        
+    def count_matches(self, player: Player | None) -> int:
+        """Return the matches played by `player` in the tournament, or the byes when `player` is None."""
+        if player is None:
+            return self.participations.filter(opponent=None).count() # type: ignore
+        return self.participations.filter(player=player).count() # type: ignore
         
     def set_winner(self):
         """Set the winner of the tournament."""
         if self.winner is None:
             self.winner = self.ratings.order_by('-rating').first().player # type: ignore
-            self.save()
+            self.save(update_fields=['winner'])
     
     def clean_empty_rounds(self):
         """Remove empty rounds from the tournament."""
@@ -109,12 +184,27 @@ class Round(models.Model):
         return f'Round {self.number} of {self.tournament.name}'
     
     class Meta:
+        indexes = [models.Index(fields=['tournament', 'number'], name='round_tournament_number_idx')]
         ordering = ['tournament__date', 'number']
 
 
+class MatchQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Create the matches and their `MatchParticipation` rows in bulk."""
+        matches = super().bulk_create(objs, *args, **kwargs)
+        MatchParticipation.objects.bulk_create(
+            [participation for match in matches for participation in match.build_participations()],
+            batch_size=kwargs.get('batch_size'),
+        )
+        return matches
+
+
 class Match(models.Model):
     """Model representing a match in a tournament."""
     
+    #: The fields copied to the `MatchParticipation` rows of the match.
+    PARTICIPATION_FIELDS = frozenset({'round', 'player1', 'player2', 'player1_score', 'player2_score'})
+    
     round = models.ForeignKey(
         Round, 
         on_delete=models.CASCADE, 
@@ -145,6 +235,11 @@ class Match(models.Model):
         null=False, default=0, 
         help_text='The score of player 2 in the match.'
     )
+    games = models.JSONField(
+        'games',
+        null=True, blank=True,
+        help_text='The result of each game: 1 if player 1 won, -1 if player 2 won, 0 for a draw and null for a not played game.'
+    )
     winner_deck = models.ForeignKey(
         Deck,
         on_delete=models.SET_NULL, null=True,
@@ -158,6 +253,57 @@ class Match(models.Model):
         help_text='The deck used by the looser in the match.'
     )
 
+    objects = MatchQuerySet.as_manager()
+    
+    #: The values of `PARTICIPATION_FIELDS` the rows were built from, when they are known.
+    _stored_participation = None
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        match = super().from_db(db, field_names, values)
+        stored = dict(zip(field_names, values))
+        attnames = cls.get_participation_attnames()
+        if all(attname in stored for attname in attnames):
+            match._stored_participation = tuple(stored[attname] for attname in attnames)
+        return match
+    
+    @classmethod
+    def get_participation_attnames(cls) -> list[str]:
+        return [cls._meta.get_field(name).attname for name in sorted(cls.PARTICIPATION_FIELDS)]
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        values = tuple(getattr(self, attname) for attname in self.get_participation_attnames())
+        # Deck and admin edits leave the participations as they are.
+        rebuild = adding or (
+            (update_fields is None or bool(self.PARTICIPATION_FIELDS.intersection(update_fields)))
+            and values != self._stored_participation
+        )
+        # The match and its participations are saved together, without a savepoint inside a transaction.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if rebuild:
+                if not adding:
+                    self.participations.all().delete() # type: ignore
+                MatchParticipation.objects.bulk_create(self.build_participations())
+        if rebuild:
+            self._stored_participation = values
+    
+    def build_participations(self) -> list['MatchParticipation']:
+        """Return the unsaved `MatchParticipation` rows of the match: one per player, so a bye has one."""
+        tournament = self.round.tournament
+        sides = ((self.player1_id, self.player2_id, self.player1_score, self.player2_score), # type: ignore
+                 (self.player2_id, self.player1_id, self.player2_score, self.player1_score)) # type: ignore
+        return [
+            MatchParticipation(
+                match=self, player_id=player_id, opponent_id=opponent_id, tournament=tournament,
+                date=tournament.date, round_number=self.round.number, games_won=won, games_lost=lost,
+                result=MatchParticipation.Result.WIN if won > lost else MatchParticipation.Result.LOSS if won < lost else MatchParticipation.Result.DRAW,
+            )
+            for player_id, opponent_id, won, lost in sides if player_id is not None
+        ]
+
     def to_csv(self) -> str:
         """Return a CSV representation of the match."""
         return f'{self.player1.name if self.player1 else "Bye"},{self.player1_score}-{self.player2_score},{self.player2.name if self.player2 else "Bye"}'
@@ -166,9 +312,77 @@ class Match(models.Model):
         return f'{self.player1.name if self.player1 else "Bye"}[{self.player1_score}] vs {self.player2.name if self.player2 else "Bye"}[{self.player2_score}]'
 
     class Meta:
+        # The history of a player is filtered by player1 or player2: one index each.
+        indexes = [
+            models.Index(fields=['player1', 'round'], name='match_player1_round_idx'),
+            models.Index(fields=['player2', 'round'], name='match_player2_round_idx'),
+        ]
         ordering = ['round__tournament__date', 'round__number']
         
         
+class MatchParticipationQuerySet(models.QuerySet):
+    def record(self) -> dict[str, int]:
+        """Return the matches won, drawn and lost of the participations, like the record of a player against an opponent."""
+        Result = MatchParticipation.Result
+        return self.aggregate(
+            won=models.Count('id', filter=Q(result=Result.WIN)),
+            drawn=models.Count('id', filter=Q(result=Result.DRAW)),
+            lost=models.Count('id', filter=Q(result=Result.LOSS)),
+        )
+
+
+class MatchParticipation(models.Model):
+    """One player's side of a match, with the date and round of the match copied in.
+
+    Every match has a row per player, so the matches of a player are a range of
+    one index instead of an OR across `player1` and `player2` joined to the round
+    and the tournament. The rows are written by `Match.save` and by the
+    `bulk_create` of the matches.
+    """
+    class Result(models.IntegerChoices):
+        WIN = 1, 'Win'
+        DRAW = 0, 'Draw'
+        LOSS = -1, 'Loss'
+    
+    match = models.ForeignKey(
+        Match,
+        on_delete=models.CASCADE, related_name='participations',
+        help_text='The match the player played.'
+    )
+    player = models.ForeignKey(
+        Player,
+        on_delete=models.CASCADE, related_name='participations',
+        help_text='The player of this side of the match.'
+    )
+    opponent = models.ForeignKey(
+        Player,
+        on_delete=models.CASCADE, null=True,
+        related_name='opponent_participations', help_text='The opponent of the player, or null for a bye.'
+    )
+    tournament = models.ForeignKey(
+        Tournament,
+        on_delete=models.CASCADE, related_name='participations',
+        help_text='The tournament of the match.'
+    )
+    date = models.DateField('date', help_text='The date of the tournament of the match.')
+    round_number = models.IntegerField('round number', help_text='The number of the round of the match.')
+    games_won = models.IntegerField('games won', default=0, help_text='The games won by the player.')
+    games_lost = models.IntegerField('games lost', default=0, help_text='The games won by the opponent.')
+    result = models.IntegerField('result', choices=Result.choices, help_text='The result of the match for the player.')
+    
+    objects = MatchParticipationQuerySet.as_manager()
+    
+    def __str__(self) -> str:
+        return f'{self.player_id} vs {self.opponent_id}: {self.games_won}-{self.games_lost}' # type: ignore
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['player', '-date', '-round_number'], name='participation_history_idx'),
+            models.Index(fields=['player', 'opponent'], name='participation_opponent_idx'),
+        ]
+        ordering = ['date', 'round_number']
+
+
 class TournamentPlayer(BaseRating):
     tournament = models.ForeignKey(
         Tournament, 
@@ -185,4 +399,56 @@ class TournamentPlayer(BaseRating):
         return f'{self.player.name:<35}|{self.rating:^6}|{round(self.rd, 8):^14}|'
     
     class Meta: # type: ignore
+        indexes = [models.Index(fields=['tournament', '-rating', 'rd'], name='tplayer_tournament_rating_idx')]
         ordering = ['tournament__date', '-rating', 'rd']
+
+
+class RatingSnapshot(BaseRating):
+    """The rating of a player in a scope right after a rated tournament.
+
+    The state of any player before a tournament is their latest snapshot of a
+    previous one, so past events can be re-rated without replaying the history.
+    """
+    tournament = models.ForeignKey(
+        Tournament,
+        on_delete=models.CASCADE, related_name='snapshots',
+        help_text='The tournament after which the snapshot was taken.'
+    )
+    player = models.ForeignKey(
+        Player,
+        on_delete=models.CASCADE, related_name='snapshots',
+        help_text='The player to whom this snapshot belongs.'
+    )
+    scope = models.CharField(
+        'scope', max_length=20,
+        help_text='The rating scope of the snapshot, like historic or league.'
+    )
+    
+    #: The fields copied from and to the rating rows.
+    SNAPSHOT_FIELDS = (*BaseRating.RATING_FIELDS, 'last_rated_period')
+    
+    @classmethod
+    def take(cls, row: BaseRating, tournament: Tournament, scope: str, player_id: int) -> 'RatingSnapshot':
+        """Snapshot the current state of a rating row. The snapshot is written like
+        any other rating change, in bulk when a `RatingUnitOfWork` is active.
+        """
+        snapshot = cls(
+            tournament=tournament, player_id=player_id, scope=scope,
+            **{field: getattr(row, field) for field in cls.SNAPSHOT_FIELDS},
+        )
+        snapshot.save_fields(*cls.SNAPSHOT_FIELDS)
+        return snapshot
+    
+    def restore_to(self, row: BaseRating) -> None:
+        """Set `row` back to the state of the snapshot."""
+        for field in self.SNAPSHOT_FIELDS:
+            setattr(row, field, getattr(self, field))
+        row.save_fields(*self.SNAPSHOT_FIELDS)
+    
+    def __str__(self) -> str:
+        return f'{self.player.name:<35}|{self.scope:^10}|{self.rating:^6}|{round(self.rd, 8):^14}|'
+    
+    class Meta: # type: ignore
+        unique_together = ('tournament', 'player', 'scope')
+        indexes = [models.Index(fields=['player', 'scope'], name='snapshot_player_scope_idx')]
+        ordering = ['tournament__date', 'scope', '-rating', 'rd']
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Match, Round, Tournament, TournamentPlayer
+from .models import Match, RatingSnapshot, Round, Tournament, TournamentPlayer
 from ..players.serializers import PlayerSerializer
 
 
@@ -50,3 +50,114 @@ class MatchSerializer(serializers.ModelSerializer):
         model = Match
         fields = ('id', 'round_data', 'player_1', 'player_2', 'winner', 'player1_score', 'player2_score')
         read_only_fields = ('id', 'winner')
+
+
+class MatchCorrectionSerializer(serializers.Serializer):
+    """
+    Serializer for a corrected result of a best of three match. The scores and the
+    winner follow from the games, so no other field can be changed with them.
+    """
+    games = serializers.ListField(
+        child=serializers.IntegerField(min_value=-1, max_value=1, allow_null=True),
+        min_length=1, max_length=3,
+    )
+
+    def validate_games(self, games):
+        if games[0] is None:
+            raise serializers.ValidationError('The first game must be played.')
+
+        player1_wins = player2_wins = 0
+        for index, game in enumerate(games):
+            if game is None:
+                if any(later is not None for later in games[index:]):
+                    raise serializers.ValidationError('A game cannot be played after an unplayed one.')
+                break
+            if max(player1_wins, player2_wins) == 2:
+                raise serializers.ValidationError('A game cannot be played after the match is decided.')
+            player1_wins += game == 1
+            player2_wins += game == -1
+        return games
+
+    def validate(self, attrs):
+        others = sorted(set(self.initial_data) - set(self.fields))
+        if others:
+            raise serializers.ValidationError({field: 'Cannot be changed together with games.' for field in others})
+        return attrs
+
+
+
+class RatingSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Serializer for RatingSnapshot model. The `rd` has the periods missed up to
+    the `period` of the serializer context applied.
+    """
+    player_id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(source='player.name', read_only=True)
+    rd = serializers.SerializerMethodField()
+    
+    def get_rd(self, obj):
+        return obj.inflated_rd(self.context.get('period'))
+    
+    class Meta:
+        model = RatingSnapshot
+        fields = ('player_id', 'name', 'tournament', 'scope', 'rating', 'rd', 'sigma', 'matches_played', 'matches_won', 'matches_drawn', 'matches_lost')
+        read_only_fields = fields
+
+
+class RatingDeltaSerializer(RatingSnapshotSerializer):
+    """
+    Serializer for the rating change of a player in a tournament.
+    """
+    previous_rating = serializers.IntegerField(read_only=True)
+    rating_delta = serializers.IntegerField(read_only=True)
+    
+    class Meta(RatingSnapshotSerializer.Meta):
+        fields = (*RatingSnapshotSerializer.Meta.fields, 'previous_rating', 'rating_delta')
+        read_only_fields = fields
+
+
+class PlayerMatchRowSerializer(serializers.Serializer):
+    """
+    Serializer for a compact row of the match history of a player, from the
+    `values()` of their `MatchParticipation` rows. The `rating_delta` is the
+    change of the player's rating over the whole tournament, from the `deltas`
+    of the serializer context.
+    """
+    match = serializers.IntegerField(source='match_id', read_only=True)
+    tournament = serializers.IntegerField(source='tournament_id', read_only=True)
+    date = serializers.DateField(read_only=True)
+    round = serializers.IntegerField(source='round_number', read_only=True)
+    opponent_id = serializers.IntegerField(read_only=True, allow_null=True)
+    opponent_name = serializers.CharField(source='opponent__name', read_only=True, allow_null=True)
+    score = serializers.SerializerMethodField()
+    result = serializers.IntegerField(read_only=True)
+    rating_delta = serializers.SerializerMethodField()
+    
+    #: The values of the participations read by the serializer.
+    FIELDS = ('id', 'match_id', 'tournament_id', 'date', 'round_number', 'opponent_id', 'opponent__name', 'games_won', 'games_lost', 'result')
+    
+    def get_score(self, obj):
+        return f'{obj["games_won"]}-{obj["games_lost"]}'
+    
+    def get_rating_delta(self, obj):
+        return self.context.get('deltas', {}).get(obj['tournament_id'])
+
+
+class TournamentMatchRowSerializer(serializers.Serializer):
+    """
+    Serializer for a compact row of the matches of a tournament, from the `values()` of its matches.
+    """
+    id = serializers.IntegerField(read_only=True)
+    round = serializers.IntegerField(source='round__number', read_only=True)
+    player1_id = serializers.IntegerField(read_only=True, allow_null=True)
+    player1_name = serializers.CharField(source='player1__name', read_only=True, allow_null=True)
+    player2_id = serializers.IntegerField(read_only=True, allow_null=True)
+    player2_name = serializers.CharField(source='player2__name', read_only=True, allow_null=True)
+    score = serializers.SerializerMethodField()
+    winner_id = serializers.IntegerField(read_only=True, allow_null=True)
+    
+    #: The values of the matches read by the serializer.
+    FIELDS = ('id', 'round__number', 'player1_id', 'player1__name', 'player2_id', 'player2__name', 'player1_score', 'player2_score', 'winner_id')
+    
+    def get_score(self, obj):
+        return f'{obj["player1_score"]}-{obj["player2_score"]}'
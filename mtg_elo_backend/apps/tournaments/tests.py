@@ -1,3 +1,394 @@
+from datetime import date
+
+from django.db import connection
+from django.db.models import Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.leagues.models import League, LeaguePlayer
+from apps.players.models import Player
+from apps.users.models import CustomUser
+from services.correction_service import CorrectionService
+from services.glicko2_service import Glicko2Service
+from services.pairing_service import SwissPairingService
+from services.profiler import RatingProfiler, profile_stage
+from services.replay_service import ReplayService
+from services.simulation_service import TournamentSimulationService
+from services.snapshot_service import SnapshotService
+from services.tournament_scope_service import TournamentScopeService
+from .models import Match, MatchParticipation, RatingSnapshot, Tournament, TournamentPlayer
+
+
+class CreateMatchTest(TestCase):
+    def setUp(self):
+        self.players = [Player.objects.create(name=f'P{i}') for i in range(4)]
+        
+    def _play(self, tournament: Tournament) -> list[int]:
+        p0, p1, p2, p3 = self.players
+        pairings = [(p0, p1), (p2, p3), (p0, p2), (p1, None), (p3, p0)]
+        return [tournament.create_match(a, b, [1, 1, None]).round.number for a, b in pairings]
+        
+    def test_preloaded_rounds_match_queried_rounds(self):
+        queried = Tournament.objects.create(name='Queried', date=date(2025, 1, 1))
+        preloaded = Tournament.objects.create(name='Preloaded', date=date(2025, 1, 2))
+        for tournament in (queried, preloaded):
+            for number in range(1, 4):
+                tournament.rounds.create(number=number)
+        
+        expected = self._play(queried)
+        preloaded.preload_rounds()
+        # One insert for each match and one for its participations.
+        with self.assertNumQueries(10):
+            self.assertEqual(self._play(preloaded), expected)
+
+
+class MatchParticipationTest(TestCase):
+    def setUp(self):
+        self.league = League.objects.create(name='League')
+        for event_date, matches in ReplayServiceTest.EVENTS:
+            Glicko2Service().rate_league_event(matches, self.league, date=event_date)
+        self.p0, self.p1, self.p3 = (Player.objects.get(name=name) for name in ('P0', 'P1', 'P3'))
+    
+    def test_every_match_has_a_row_per_player(self):
+        self.assertEqual(MatchParticipation.objects.count(), 2 * Match.objects.count() - 1)
+        bye = MatchParticipation.objects.get(opponent=None)
+        self.assertEqual((bye.player, bye.result, bye.games_won), (self.p1, MatchParticipation.Result.WIN, 2))
+        
+        history = [p.match_id for p in self.p0.participations.order_by('-date', '-round_number')] # type: ignore
+        expected = Match.objects.filter(Q(player1=self.p0) | Q(player2=self.p0)).order_by('-round__tournament__date', '-round__number')
+        self.assertEqual(history, [match.id for match in expected])
+        
+    def test_rows_follow_corrections_and_dates(self):
+        match = Match.objects.get(round__tournament__date=date(2025, 1, 15), player1=self.p1)
+        CorrectionService().correct_match(match, [-1, -1, None])
+        tournament = match.round.tournament
+        tournament.date = date(2025, 1, 16)
+        tournament.save()
+        
+        row = MatchParticipation.objects.get(match=match, player=self.p1)
+        self.assertEqual((row.result, row.games_won, row.games_lost, row.date), (MatchParticipation.Result.LOSS, 0, 2, date(2025, 1, 16)))
+        
+    def test_unchanged_saves_leave_the_rows(self):
+        match = Match.objects.get(round__tournament__date=date(2025, 1, 15), player1=self.p1)
+        tournament = Tournament.objects.get(id=match.round.tournament_id) # type: ignore
+        tournament.state = Tournament.State.FINISH
+        with CaptureQueriesContext(connection) as queries:
+            match.save()
+            tournament.save()
+        self.assertFalse([query['sql'] for query in queries if 'participation' in query['sql']])
+        
+        match.player1_score = 0
+        match.save()
+        row = MatchParticipation.objects.get(match=match, player=self.p1)
+        self.assertEqual((row.games_won, row.result), (0, MatchParticipation.Result.DRAW))
+        
+    def test_record_against_an_opponent(self):
+        record = MatchParticipation.objects.filter(player=self.p0, opponent=self.p3).record()
+        self.assertEqual(record, {'won': 1, 'drawn': 0, 'lost': 0})
+
+
+class CompactMatchListTest(TestCase):
+    def setUp(self):
+        league = League.objects.create(name='League')
+        for event_date, matches in ReplayServiceTest.EVENTS:
+            Glicko2Service().rate_league_event(matches, league, date=event_date)
+        self.p1 = Player.objects.get(name='P1')
+    
+    def walk(self, url: str) -> list[dict]:
+        rows = []
+        while url:
+            response = self.client.get(url).json()
+            rows += response['results']
+            url = response['next']
+        return rows
+        
+    def test_player_history(self):
+        rows = self.walk(f'/players/{self.p1.id}/history/?page_size=2')
+        
+        expected = self.p1.participations.order_by('-date', '-round_number') # type: ignore
+        self.assertEqual([row['match'] for row in rows], [p.match_id for p in expected])
+        self.assertEqual(rows[-1]['opponent_name'], 'P0')
+        self.assertEqual((rows[-1]['score'], rows[-1]['result']), ('1-2', MatchParticipation.Result.LOSS))
+        for row in rows:
+            delta = SnapshotService().event_deltas(Tournament.objects.get(id=row['tournament'])).get(player=self.p1)
+            self.assertEqual(row['rating_delta'], delta.rating_delta) # type: ignore
+            
+    def test_tournament_results(self):
+        tournament = Tournament.objects.get(date=date(2025, 1, 1))
+        rows = self.walk(f'/tournaments/results/{tournament.id}/?page_size=3')
+        
+        self.assertEqual([row['id'] for row in rows], list(Match.objects.filter(round__tournament=tournament).order_by('round__number', 'id').values_list('id', flat=True)))
+        self.assertEqual(self.client.get('/tournaments/results/0/').status_code, 404)
+
+
+class ReplayServiceTest(TestCase):
+    EVENTS = [
+        ('2025-01-01', [('P0', 'P1', [1, -1, 1]), ('P2', 'P3', [-1, -1, 0]), ('P0', 'P3', [1, 1, 0]), ('P1', 'Bye', [1, 1, None])]),
+        ('2025-01-08', [('P1', 'P2', [0, None, None]), ('P3', 'P4', [1, 0, None])]),
+        ('2025-01-15', [('P0', 'P4', [-1, 1, -1]), ('P1', 'P3', [1, 1, 0])]),
+    ]
+    
+    def _state(self):
+        return (
+            list(Player.objects.order_by('name').values_list('name', 'rating', 'rd', 'sigma', 'matches_won', 'last_tendency', 'last_rated_period')),
+            list(LeaguePlayer.objects.order_by('player__name').values_list('rating', 'rd', 'matches_played', 'last_rated_period')),
+            list(TournamentPlayer.objects.order_by('tournament__date', 'player__name').values_list('rating', 'rd', 'matches_lost')),
+            list(Tournament.objects.order_by('date').values_list('rating_period', 'winner__name')),
+        )
+    
+    def test_replay_rebuilds_the_imported_ratings(self):
+        league = League.objects.create(name='League')
+        for event_date, matches in self.EVENTS:
+            Glicko2Service().rate_league_event(matches, league, date=event_date)
+        expected = self._state()
+        
+        # Lose every rating and the games of the oldest matches, which are rebuilt from the scores.
+        Player.objects.update(rating=1000, rd=10, matches_won=0)
+        LeaguePlayer.objects.all().delete()
+        Match.objects.filter(round__tournament__date=date(2025, 1, 1)).update(games=None)
+        
+        self.assertEqual(ReplayService().replay(), {'events': 3, 'matches': 8})
+        self.assertEqual(self._state(), expected)
+    
+    def test_parallel_leagues_replay_matches_the_ordered_one(self):
+        leagues = [League.objects.create(name='League'), League.objects.create(name='Other League')]
+        for i, (event_date, matches) in enumerate(self.EVENTS):
+            Glicko2Service().rate_league_event(matches, leagues[i % 2], date=event_date)
+        snapshots = RatingSnapshot.objects.order_by('tournament__date', 'scope', 'player__name').values_list('player__name', 'scope', 'rating', 'rd', 'last_rated_period')
+        ReplayService().replay()
+        expected = self._state(), list(snapshots)
+        
+        LeaguePlayer.objects.update(rating=1000, rd=10, matches_won=0)
+        
+        # The workers could not see the data of the test transaction, so the leagues are replayed in this process.
+        self.assertEqual(ReplayService().replay(parallel_leagues=True, max_workers=1), {'events': 3, 'matches': 8})
+        self.assertEqual((self._state(), list(snapshots.all())), expected)
+
+
+class CorrectionServiceTest(TestCase):
+    EVENTS = ReplayServiceTest.EVENTS + [
+        ('2025-01-22', [('P5', 'P6', [1, 1, None])]),
+        ('2025-01-29', [('P2', 'P5', [-1, 0, 1]), ('P0', 'P6', [1, -1, -1])]),
+    ]
+    
+    def setUp(self):
+        league = League.objects.create(name='League')
+        for event_date, matches in self.EVENTS:
+            Glicko2Service().rate_league_event(matches, league, date=event_date)
+    
+    def _state(self):
+        return (
+            *ReplayServiceTest._state(self), # type: ignore
+            list(RatingSnapshot.objects.order_by('tournament__date', 'scope', 'player__name').values_list('player__name', 'scope', 'rating', 'rd')),
+        )
+    
+    def test_correction_matches_a_full_replay(self):
+        match = Match.objects.get(round__tournament__date=date(2025, 1, 8), player1__name='P1')
+        
+        rerated = CorrectionService().correct_match(match, [-1, -1, None])
+        corrected = self._state()
+        ReplayService().replay()
+        
+        self.assertEqual({p.name for p in Player.objects.filter(id__in=rerated)}, {'P1', 'P2', 'P3', 'P5'})
+        self.assertEqual(corrected, self._state())
+    
+    def test_unaffected_players_are_not_rated_again(self):
+        match = Match.objects.get(round__tournament__date=date(2025, 1, 22))
+        unaffected = Player.objects.filter(name__in=['P1', 'P3', 'P4']).order_by('name').values_list('rating', 'rd', 'last_rated_period')
+        before = list(unaffected)
+        
+        rerated = CorrectionService().correct_match(match, [-1, -1, None])
+        
+        self.assertEqual({p.name for p in Player.objects.filter(id__in=rerated)}, {'P0', 'P2', 'P5', 'P6'})
+        self.assertEqual(list(unaffected.all()), before)
+        self.assertEqual(Match.objects.get(id=match.id).winner.name, 'P6') # type: ignore
+
+    def test_corrections_must_be_a_best_of_three(self):
+        match = Match.objects.get(round__tournament__date=date(2025, 1, 22))
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(username='admin', base_role=CustomUser.Role.TOURNAMENT_ADMIN))
+        url = f'/tournaments/{match.round.tournament_id}/matches/{match.id}/' # type: ignore
+
+        for games in ('abc', 3, {'a': 1}, [], [5, 5], [[1]], [1, 1, 1], [1, 1, 1, 1, 1], [None, 1], [1, None, 1], [-1, -1, 0]):
+            self.assertEqual(client.patch(url, {'games': games}, format='json').status_code, 400, games)
+        response = client.patch(url, {'games': [1, -1, 1], 'player1_score': 0}, format='json')
+        self.assertEqual(response.json(), {'player1_score': ['Cannot be changed together with games.']})
+        self.assertEqual(Match.objects.get(id=match.id).games, [1, 1, None])
+
+        response = client.patch(url, {'games': [1, -1, 0]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['match']['player1_score'], response.json()['match']['player2_score']), (1, 1))
+
+
+
+class SnapshotServiceTest(TestCase):
+    def setUp(self):
+        self.league = League.objects.create(name='League')
+        for event_date, matches in ReplayServiceTest.EVENTS:
+            Glicko2Service().rate_league_event(matches, self.league, date=event_date)
+    
+    def test_leaderboard_as_of_the_last_event_is_the_current_one(self):
+        leaderboard = SnapshotService().leaderboard_as_of(date(2025, 1, 31))
+        
+        self.assertEqual(
+            [(s.player.name, s.rating, s.matches_played) for s in leaderboard],
+            list(Player.objects.order_by('-rating', 'rd').values_list('name', 'rating', 'matches_played')),
+        )
+    
+    def test_leaderboard_as_of_a_past_date(self):
+        snapshot_service = SnapshotService()
+        as_of = date(2025, 1, 10)
+        first = Tournament.objects.get(date=date(2025, 1, 1))
+        
+        leaderboard = {s.player.name: s for s in snapshot_service.leaderboard_as_of(as_of, self.league)}
+        
+        self.assertEqual(sorted(leaderboard), ['P0', 'P1', 'P2', 'P3', 'P4'])
+        # P0 did not play on the 8th, so the rating comes from the first event with the RD of one missed period.
+        p0 = RatingSnapshot.objects.get(tournament=first, player__name='P0', scope='league')
+        self.assertEqual(leaderboard['P0'].rating, p0.rating)
+        self.assertEqual(snapshot_service.get_period_as_of(as_of, self.league), 2)
+        self.assertGreater(leaderboard['P0'].inflated_rd(2), p0.rd)
+    
+    def test_event_deltas(self):
+        tournament = Tournament.objects.get(date=date(2025, 1, 15))
+        previous = {s.player.name: s.rating for s in SnapshotService().leaderboard_as_of(date(2025, 1, 8))}
+        
+        deltas = {s.player.name: s for s in SnapshotService().event_deltas(tournament)}
+        
+        self.assertEqual(sorted(deltas), ['P0', 'P1', 'P3', 'P4'])
+        for name, snapshot in deltas.items():
+            self.assertEqual(snapshot.previous_rating, previous[name])
+            self.assertEqual(snapshot.rating_delta, snapshot.rating - previous[name])
+
+
+
+class TournamentScopeServiceTest(TestCase):
+    def test_recompute_rebuilds_the_tournament_ratings(self):
+        league = League.objects.create(name='League')
+        for event_date, matches in ReplayServiceTest.EVENTS:
+            Glicko2Service().rate_league_event(matches, league, date=event_date)
+        tournament_ratings = TournamentPlayer.objects.order_by('tournament__date', 'player__name').values_list('rating', 'rd', 'sigma', 'matches_won', 'matches_lost')
+        expected = list(tournament_ratings)
+        
+        TournamentPlayer.objects.update(rating=1000, rd=10, matches_won=0)
+        TournamentPlayer.objects.filter(tournament__date=date(2025, 1, 8)).delete()
+        
+        self.assertEqual(TournamentScopeService(max_workers=2).recompute(), {'tournaments': 3, 'rows': 12})
+        self.assertEqual(list(tournament_ratings.all()), expected)
+
+
+class SwissPairingServiceTest(TestCase):
+    def _pairs(self, tournament: Tournament) -> set[frozenset]:
+        return {frozenset(pair) for pair in Match.objects.filter(round__tournament=tournament).values_list('player1_id', 'player2_id')}
+        
+    def test_pairs_by_points_without_rematches(self):
+        players = [Player.objects.create(name=f'P{i}', rating=1500 + 10 * i) for i in range(5)]
+        tournament = Tournament.objects.create(name='Swiss', date=date(2025, 1, 1))
+        for player in players:
+            tournament.get_or_create_tournament_rating(player)
+        tournament.rounds.create(number=1)
+        p0, p1, p2, p3, p4 = players
+        for player1, player2 in ((p0, p1), (p2, p3), (p4, None)):
+            tournament.create_match(player1, player2, [1, 1, None], round_number=1)
+        
+        round_number, pairings, rematches = SwissPairingService().pair(tournament)
+        
+        self.assertEqual((round_number, rematches), (2, []))
+        self.assertEqual(pairings[-1], (p1, None))
+        self.assertEqual({frozenset(p.id for p in pair) for pair in pairings[:-1]}, {frozenset((p4.id, p2.id)), frozenset((p0.id, p3.id))})
+        
+    def test_large_event_has_no_rematches(self):
+        players = Player.objects.bulk_create([Player(name=f'P{i}', rating=1200 + i) for i in range(301)])
+        tournament = Tournament.objects.create(name='Large', date=date(2025, 1, 1))
+        TournamentPlayer.objects.bulk_create([TournamentPlayer(tournament=tournament, player=player) for player in players])
+        
+        for _ in range(6):
+            round_number, pairings, _ = SwissPairingService().pair(tournament)
+            tournament.rounds.create(number=round_number)
+            self.assertEqual(sum(2 if player2 else 1 for _, player2 in pairings), len(players))
+            self.assertFalse({frozenset((a.id, b.id if b else None)) for a, b in pairings} & self._pairs(tournament))
+            for player1, player2 in pairings:
+                tournament.create_match(player1, player2, [1, 0, 1] if player2 else [1, 1, None], round_number=round_number)
+    
+    def test_stuck_search_only_makes_unavoidable_rematches(self):
+        players = Player.objects.bulk_create([Player(name=f'P{i}', rating=1500 + 25 * i) for i in range(8)])
+        tournament = Tournament.objects.create(name='Stuck', date=date(2025, 1, 1))
+        TournamentPlayer.objects.bulk_create([TournamentPlayer(tournament=tournament, player=player) for player in players])
+        service = SwissPairingService()
+        # Enough steps to pair the 4 tables in one pass, but not to backtrack, like in a large late round.
+        service.MAX_STEPS = 5
+        
+        # Until round 4, everyone still has 4 of the 7 others to play, so there is always a pairing without rematches.
+        for _ in range(4):
+            round_number, pairings, rematches = service.pair(tournament)
+            tournament.rounds.create(number=round_number)
+            self.assertEqual((len(pairings), rematches), (4, []))
+            self.assertFalse({frozenset((a.id, b.id)) for a, b in pairings} & self._pairs(tournament)) # type: ignore
+            for player1, player2 in pairings:
+                tournament.create_match(player1, player2, [1, 0, 1], round_number=round_number)
+    
+    def test_unavoidable_rematches_are_reported(self):
+        p0, p1, p2, p3 = players = [Player.objects.create(name=f'P{i}') for i in range(4)]
+        tournament = Tournament.objects.create(name='Round robin', date=date(2025, 1, 1))
+        for player in players:
+            tournament.get_or_create_tournament_rating(player)
+        for round_number, tables in enumerate((((p0, p1), (p2, p3)), ((p0, p2), (p1, p3)), ((p0, p3), (p1, p2))), start=1):
+            tournament.rounds.create(number=round_number)
+            for player1, player2 in tables:
+                tournament.create_match(player1, player2, [1, 1, None], round_number=round_number)
+        
+        round_number, pairings, rematches = SwissPairingService().pair(tournament)
+        
+        self.assertEqual((round_number, rematches), (4, [1, 2]))
+        self.assertEqual(len({player for pair in pairings for player in pair}), 4)
+
+
+class TournamentSimulationServiceTest(TestCase):
+    def setUp(self):
+        self.players = [Player.objects.create(name=f'P{i}', rating=1400 + 50 * i, rd=60) for i in range(10)]
+        self.tournament = Tournament.objects.create(name='Odds', date=date(2025, 1, 1))
+        for player in self.players:
+            self.tournament.get_or_create_tournament_rating(player)
+        
+    def test_probabilities_add_up(self):
+        odds = TournamentSimulationService().simulate(self.tournament, simulations=4000, seed=1)
+        
+        self.assertEqual((odds['rounds_left'], odds['top_cut']), (4, 8))
+        self.assertAlmostEqual(sum(player['top_cut'] for player in odds['players']), 8)
+        self.assertAlmostEqual(sum(player['win'] for player in odds['players']), 1)
+        self.assertEqual(odds['players'][0]['id'], self.players[-1].id)
+        
+    def test_finished_swiss_only_plays_the_top_cut(self):
+        self.tournament.rounds.create(number=1)
+        for index in range(0, 10, 2):
+            self.tournament.create_match(self.players[index], self.players[index + 1], [1, 1, None], round_number=1)
+        
+        odds = TournamentSimulationService().simulate(self.tournament, simulations=1000, rounds=1, seed=1)
+        
+        winners = {player.id for player in self.players[0::2]}
+        self.assertEqual(odds['rounds_left'], 0)
+        self.assertTrue(all(player['top_cut'] == 1 for player in odds['players'] if player['id'] in winners))
+
 
-# Create your tests here.
+class RatingProfilerTest(TestCase):
+    def test_stages_of_an_event(self):
+        league = League.objects.create(name='League')
+        event_date, matches = ReplayServiceTest.EVENTS[0]
+        with RatingProfiler() as profiler:
+            Glicko2Service().rate_league_event(matches, league, date=event_date)
+        
+        stages = {stage['stage']: stage for stage in profiler.report()}
+        self.assertEqual(stages['rate_league_event']['queries'], profiler.queries)
+        self.assertEqual(stages['rate_league_event/create_matches']['rows'], Match.objects.count() + MatchParticipation.objects.count())
+        self.assertGreater(stages['rate_league_event/rate_event/flush']['rows'], 0)
+        self.assertEqual(stages['rate_league_event/rate_event/historic.rate']['queries'], 0)
+        
+    def test_stages_are_not_recorded_without_a_profiler(self):
+        with RatingProfiler() as profiler:
+            pass
+        with profile_stage('outside'):
+            pass
+        
+        self.assertIsNone(RatingProfiler.current())
+        self.assertEqual(profiler.report(), [])
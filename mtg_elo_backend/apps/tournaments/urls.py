@@ -1,6 +1,6 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from .views import MatchViewSet, TournamentCSVExportView, TournamentViewSet, EndTournamentView, TournamentPlayerViewSet
+from .views import MatchViewSet, TournamentCSVExportView, TournamentViewSet, EndTournamentView, TournamentPlayerViewSet, TournamentRatingDeltasView, TournamentPairingsView, TournamentOddsView, TournamentResultsView
 
 router = DefaultRouter()
 router.register(r'', TournamentViewSet)
@@ -11,4 +11,8 @@ urlpatterns = [
     path('', include(router.urls)),
     path('end/<int:tournament_id>/', EndTournamentView.as_view(), name='end-tournament'),
     path('export/<int:tournament_id>/', TournamentCSVExportView.as_view(), name='export-tournament-by-id'),
+    path('deltas/<int:tournament_id>/', TournamentRatingDeltasView.as_view(), name='tournament-rating-deltas'),
+    path('pairings/<int:tournament_id>/', TournamentPairingsView.as_view(), name='tournament-pairings'),
+    path('odds/<int:tournament_id>/', TournamentOddsView.as_view(), name='tournament-odds'),
+    path('results/<int:tournament_id>/', TournamentResultsView.as_view(), name='tournament-results'),
 ]
\ No newline at end of file
@@ -1,17 +1,24 @@
 from django.db.models import Q
 
 from rest_framework import viewsets
+from rest_framework.generics import GenericAPIView
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from apps.core.paginators import CompactMatchPagination, KeysetPagination, MatchHistoryPagination
 from apps.players.models import Player
 from apps.tournaments.models import Match, Tournament, TournamentPlayer
-from apps.tournaments.serializers import TournamentPlayerSerializer, MatchSerializer, TournamentSerializer
+from apps.tournaments.serializers import MatchCorrectionSerializer, RatingDeltaSerializer, TournamentMatchRowSerializer, TournamentPlayerSerializer, MatchSerializer, TournamentSerializer
 from apps.users import permissions
 
+from services.correction_service import CorrectionService
 from services.glicko2_service import Glicko2Service
 from services.file_service import FileService
+from services.pairing_service import SwissPairingService
+from services.simulation_service import TournamentSimulationService
+from services.rating_scopes import HistoricScope, LeagueScope
+from services.snapshot_service import SnapshotService
 from django.http import HttpResponse
 import os
 
@@ -120,12 +127,103 @@ class TournamentCSVExportView(APIView):
             return Response({'error': 'Tournament not found'}, status=404)
 
 
+class TournamentRatingDeltasView(APIView):
+    """
+    View to get the rating change of every participant of a tournament.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        scope = request.query_params.get('scope', HistoricScope.name)
+        if scope not in (HistoricScope.name, LeagueScope.name):
+            return Response({'error': f'Scope must be {HistoricScope.name} or {LeagueScope.name}'}, status=400)
+        try:
+            tournament = Tournament.objects.get(id=kwargs.get('tournament_id'))
+        except Tournament.DoesNotExist:
+            return Response({'error': 'Tournament not found'}, status=404)
+        if tournament.rating_period is None:
+            return Response({'error': 'Tournament not rated'}, status=404)
+
+        deltas = SnapshotService().event_deltas(tournament, scope)
+        serializer = RatingDeltaSerializer(deltas, many=True)
+        return Response(serializer.data)
+
+
+class TournamentPairingsView(APIView):
+    """
+    View to get the Swiss pairings of the next round of a tournament.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            tournament = Tournament.objects.get(id=kwargs.get('tournament_id'))
+        except Tournament.DoesNotExist:
+            return Response({'error': 'Tournament not found'}, status=404)
+
+        service = SwissPairingService()
+        round_number, pairings, rematches = service.pair(tournament)
+        return Response({
+            'round': round_number,
+            'pairings': [
+                {
+                    'table': table,
+                    'player1': {'id': player1.id, 'name': player1.name}, # type: ignore
+                    'player2': {'id': player2.id, 'name': player2.name} if player2 is not None else None, # type: ignore
+                    'rematch': table in rematches,
+                }
+                for table, (player1, player2) in enumerate(pairings, start=1)
+            ],
+        })
+
+
+class TournamentOddsView(APIView):
+    """
+    View to get the odds of the players of a tournament to make the top cut and to win it.
+    """
+    permission_classes = [AllowAny]
+    MAX_SIMULATIONS = 100_000
+
+    def get(self, request, *args, **kwargs):
+        try:
+            simulations = int(request.query_params.get('simulations', TournamentSimulationService.SIMULATIONS))
+        except ValueError:
+            return Response({'error': 'simulations must be an integer'}, status=400)
+        if not 0 < simulations <= self.MAX_SIMULATIONS:
+            return Response({'error': f'simulations must be between 1 and {self.MAX_SIMULATIONS}'}, status=400)
+        try:
+            tournament = Tournament.objects.get(id=kwargs.get('tournament_id'))
+        except Tournament.DoesNotExist:
+            return Response({'error': 'Tournament not found'}, status=404)
+
+        return Response(TournamentSimulationService().simulate(tournament, simulations))
+
+
+class TournamentResultsView(GenericAPIView):
+    """
+    View to get the matches of a tournament in compact rows, by round.
+    """
+    permission_classes = [AllowAny]
+    pagination_class = CompactMatchPagination
+
+    def get(self, request, *args, **kwargs):
+        tournament_id = kwargs.get('tournament_id')
+        if not Tournament.objects.filter(id=tournament_id).exists():
+            return Response({'error': 'Tournament not found'}, status=404)
+
+        queryset = Match.objects.filter(round__tournament_id=tournament_id).order_by('round__number')
+        page = self.paginate_queryset(queryset.values(*TournamentMatchRowSerializer.FIELDS))
+        serializer = TournamentMatchRowSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
 class MatchViewSet(viewsets.ModelViewSet):
     """
     A viewset for viewing and editing match instances in a tournament.
     """
-    queryset = Match.objects.all()
+    queryset = Match.objects.select_related('player1', 'player2', 'round')
     serializer_class = MatchSerializer
+    pagination_class = MatchHistoryPagination
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -147,13 +245,19 @@ class MatchViewSet(viewsets.ModelViewSet):
         if not tournament_id and not player_id:
             return Response({'error': 'Either tournament_id or player_id must be provided'}, status=400)
         
-        filters = []
-        if tournament_id:
-            filters.append(Q(round__tournament__id=tournament_id))
         if player_id:
-            filters.append(Q(player1__id=player_id) | Q(player2__id=player_id))
+            # The history of a player is read from their participations, a range of one index.
+            filters = {'participations__player_id': player_id}
+            if tournament_id:
+                filters['participations__tournament_id'] = tournament_id
+            queryset = self.get_queryset().filter(**filters).order_by('-participations__date', '-participations__round_number')
+        else:
+            queryset = self.get_queryset().filter(round__tournament__id=tournament_id).order_by('-round__tournament__date', '-round__number')
         
-        queryset = self.get_queryset().filter(*filters).order_by('-round__tournament__date', '-round__number')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
@@ -179,14 +283,29 @@ class MatchViewSet(viewsets.ModelViewSet):
             return Response({'status': 'Match created successfully', 'match': serializer.data}, status=201) # type: ignore
         except (Tournament.DoesNotExist, Player.DoesNotExist) as e:
             return Response({'error': str(e)}, status=404)
-        
+
+    def update(self, request, *args, **kwargs):
+        """
+        Update a match. A new `games` result re-rates the events affected by the correction.
+        """
+        if 'games' not in request.data:
+            return super().update(request, *args, **kwargs)
+
+        match = self.get_object()
+        correction = MatchCorrectionSerializer(data=request.data)
+        correction.is_valid(raise_exception=True)
+        CorrectionService().correct_match(match, correction.validated_data['games']) # type: ignore
+        serializer = self.get_serializer(match)
+        return Response({'status': 'Match corrected successfully', 'match': serializer.data}, status=200) # type: ignore
+
 
 class TournamentPlayerViewSet(viewsets.ModelViewSet):
     """
     A viewset for viewing and editing tournament player instances.
     """
-    queryset = TournamentPlayer.objects.all()
+    queryset = TournamentPlayer.objects.select_related('player')
     serializer_class = TournamentPlayerSerializer
+    pagination_class = KeysetPagination
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -215,7 +334,7 @@ class TournamentPlayerViewSet(viewsets.ModelViewSet):
         if player_id:
             filters.append(Q(player__id=player_id))
         
-        queryset = self.get_queryset().filter(*filters).order_by('-rating', '-rd')
+        queryset = self.get_queryset().filter(*filters).order_by('-rating', 'rd')
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -0,0 +1 @@
+"""Benchmarks of the rating engine, run with `python manage.py benchmark`."""
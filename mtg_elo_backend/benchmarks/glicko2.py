@@ -0,0 +1,126 @@
+import itertools
+import random
+from datetime import date, timedelta
+
+from apps.leagues.models import League
+from apps.players.models import Player
+from apps.tournaments.models import Round, Tournament
+from services.glicko2_service import Glicko2Service
+from services.helper import Rating
+from .runner import Benchmark
+
+#: The synthetic players of each benchmark.
+SIZES = (10, 1_000, 100_000)
+#: The opponents of each player in a rating period.
+OPPONENTS = (1, 5, 15)
+#: The `rate_1vs1` calls of each benchmark, they are slow enough to not need more.
+MATCHES = 100
+#: The most players in one `rate_league_event` event.
+EVENT_SIZE = 64
+#: Game results by the winner of the game, 1 for player 1, -1 for player 2 and 0 for a draw.
+GAME_RESULTS = (1, 1, 1, 0, -1, -1, -1)
+
+
+def synthetic_ratings(rng: random.Random, count: int) -> list[Rating]:
+    return [Rating(f'Benchmark {i}', rng.gauss(1500, 200), rng.uniform(40, 350), rng.uniform(0.04, 0.08)) for i in range(count)]
+
+
+def synthetic_series(rng: random.Random, ratings: list[Rating], opponents: int) -> list[list[tuple[float, Rating]]]:
+    """Return a series of `opponents` random games for each rating."""
+    scores = (Rating.WIN, Rating.DRAW, Rating.LOSS)
+    return [[(rng.choice(scores), rng.choice(ratings)) for _ in range(opponents)] for _ in ratings]
+
+
+def synthetic_games(rng: random.Random) -> list[int | None]:
+    """Return the games of a best of three with random results."""
+    games: list[int | None] = [rng.choice(GAME_RESULTS) for _ in range(2)]
+    games.append(rng.choice(GAME_RESULTS) if sum(games) == 0 else None) # type: ignore
+    return games
+
+
+def get_benchmarks(sizes=SIZES, opponents=OPPONENTS, seed: int = 0, database: bool = True) -> list[Benchmark]:
+    """Return the benchmarks of the Glicko-2 hot path.
+
+    The pure ones run over every synthetic player of each size, the ones writing to
+    the database need an open transaction, rolled back by the caller.
+
+    Args:
+        sizes (Iterable[int]): The number of synthetic players.
+        opponents (Iterable[int]): The opponents of each player in one rating period.
+        seed (int): The seed of the synthetic players and games.
+        database (bool): Whether to include `rate_1vs1` and `rate_league_event`.
+    """
+    service = Glicko2Service()
+    benchmarks = []
+
+    for size in sizes:
+        def ratings(size=size):
+            return synthetic_ratings(random.Random(seed), size)
+
+        def scaled(size=size):
+            rng = random.Random(seed)
+            return [(service.scale_down(rating), rng.gauss(0, 1), rng.uniform(0.5, 5)) for rating in synthetic_ratings(rng, size)]
+
+        benchmarks += [
+            Benchmark('scale_down', {'players': size}, ratings, lambda state: [service.scale_down(rating) for rating in state], size),
+            Benchmark('scale_up', {'players': size}, lambda size=size: [service.scale_down(r) for r in ratings(size)],
+                      lambda state: [service.scale_up(rating) for rating in state], size),
+            Benchmark('determine_sigma', {'players': size}, scaled,
+                      lambda state: [service.determine_sigma(*arguments) for arguments in state], size),
+        ]
+        for count in opponents:
+            def series(size=size, count=count):
+                rng = random.Random(seed)
+                players = synthetic_ratings(rng, size)
+                return list(zip(players, synthetic_series(rng, players, count)))
+
+            benchmarks.append(Benchmark('rate', {'players': size, 'opponents': count}, series,
+                                        lambda state: [service.rate(rating, games) for rating, games in state], size))
+
+    if not database:
+        return benchmarks
+
+    # The same seed draws the same first ratings at any size, so each size extends the players of the smaller ones.
+    players: list[Player] = []
+    days = itertools.count()
+
+    def synthetic_players(size: int) -> list[Player]:
+        if len(players) < size:
+            players.extend(Player.objects.bulk_create([
+                Player(name=rating.name, rating=rating.rating, rd=rating.rd, sigma=rating.sigma)
+                for rating in synthetic_ratings(random.Random(seed), size)[len(players):]
+            ]))
+        return players[:size]
+
+    for size in sizes:
+        def matches(size=size):
+            rng = random.Random(seed)
+            tournament = Tournament.objects.create(name=f'Benchmark {size}', date=date(2000, 1, 1))
+            tournament.rounds.create(number=1)
+            return tournament, [(*rng.sample(synthetic_players(size), 2), synthetic_games(rng)) for _ in range(MATCHES)]
+
+        benchmarks.append(Benchmark('rate_1vs1', {'players': size}, matches, lambda state: [
+            service.rate_1vs1(p1, p2, games, state[0], round_number=1) for p1, p2, games in state[1]
+        ], MATCHES))
+
+        for count in opponents:
+            def events(size=size, count=count):
+                league = League.objects.create(name=f'Benchmark {size} {count}')
+                return random.Random(seed), synthetic_players(size), league
+
+            def rate_event(state, count=count):
+                # Every run is a new event of one Swiss round per opponent.
+                rng, pool, league = state
+                entrants = rng.sample(pool, min(EVENT_SIZE, len(pool)) // 2 * 2)
+                matches = []
+                for _ in range(count):
+                    rng.shuffle(entrants)
+                    matches += [(p1.name, p2.name, synthetic_games(rng)) for p1, p2 in zip(entrants[0::2], entrants[1::2])]
+                day = date(2000, 1, 1) + timedelta(days=next(days))
+                tournament = Tournament.objects.create(name=day.isoformat(), date=day, league=league)
+                Round.objects.bulk_create([Round(tournament=tournament, number=number) for number in range(1, count + 1)])
+                service.rate_league_event(matches, league, tournament)
+
+            benchmarks.append(Benchmark('rate_league_event', {'players': size, 'opponents': count}, events, rate_event, 1))
+
+    return benchmarks
@@ -0,0 +1,72 @@
+import os
+import random
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+#: The opponent of the player with a bye in the imported files.
+BYE = 'Bye'
+#: The score of a bye in the imported files.
+BYE_SCORE = '2-0'
+
+
+class EventTemplate(object):
+    """The shape of an imported event: its players, its rounds and its score mix."""
+
+    def __init__(self, name: str, players: int, rounds: int, scores: Counter):
+        self.name = name
+        self.players = players
+        self.rounds = rounds
+        self.scores = scores
+
+
+def load_templates(directory: str | Path = 'imports') -> list[EventTemplate]:
+    """Read the shape of every imported event of `directory`, in date order."""
+    templates = []
+    for path in sorted(Path(directory).glob('*.csv')):
+        names, scores, matches = set(), Counter(), 0
+        for line in path.read_text().splitlines():
+            if not line.strip():
+                continue
+            p1, score, p2 = (value.strip() for value in line.split(','))
+            names.update(name for name in (p1, p2) if name != BYE)
+            if BYE not in (p1, p2):
+                scores[score] += 1
+            matches += 1
+        if names:
+            templates.append(EventTemplate(path.stem, len(names), max(round(2 * matches / len(names)), 1), scores))
+    return templates
+
+
+def generate_season(templates: list[EventTemplate], scale: int, seed: int = 0) -> list[tuple[str, list[str]]]:
+    """Return a synthetic season `scale` times as long as the imported one, as `(file_name, lines)`.
+
+    Each event copies the players and rounds of an imported event and draws its
+    scores from the scores of every imported event. The pool of players grows with
+    the scale, so the players of an event are not always the same ones.
+    """
+    rng = random.Random(seed)
+    scores = sum((template.scores for template in templates), Counter())
+    score_values, score_weights = list(scores), list(scores.values())
+    pool = [f'Synthetic {i}' for i in range(max(template.players for template in templates) * scale)]
+
+    season = []
+    for index in range(len(templates) * scale):
+        template = templates[index % len(templates)]
+        players = rng.sample(pool, template.players)
+        lines = []
+        for _ in range(template.rounds):
+            rng.shuffle(players)
+            if len(players) % 2:
+                lines.append(f'{players[-1]},{BYE_SCORE},{BYE}')
+            for p1, p2 in zip(players[0::2], players[1::2]):
+                lines.append(f'{p1},{rng.choices(score_values, score_weights)[0]},{p2}')
+        season.append(((date(2000, 1, 1) + timedelta(weeks=index)).isoformat(), lines))
+    return season
+
+
+def write_season(season: list[tuple[str, list[str]]], directory: str | Path) -> None:
+    """Write the events of `season` as import files of `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    for file_name, lines in season:
+        Path(directory, f'{file_name}.csv').write_text('\n'.join(lines) + '\n')
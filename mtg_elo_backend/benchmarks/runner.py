@@ -0,0 +1,115 @@
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable
+
+from django.db import connection
+
+
+class Benchmark(object):
+    """An operation measured at one set of parameters.
+
+    `setup` builds the state of the operation once, outside of the timings, and
+    `run` performs `ops` operations on it.
+    """
+
+    def __init__(self, name: str, params: dict, setup: Callable[[], Any], run: Callable[[Any], Any], ops: int):
+        self.name = name
+        self.params = params
+        self.setup = setup
+        self.run = run
+        self.ops = ops
+
+
+class BenchmarkRunner(object):
+    """Time a list of benchmarks and save the results as JSON to compare them between commits."""
+
+    def __init__(self, repeat: int = 3):
+        """
+        Args:
+            repeat (int): The timed runs of each benchmark, the best one is kept.
+        """
+        self.repeat = repeat
+
+    def measure(self, benchmark: Benchmark) -> dict:
+        """Return the best time of the runs of `benchmark`, its operations per second and
+        the memory allocated by one more run traced by `tracemalloc`.
+        """
+        state = benchmark.setup()
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            benchmark.run(state)
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            benchmark.run(state)
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+
+        seconds = min(timings)
+        return {
+            'name': benchmark.name,
+            'params': benchmark.params,
+            'ops': benchmark.ops,
+            'seconds': seconds,
+            'ops_per_sec': benchmark.ops / seconds if seconds else None,
+            'peak_kib': peak / 1024,
+            'retained_kib': allocated / 1024,
+            'retained_blocks': blocks,
+        }
+
+    def run(self, suite: str, benchmarks: list[Benchmark], report: Callable[[dict], None] | None = None) -> dict:
+        """Measure every benchmark of `suite`, calling `report` with each result as soon as it is ready."""
+        results = []
+        for benchmark in benchmarks:
+            result = self.measure(benchmark)
+            results.append(result)
+            if report is not None:
+                report(result)
+
+        return {
+            'suite': suite,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'commit': self.get_commit(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'repeat': self.repeat,
+            'results': results,
+        }
+
+    def get_commit(self) -> str | None:
+        """Return the current git commit, or None outside of a git checkout."""
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def save(self, results: dict, path: str) -> None:
+        with open(path, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    def load(self, path: str) -> dict:
+        with open(path) as file:
+            return json.load(file)
+
+    def compare(self, results: dict, baseline: dict) -> list[tuple[dict, float | None]]:
+        """Pair each result with its speedup over the same benchmark of `baseline`,
+        None when the baseline did not run it.
+        """
+        previous = {(result['name'], json.dumps(result['params'], sort_keys=True)): result for result in baseline['results']}
+        compared = []
+        for result in results['results']:
+            old = previous.get((result['name'], json.dumps(result['params'], sort_keys=True)))
+            speedup = result['ops_per_sec'] / old['ops_per_sec'] if old and old['ops_per_sec'] and result['ops_per_sec'] else None
+            compared.append((result, speedup))
+        return compared
@@ -91,7 +91,7 @@ WSGI_APPLICATION = 'mtg_elo_manager.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': config('DATABASE_ELO_MANAGER_ENGINE', default='django.db.backends.postgresql'),
         'NAME': config('DATABASE_ELO_MANAGER_NAME', default='mtg_elo_manager'),
         'USER': config('DATABASE_ELO_MANAGER_USER', default='mtg_elo_manager'),
         'PASSWORD': config('DATABASE_ELO_MANAGER_PASSWORD', default='123456789'),
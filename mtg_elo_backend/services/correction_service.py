@@ -0,0 +1,181 @@
+from bisect import bisect_left
+
+from django.db import transaction
+
+from apps.leagues.models import LeaguePlayer
+from apps.players.models import Player
+from apps.tournaments.models import Match, RatingSnapshot, Tournament, TournamentPlayer
+from .glicko2_service import Glicko2Service
+from .helper import get_games_won_per_player
+from .rating_scopes import HistoricScope, LeagueScope
+from .replay_service import ReplayService
+from .snapshot_service import SnapshotService
+from .unit_of_work import RatingUnitOfWork
+
+
+class CorrectionService(object):
+    """Re-rate the history that follows a corrected match result.
+
+    The ratings are restored from the `RatingSnapshot` taken before the
+    tournament of the match, and only the players affected by the change are
+    rated again: the players of the match first, then, event after event,
+    everyone who played against an affected player. The ratings of everyone
+    else stay untouched.
+    """
+
+    def __init__(self, glicko_service: Glicko2Service | None = None):
+        self.glicko_service = glicko_service or Glicko2Service()
+        self.snapshot_service = SnapshotService()
+
+    def correct_match(self, match: Match, games: list[int | None]) -> set[int] | None:
+        """Store the new games of `match` and re-rate the events affected by them.
+
+        When the tournament of the match was not rated as an event, or a rated
+        tournament has no snapshots, the whole history is replayed instead.
+
+        Returns:
+            set[int] | None: The ids of the players rated again, or None after a full replay.
+        """
+        with transaction.atomic():
+            match.games = list(games)
+            match.player1_score, match.player2_score = get_games_won_per_player(games)
+            match.winner = (
+                match.player1 if match.player1_score > match.player2_score
+                else match.player2 if match.player2_score > match.player1_score else None
+            )
+            match.save(update_fields=['games', 'player1_score', 'player2_score', 'winner'])
+
+            tournament = match.round.tournament
+            if tournament.rating_period is None or self.missing_snapshots():
+                ReplayService(self.glicko_service).replay()
+                return None
+
+            affected = {player_id for player_id in (match.player1_id, match.player2_id) if player_id is not None} # type: ignore
+            return self.rerate_from(tournament, affected)
+
+    def missing_snapshots(self) -> bool:
+        """Whether a rated tournament has no snapshots, like the ones rated before they existed."""
+        return Tournament.objects.filter(rating_period__isnull=False, snapshots__isnull=True).exists()
+
+    def rerate_from(self, tournament: Tournament, affected: set[int]) -> set[int]:
+        """Re-rate `tournament` and the later events for the players in `affected`,
+        growing it with the opponents of affected players.
+
+        Returns:
+            set[int]: The ids of the players rated again.
+        """
+        events = Tournament.objects.filter(rating_period__gte=tournament.rating_period).select_related('league').in_bulk()
+        league_periods: dict[int, list[int]] = {}
+        for league_id, period in Tournament.objects.filter(
+            league_id__in={event.league_id for event in events.values()}, rating_period__isnull=False, # type: ignore
+        ).values_list('league_id', 'rating_period'):
+            league_periods.setdefault(league_id, []).append(period)
+        for periods in league_periods.values():
+            periods.sort()
+
+        players: dict[int, Player] = {}
+        league_players: dict[tuple[int, int], LeaguePlayer] = {}
+        rerated: set[int] = set()
+        rerated_events: list[Tournament] = []
+        matches = Match.objects.filter(round__tournament__rating_period__gte=tournament.rating_period)
+
+        with RatingUnitOfWork():
+            for event_id, event_matches in ReplayService(self.glicko_service).iter_events(matches, ('round__tournament__rating_period',)):
+                event = events[event_id]
+                component = self.get_affected_component(event_matches, affected)
+                if not component:
+                    continue
+
+                period = event.rating_period - 1 # type: ignore
+                league_period = bisect_left(league_periods.get(event.league_id, []), event.rating_period) # type: ignore
+                self.load_players(players, component, period)
+                context = {
+                    'tournament': event,
+                    'league': event.league,
+                    'players': [players[player_id] for player_id in component],
+                    'tournament_players': self.load_tournament_players(event, component),
+                }
+                periods = {HistoricScope.name: period}
+                if event.league_id: # type: ignore
+                    context['league_players'] = self.load_league_players(league_players, event, component, league_period)
+                    periods[LeagueScope.name] = league_period
+
+                RatingSnapshot.objects.filter(tournament=event, player_id__in=component).delete()
+                event_matches = [match for match in event_matches if match[0] in component or match[1] in component]
+                self.glicko_service.rate_event(
+                    [(players.get(p1), players.get(p2), games) for p1, p2, games, _ in event_matches], # type: ignore
+                    context, periods, [round_number for *_, round_number in event_matches],
+                )
+
+                affected |= component
+                rerated |= component
+                rerated_events.append(event)
+
+        # The new ratings may change the winner of the events rated again.
+        for event in rerated_events:
+            event.winner = None
+            event.set_winner()
+
+        return rerated
+
+    def get_affected_component(self, matches: list[tuple[int | None, int | None, list[int | None], int]], affected: set[int]) -> set[int]:
+        """Return the attendees of an event connected to an affected player through its matches."""
+        opponents: dict[int, set[int]] = {}
+        for p1, p2, *_ in matches:
+            for player_id, opponent_id in ((p1, p2), (p2, p1)):
+                if player_id is not None:
+                    opponents.setdefault(player_id, set())
+                    if opponent_id is not None:
+                        opponents[player_id].add(opponent_id)
+
+        component = set()
+        pending = [player_id for player_id in opponents if player_id in affected]
+        while pending:
+            player_id = pending.pop()
+            if player_id not in component:
+                component.add(player_id)
+                pending.extend(opponents[player_id] - component)
+
+        return component
+
+    def load_players(self, players: dict[int, Player], component: set[int], period: int) -> None:
+        """Add the players of `component` to `players`, restored to their state before `period + 1`."""
+        missing = component - players.keys()
+        if not missing:
+            return
+
+        players.update(Player.objects.in_bulk(missing))
+        self.snapshot_service.restore_rows(
+            [players[player_id] for player_id in missing],
+            self.snapshot_service.snapshots_before(period + 1, HistoricScope.name, missing),
+            period,
+        )
+
+    def load_league_players(self, league_players: dict[tuple[int, int], LeaguePlayer], event: Tournament,
+                            component: set[int], period: int) -> dict[int, LeaguePlayer]:
+        """Return the league rows of `component` keyed by player id, the ones not loaded yet
+        restored to their state before the event.
+        """
+        missing = {player_id for player_id in component if (event.league_id, player_id) not in league_players} # type: ignore
+        if missing:
+            rows = list(LeaguePlayer.objects.filter(league_id=event.league_id, player_id__in=missing)) # type: ignore
+            rows += [LeaguePlayer(league_id=event.league_id, player_id=player_id) # type: ignore
+                     for player_id in missing - {row.player_id for row in rows}] # type: ignore
+            league_players.update({(row.league_id, row.player_id): row for row in rows}) # type: ignore
+            self.snapshot_service.restore_rows(
+                rows,
+                self.snapshot_service.snapshots_before(event.rating_period, LeagueScope.name, missing, event.league_id), # type: ignore
+                period,
+            )
+
+        return {player_id: league_players[(event.league_id, player_id)] for player_id in component} # type: ignore
+
+    def load_tournament_players(self, event: Tournament, component: set[int]) -> dict[int, TournamentPlayer]:
+        """Return the tournament rows of `component` keyed by player id, reset to their defaults."""
+        rows = {tp.player_id: tp for tp in TournamentPlayer.objects.filter(tournament=event, player_id__in=component)} # type: ignore
+        for player_id in component - rows.keys():
+            rows[player_id] = TournamentPlayer(tournament=event, player_id=player_id)
+        for row in rows.values():
+            row.reset_stats(row.last_rated_period)
+
+        return rows
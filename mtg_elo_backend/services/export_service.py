@@ -1,4 +1,4 @@
-from apps.players.models import Player
+from apps.players.models import Player, RatingPeriodCache
 from datetime import datetime as dt
 from django.core.management.base import CommandError
 from .file_service import FileService
@@ -32,9 +32,13 @@ class ExportService:
         print(separator)
         if players is None:
             players = Player.objects.all()
-            
+        
+        periods = RatingPeriodCache()
         for i, player in enumerate(players):
             row = '|'
+            period = periods.get_period(player)
+            tendency = player.LastTendency(player.current_last_tendency(period)).label
+            rd = round(player.inflated_rd(period), 8)
             
             player_winrate = ''
             
@@ -44,7 +48,7 @@ class ExportService:
             
             if full:
                 try:
-                    row += f'{i+1:>4}|{player.name:<35}|{player.rating:^6}|{player.get_last_tendency_display():^11}|{player_winrate:^9}|{round(player.rd, 8):^14}|{player.matches_played:^9}|{player.matches_won:^6}|{player.matches_lost:^6}|{player.matches_drawn:^6}|' # type: ignore
+                    row += f'{i+1:>4}|{player.name:<35}|{player.rating:^6}|{tendency:^11}|{player_winrate:^9}|{rd:^14}|{player.matches_played:^9}|{player.matches_won:^6}|{player.matches_lost:^6}|{player.matches_drawn:^6}|' # type: ignore
                 except:
                     raise CommandError('Full option is not available for TournamentRating objects.')
             else:
@@ -58,11 +62,11 @@ class ExportService:
                 if columns.get('Elo', False):
                     row += f'{round(player.rating):^6}|'
                 if columns.get('Tendencia', False):
-                    row += f'{player.get_last_tendency_display():^11}|' # type: ignore
+                    row += f'{tendency:^11}|'
                 if columns.get('% Win', False):
                     header += f'{player_winrate:^9}|'
                 if columns.get('RD', False):
-                    row += f'{round(player.rd, 8):^14}|'
+                    row += f'{rd:^14}|'
                 if columns.get('Matches', False):
                     row += f'{player.matches_played:^9}|'
             
@@ -83,8 +87,11 @@ class ExportService:
         with open(file_path, 'wt') as fm:
             fm.write('Position,Player,Elo,Rating deviation (RD),Tendency,Matches played,Matches won,Matches loss,Matches drawn\n')
             
+            periods = RatingPeriodCache()
             for i, player in enumerate(players):
-                fm.write(f'{i+1},{player.name},{player.rating},{player.rd},{player.get_last_tendency_display()},{player.matches_played},{player.matches_won},{player.matches_lost},{player.matches_drawn}\n') # type: ignore
+                period = periods.get_period(player)
+                tendency = player.LastTendency(player.current_last_tendency(period)).label
+                fm.write(f'{i+1},{player.name},{player.rating},{player.inflated_rd(period)},{tendency},{player.matches_played},{player.matches_won},{player.matches_lost},{player.matches_drawn}\n') # type: ignore
         
         return file_path
     
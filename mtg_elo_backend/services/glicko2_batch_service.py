@@ -0,0 +1,224 @@
+import numpy as np
+
+from .glicko2_service import Glicko2Service
+from .helper import Rating
+from .rating_table import RatingTable
+
+
+class Glicko2BatchService(Glicko2Service):
+    """Glicko-2 engine that rates a whole rating period at once.
+
+    Players and opponents are integer indices into rating arrays, so an
+    event is rated with a handful of array operations instead of one
+    `rate()` call per player and match.
+    """
+    DEFAULT_PERIOD_SIZE = Glicko2Service.PERIOD_EVENT
+    #: Batches below this size are solved with the scalar sigma solver.
+    SCALAR_BATCH_SIZE = 4
+    #: Illinois iterations before an element falls back to the scalar solver.
+    MAX_SIGMA_ITERATIONS = 100
+
+    def rate_period(self, ratings, rds, sigmas, players, opponents, scores) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Rate every player of a single rating period.
+
+        Args:
+            ratings, rds, sigmas: The pre-period values of every player, indexed by player.
+            players (array of int): For each game, the index of the player being rated.
+            opponents (array of int): For each game, the index of the opponent.
+            scores (array of float): For each game, the actual score of `players` against `opponents`.
+
+        Every game must be listed once per side. Players without games only get
+        their RD inflated (Step 6 of the algorithm).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The new ratings, RDs and sigmas.
+        """
+        ratings = np.asarray(ratings, dtype=np.float64)
+        rds = np.asarray(rds, dtype=np.float64)
+
+        # Step 2. Convert the ratings and RD's onto the Glicko-2 scale.
+        mu, phi, sigma = self.rate_scaled_period(
+            (ratings - self.rating) / self.RATIO, rds / self.RATIO, sigmas, players, opponents, scores,
+        )
+
+        # Step 8. Convert ratings and RD's back to original scale.
+        return mu * self.RATIO + self.rating, phi * self.RATIO, sigma
+
+    def rate_scaled_period(self, mu, phi, sigmas, players, opponents, scores) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Steps 3 to 7 of `rate_period` over values already on the Glicko-2 scale."""
+        mu = np.asarray(mu, dtype=np.float64)
+        phi = np.asarray(phi, dtype=np.float64)
+        sigmas = np.asarray(sigmas, dtype=np.float64)
+        players = np.asarray(players, dtype=np.intp)
+        opponents = np.asarray(opponents, dtype=np.intp)
+        scores = np.asarray(scores, dtype=np.float64)
+        size = len(mu)
+
+        # Step 3 and 4. Per game g(RD) and E, scatter-added onto each player.
+        impact = 1. / np.sqrt(1 + (3 * phi[opponents] ** 2) / (np.pi ** 2))
+        expected = 1. / (1 + np.exp(-impact * (mu[players] - mu[opponents])))
+        variance_inv = np.bincount(players, weights=impact ** 2 * expected * (1 - expected), minlength=size)
+        improvement = np.bincount(players, weights=impact * (scores - expected), minlength=size)
+        played = np.bincount(players, minlength=size) > 0
+
+        variance = np.zeros(size)
+        variance[played] = 1. / variance_inv[played]
+        difference = improvement * variance
+
+        # Step 5. Determine the new sigma of the players that played.
+        new_sigmas = sigmas.copy()
+        new_sigmas[played] = self.determine_sigmas(phi[played], difference[played], variance[played], sigmas[played])[0]
+
+        # Step 6. Update the rating deviation to the new pre-rating period value.
+        phi_star = np.sqrt(phi ** 2 + new_sigmas ** 2)
+
+        # Step 7. Update the rating and RD of the players that played.
+        new_phi = phi_star.copy()
+        new_phi[played] = 1. / np.sqrt(1 / phi_star[played] ** 2 + variance_inv[played])
+        new_mu = mu + new_phi ** 2 * improvement
+
+        return new_mu, new_phi, new_sigmas
+
+    def determine_sigmas(self, phi, difference, variance, sigmas, max_iterations: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized `determine_scaled_sigma`: runs the Illinois iteration for many players at once.
+
+        Every element iterates until its own bracket is narrower than `epsilon`.
+        Elements that are still open after `max_iterations`, and batches smaller
+        than `SCALAR_BATCH_SIZE`, are solved with the scalar `solve_sigma`.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The new sigmas and the number of
+            iterations of step 4 each element needed.
+        """
+        phi = np.asarray(phi, dtype=np.float64)
+        difference = np.asarray(difference, dtype=np.float64)
+        variance = np.asarray(variance, dtype=np.float64)
+        sigmas = np.asarray(sigmas, dtype=np.float64)
+        if max_iterations is None:
+            max_iterations = self.MAX_SIGMA_ITERATIONS
+
+        size = len(sigmas)
+        if size < self.SCALAR_BATCH_SIZE:
+            solved = [self.solve_sigma(*args) for args in zip(phi.tolist(), sigmas.tolist(), difference.tolist(), variance.tolist())]
+            return np.array([s for s, _ in solved], dtype=np.float64), np.array([i for _, i in solved], dtype=np.intp)
+
+        difference_squared = difference ** 2
+        base = phi ** 2 + variance
+        tau_squared = self.tau ** 2
+        # 1. Let a = ln(s^2), and define f(x)
+        alpha = np.log(sigmas ** 2)
+
+        def f(x, idx):
+            exp_x = np.exp(x)
+            tmp = base[idx] + exp_x
+            return exp_x * (difference_squared[idx] - tmp) / (2 * tmp ** 2) - (x - alpha[idx]) / tau_squared
+
+        # 2. Set the initial values of the iterative algorithm.
+        a = alpha.copy()
+        b = np.empty(size)
+        large = difference_squared > base
+        b[large] = np.log(difference_squared[large] - base[large])
+
+        step = np.sqrt(tau_squared)
+        k = np.ones(size)
+        bracketing = np.flatnonzero(~large)
+        while bracketing.size:
+            below = f(alpha[bracketing] - k[bracketing] * step, bracketing) < 0
+            k[bracketing[below]] += 1
+            bracketing = bracketing[below]
+        b[~large] = alpha[~large] - k[~large] * step
+
+        # 3. Let fA = f(A) and f(B) = f(B)
+        everyone = np.arange(size)
+        f_a, f_b = f(a, everyone), f(b, everyone)
+
+        # 4. The Illinois steps, only on the elements whose bracket is still open.
+        iterations = np.zeros(size, dtype=np.intp)
+        active = np.flatnonzero(np.abs(b - a) > self.epsilon)
+        for _ in range(max_iterations):
+            if not active.size:
+                break
+            a_i, b_i, f_a_i, f_b_i = a[active], b[active], f_a[active], f_b[active]
+            c = a_i + (a_i - b_i) * f_a_i / (f_b_i - f_a_i)
+            f_c = f(c, active)
+            swap = f_c * f_b_i < 0
+            a[active] = np.where(swap, b_i, a_i)
+            f_a[active] = np.where(swap, f_b_i, f_a_i / 2)
+            b[active], f_b[active] = c, f_c
+            iterations[active] += 1
+            active = active[np.abs(c - a[active]) > self.epsilon]
+
+        # 5. Once |B-A| <= e, set s' <- e^(A/2)
+        new_sigmas = np.power(np.e, a / 2)
+
+        # Fall back to the scalar solver for whatever did not converge.
+        for i in active.tolist():
+            new_sigmas[i], iterations[i] = self.solve_sigma(phi[i], sigmas[i], difference[i], variance[i])
+
+        return new_sigmas, iterations
+
+    def rate_table(self, table: RatingTable, players, opponents, scores) -> None:
+        """Rate every row of `table` as one period, in place, reading its Glicko-2 scale columns."""
+        if not len(table):
+            return
+
+        mu, phi, sigmas = self.rate_scaled_period(
+            table.column('mus'), table.column('phis'), table.column('sigmas'), players, opponents, scores,
+        )
+        table.column('mus')[:] = mu
+        table.column('phis')[:] = phi
+        table.column('sigmas')[:] = sigmas
+        table.scale_up()
+
+    def expected_score_matrix(self, mu, phi) -> np.ndarray:
+        """Vectorized `expect_score` of every player against every other one.
+
+        Args:
+            mu, phi: The ratings and RDs of the players on the Glicko-2 scale.
+
+        Returns:
+            np.ndarray: `E[i, j]`, the expected score of `i` against `j`, with the g(RD) of `j`.
+        """
+        mu = np.asarray(mu, dtype=np.float64)
+        phi = np.asarray(phi, dtype=np.float64)
+        impact = 1. / np.sqrt(1 + (3 * phi ** 2) / (np.pi ** 2))
+        return 1. / (1 + np.exp(-impact[np.newaxis, :] * (mu[:, np.newaxis] - mu[np.newaxis, :])))
+
+    def quality_matrix(self, expected: np.ndarray) -> np.ndarray:
+        """Vectorized `quality_1vs1` from the matrix of `expected_score_matrix`."""
+        expected_score = (expected + 1 - expected.T) / 2
+        return 2 * (0.5 - np.abs(0.5 - expected_score))
+
+    def series_to_arrays(self, pairs: list[tuple[int, int, list[int | None]]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Expand `(index_p1, index_p2, games)` tuples into per-game arrays for `rate_period`."""
+        players, opponents, scores = [], [], []
+        outcomes = {1: (Rating.WIN, Rating.LOSS), 0: (Rating.DRAW, Rating.DRAW), -1: (Rating.LOSS, Rating.WIN)}
+        for i1, i2, games in pairs:
+            for game in games:
+                if game not in outcomes:
+                    continue
+                s1, s2 = outcomes[game]
+                players += [i1, i2]
+                opponents += [i2, i1]
+                scores += [s1, s2]
+
+        return np.array(players, dtype=np.intp), np.array(opponents, dtype=np.intp), np.array(scores, dtype=np.float64)
+
+    def rate_period_rows(self, rows: list, pairs: list[tuple[int, int, list[int | None]]]) -> None:
+        """Rate the rows of the players in `pairs` as one period, in place, with the
+        vectorized engine. Every match is rated against the ratings the rows had
+        before the period, so there is no dependency between the players.
+        """
+        table = RatingTable()
+        for i1, i2, _ in pairs:
+            for index in (i1, i2):
+                if index not in table:
+                    table.add(index, rows[index].rating, rows[index].rd, rows[index].sigma)
+        players, opponents, scores = self.series_to_arrays(pairs)
+        # The series address the rows, the table its own positions.
+        position = np.zeros(len(rows), dtype=np.intp)
+        for index in table.keys:
+            position[index] = table.index_of(index)
+        self.rate_table(table, position[players], position[opponents], scores)
+        for index in table.keys:
+            rows[index].update_stats(table[index])
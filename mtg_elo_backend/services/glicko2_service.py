@@ -2,8 +2,11 @@ import math
 from datetime import date as da
 
 from apps.leagues.models import League, LeaguePlayer
-from apps.tournaments.models import Match, Tournament
+from apps.tournaments.models import Match, RatingSnapshot, Round, Tournament
 from .helper import Rating, get_games_won_per_player, calculate_swiss_rounds, sum_bo3_results
+from .profiler import profile_stage
+from .rating_scopes import RatingScope, get_scopes
+from .unit_of_work import RatingUnitOfWork
 from apps.players.models import Player
 from django.db import transaction
 
@@ -22,12 +25,29 @@ from django.db import transaction
 
 
 class Glicko2Service(object):
-    def __init__(self, rating=Rating.DEFAULT_RATING, rd=Rating.DEFAULT_RD, sigma=Rating.SIGMA, tau=Rating.TAU, epsilon=Rating.EPSILON):
+    RATIO = Rating.RATIO
+
+    #: Every match is its own Glicko-2 rating period.
+    PERIOD_MATCH = 'match'
+    #: The matches of a round are one rating period.
+    PERIOD_ROUND = 'round'
+    #: The matches of an event are one rating period.
+    PERIOD_EVENT = 'event'
+    PERIOD_SIZES = (PERIOD_MATCH, PERIOD_ROUND, PERIOD_EVENT)
+    #: The period size used when none is given.
+    DEFAULT_PERIOD_SIZE = PERIOD_MATCH
+
+    def __init__(self, rating=Rating.DEFAULT_RATING, rd=Rating.DEFAULT_RD, sigma=Rating.SIGMA, tau=Rating.TAU, epsilon=Rating.EPSILON,
+                 scopes: list[RatingScope] | None = None, period_size: str | None = None):
         self.rating = rating
         self.rd = rd
         self.sigma = sigma
         self.tau = tau
         self.epsilon = epsilon
+        self.scopes = get_scopes() if scopes is None else scopes
+        self.period_size = self.DEFAULT_PERIOD_SIZE if period_size is None else period_size
+        if self.period_size not in self.PERIOD_SIZES:
+            raise ValueError(f'Unknown period size {self.period_size}, expected one of {", ".join(self.PERIOD_SIZES)}')
         
     def create_from_db(self, name: str) -> Rating:
         player = Player.objects.get(name=name)
@@ -52,16 +72,13 @@ class Glicko2Service(object):
     
     def dump_to_database(self, rating: Rating) -> None:
         p = Player.objects.get(name=rating.name)
-        p.rating = rating.rating
-        p.rd = rating.rd
-        p.sigma = rating.sigma
-        p.save()
+        p.update_stats(rating)
         
     def bulk_dump_to_database(self, ratings: list[Rating] | tuple[Rating]) -> None:
-        with transaction.atomic():
+        with transaction.atomic(), RatingUnitOfWork():
+            players = Player.objects.in_bulk([rating.name for rating in ratings], field_name='name')
             for rating in ratings:
-                p = Player.objects.get(name=rating.name)
-                p.update_stats(rating)
+                players[rating.name].update_stats(rating)
 
     def create_rating(self, name: str, rating=None, rd=None, sigma=None) -> Rating:
         if rating is None:
@@ -72,12 +89,12 @@ class Glicko2Service(object):
             sigma = self.sigma
         return Rating(name=name, rating=rating, rd=rd, sigma=sigma)
 
-    def scale_down(self, rating: Rating, ratio: float=173.7178) -> Rating:
+    def scale_down(self, rating: Rating, ratio: float=RATIO) -> Rating:
         r = (rating.rating - self.rating) / ratio
         rd = rating.rd / ratio
         return self.create_rating(rating.name, r, rd, rating.sigma)
 
-    def scale_up(self, rating, ratio=173.7178) -> Rating:
+    def scale_up(self, rating, ratio=RATIO) -> Rating:
         r = rating.rating * ratio + self.rating
         rd = rating.rd * ratio
         return self.create_rating(rating.name, r, rd, rating.sigma)
@@ -93,10 +110,21 @@ class Glicko2Service(object):
 
     def determine_sigma(self, rating: Rating, difference, variance) -> float:
         """Determines new sigma."""
-        rd = rating.rd
+        return self.determine_scaled_sigma(rating.rd, rating.sigma, difference, variance)
+
+    def determine_scaled_sigma(self, rd: float, sigma: float, difference: float, variance: float) -> float:
+        """Determines new sigma from the Glicko-2 scale `rd` (phi) of the player."""
+        return self.solve_sigma(rd, sigma, difference, variance)[0]
+
+    def solve_sigma(self, rd: float, sigma: float, difference: float, variance: float) -> tuple[float, int]:
+        """Illinois iteration behind `determine_scaled_sigma`.
+
+        Returns:
+            tuple[float, int]: The new sigma and the number of iterations of step 4.
+        """
         difference_squared = difference ** 2
         # 1. Let a = ln(s^2), and define f(x)
-        alpha = math.log(rating.sigma ** 2)
+        alpha = math.log(sigma ** 2)
 
         def f(x) -> float:
             """This function is twice the conditional log-posterior density of
@@ -124,7 +152,9 @@ class Glicko2Service(object):
         #     fA <- fA/2.
         # (c) Set B <- C and fB <- fC.
         # (d) Stop if |B-A| <= e. Repeat the above three steps otherwise.
+        iterations = 0
         while abs(b - a) > self.epsilon:
+            iterations += 1
             c = a + (a - b) * f_a / (f_b - f_a)
             f_c = f(c)
             if f_c * f_b < 0:
@@ -133,12 +163,33 @@ class Glicko2Service(object):
                 f_a /= 2
             b, f_b = c, f_c
         # 5. Once |B-A| <= e, set s' <- e^(A/2)
-        return math.exp(1) ** (a / 2)
+        return math.exp(1) ** (a / 2), iterations
 
     def rate(self, rating: Rating, series) -> Rating:
         # Step 2. For each player, convert the rating and RD's onto the
         #         Glicko-2 scale.
-        rating = self.scale_down(rating)
+        mu, phi, sigma = self.rate_scaled(
+            (rating.rating - self.rating) / self.RATIO,
+            rating.rd / self.RATIO,
+            rating.sigma,
+            [(actual_score, (other.rating - self.rating) / self.RATIO, other.rd / self.RATIO)
+             for actual_score, other in series],
+        )
+        # Step 8. Convert ratings and RD's back to original scale.
+        return self.create_rating(rating.name, mu * self.RATIO + self.rating, phi * self.RATIO, sigma)
+
+    def rate_scaled(self, mu: float, phi: float, sigma: float, series) -> tuple[float, float, float]:
+        """Steps 3 to 7 of `rate()` over values already on the Glicko-2 scale.
+
+        Args:
+            series: A list of `(actual_score, other_mu, other_phi)` tuples.
+
+        Returns:
+            tuple[float, float, float]: The new mu, phi and sigma.
+        """
+        if not series:
+            # If the team didn't play in the series, do only Step 6
+            return mu, math.sqrt(phi ** 2 + sigma ** 2), sigma
         # Step 3. Compute the quantity v. This is the estimated variance of the
         #         team's/player's rating based only on game outcomes.
         # Step 4. Compute the quantity difference, the estimated improvement in
@@ -146,219 +197,322 @@ class Glicko2Service(object):
         #         rating based only on game outcomes.
         variance_inv = 0
         difference = 0
-        if not series:
-            # If the team didn't play in the series, do only Step 6
-            rd_star = math.sqrt(rating.rd ** 2 + rating.sigma ** 2)
-            return self.scale_up(self.create_rating(rating.name, rating.rating, rd_star, rating.sigma)) # type: ignore
-        for actual_score, other_rating in series:
-            other_rating = self.scale_down(other_rating)
-            impact = self.reduce_impact(other_rating)
-            expected_score = self.expect_score(rating, other_rating, impact)
+        for actual_score, other_mu, other_phi in series:
+            impact = 1. / math.sqrt(1 + (3 * other_phi ** 2) / (math.pi ** 2))
+            expected_score = 1. / (1 + math.exp(-impact * (mu - other_mu)))
             variance_inv += impact ** 2 * expected_score * (1 - expected_score)
             difference += impact * (actual_score - expected_score)
         difference /= variance_inv
         variance = 1. / variance_inv
         # Step 5. Determine the new value, Sigma', ot the sigma. This
         #         computation requires iteration.
-        sigma = self.determine_sigma(rating, difference, variance)
+        sigma = self.determine_scaled_sigma(phi, sigma, difference, variance)
         # Step 6. Update the rating deviation to the new pre-rating period
         #         value, Phi*.
-        rd_star = math.sqrt(rating.rd ** 2 + sigma ** 2)
+        rd_star = math.sqrt(phi ** 2 + sigma ** 2)
         # Step 7. Update the rating and RD to the new values, Mu' and Phi'.
         rd = 1. / math.sqrt(1 / rd_star ** 2 + 1 / variance)
-        r = rating.rating + rd ** 2 * (difference / variance)
-        # Step 8. Convert ratings and RD's back to original scale.
-        return self.scale_up(self.create_rating(rating.name, r, rd, sigma))
+        r = mu + rd ** 2 * (difference / variance)
+        return r, rd, sigma
 
     def quality_1vs1(self, rating1, rating2):
-        expected_score1 = self.expect_score(rating1, rating2, self.reduce_impact(rating1))
-        expected_score2 = self.expect_score(rating2, rating1, self.reduce_impact(rating2))
-        expected_score = (expected_score1 + expected_score2) / 2
+        """Return how even a match is, from 1 for a coin flip to 0 for a sure result.
+
+        The ratings are on the Glicko-2 scale, see `scale_down`. The expected score
+        of each player uses the g(RD) of the opponent, like Step 3 of `rate()`.
+        """
+        expected_score1 = self.expect_score(rating1, rating2, self.reduce_impact(rating2))
+        expected_score2 = self.expect_score(rating2, rating1, self.reduce_impact(rating1))
+        # The chance of player 1 winning, seen from both sides.
+        expected_score = (expected_score1 + 1 - expected_score2) / 2
         return 2 * (0.5 - abs(0.5 - expected_score))
 
+    def rate_pair(self, rating1, rating2, scores: list[float]) -> tuple[Rating, Rating]:
+        """Rate both players of a match whose games all happened in one period.
+
+        Every game is against the same opponent, so g(RD) and E are computed
+        once per side and weighted by the number of games.
+
+        Args:
+            scores (list[float]): The actual score of player 1 in each game.
+        """
+        mu1, phi1 = (rating1.rating - self.rating) / self.RATIO, rating1.rd / self.RATIO
+        mu2, phi2 = (rating2.rating - self.rating) / self.RATIO, rating2.rd / self.RATIO
+        games = len(scores)
+        total = sum(scores)
+
+        rated = []
+        for mu, phi, sigma, other_mu, other_phi, score in (
+            (mu1, phi1, rating1.sigma, mu2, phi2, total),
+            (mu2, phi2, rating2.sigma, mu1, phi1, games - total),
+        ):
+            if not games:
+                mu, phi = mu, math.sqrt(phi ** 2 + sigma ** 2)
+            else:
+                impact = 1. / math.sqrt(1 + (3 * other_phi ** 2) / (math.pi ** 2))
+                expected_score = 1. / (1 + math.exp(-impact * (mu - other_mu)))
+                variance_inv = games * impact ** 2 * expected_score * (1 - expected_score)
+                difference = impact * (score - games * expected_score) / variance_inv
+                variance = 1. / variance_inv
+                sigma = self.determine_scaled_sigma(phi, sigma, difference, variance)
+                rd_star = math.sqrt(phi ** 2 + sigma ** 2)
+                phi = 1. / math.sqrt(1 / rd_star ** 2 + 1 / variance)
+                mu = mu + phi ** 2 * (difference / variance)
+            rated.append(self.create_rating(None, mu * self.RATIO + self.rating, phi * self.RATIO, sigma))
+
+        rated[0].name, rated[1].name = getattr(rating1, 'name', None), getattr(rating2, 'name', None)
+        return rated[0], rated[1]
+
     def rate_1vs1(self, p1: Player | None, p2: Player | None, games: list[int | None], tournament: Tournament,
                   p1_league: LeaguePlayer | None = None, p2_league: LeaguePlayer | None = None,
                   league: League | None = None, round_number: int | None = None) -> Match | None:
-        """_summary_
+        """Create a match and rate it in every scope of the service in a single pass.
 
         Args:
-            name_p1 (str): The name of player 1.
-            name_p2 (str): The name of player 2.
+            p1 (Player | None): Player 1, or None for a bye.
+            p2 (Player | None): Player 2, or None for a bye.
             games (list[int | None]): A list of game results where 1 means player 1 won, -1 means player 2 won, 0 means a draw and None means a not played game.
-            tournament (int): The tournament ID.
+            tournament (Tournament): The tournament of the match.
+            p1_league, p2_league (LeaguePlayer | None): The league rows of both players, required when `league` is given.
+            league (League | None): The league of the match, if any.
+            round_number (int | None): The round of the match, guessed from the matches already played when None.
         """
-        with transaction.atomic():
-            name_p1 = p1.name if p1 else 'Bye'
-            name_p2 = p2.name if p2 else 'Bye'
-            
-            match = tournament.create_match(
-                player1=p1,
-                player2=p2,
-                games=games,
-                round_number=round_number
-            )
-            
-            p1_tournament = tournament.get_or_create_tournament_rating(player=p1)[0] if p1 else None
-            p2_tournament = tournament.get_or_create_tournament_rating(player=p2)[0] if p2 else None
-            
-            if not p1 or not p2 or (league and not p1_league) or (league and not p2_league) or not p1_tournament or not p2_tournament: # type: ignore
-                return
+        with profile_stage('rate_1vs1'), transaction.atomic(), RatingUnitOfWork():
+            with profile_stage('create_match'):
+                match = tournament.create_match(
+                    player1=p1,
+                    player2=p2,
+                    games=games,
+                    round_number=round_number
+                )
             
-            result = sum_bo3_results(games)
+            context = {'tournament': tournament, 'league': league, 'p1_league': p1_league, 'p2_league': p2_league}
+            with profile_stage('catch_up_periods'):
+                self.catch_up_periods(p1, p2, context)
+            with profile_stage('rate_match'):
+                rated = self.rate_match(p1, p2, games, context)
+            if rated:
+                return match
+    
+    def catch_up_periods(self, p1: Player | None, p2: Player | None, context: dict) -> None:
+        """Apply the RD inflation of the periods both players missed before rating a live match."""
+        for scope in self.scopes:
+            period = scope.get_current_period(context)
+            rows = scope.get_rows(p1, p2, context) if period is not None else None
+            for row in rows or ():
+                if row is not None:
+                    row.inflate_to_period(period)
+    
+    def rate_match(self, p1: Player | None, p2: Player | None, games: list[int | None], context: dict) -> bool:
+        """Rate an already created match in every scope of the service.
+
+        Args:
+            context (dict): The `tournament`, `league`, `p1_league` and `p2_league` of
+                the match, and optionally the preloaded `tournament_players` by player id.
+
+        Returns:
+            bool: False when the match is not rated, because of a bye or a missing row.
+        """
+        scoped_rows = [rows for rows in (scope.get_rows(p1, p2, context) for scope in self.scopes) if rows is not None]
+        
+        if not p1 or not p2 or any(row is None for rows in scoped_rows for row in rows):
+            return False
+        
+        # The outcome of the match is the same in every scope, so it is computed once.
+        result = sum_bo3_results(games)
+        outcomes = {1: Rating.WIN, 0: Rating.DRAW, -1: Rating.LOSS}
+        scores = [outcomes[game] for game in games if game in outcomes]
+        
+        for row1, row2 in scoped_rows:
+            row1.update_matches_played(result) # type: ignore
+            row2.update_matches_played(-result) # type: ignore
             
-            if league and p1_league and p2_league: # type: ignore
-                p1_league.update_matches_played(result)
-                p2_league.update_matches_played(-result)
+            rating1, rating2 = self.rate_pair(row1, row2, scores)
+            row1.update_stats(rating1) # type: ignore
+            row2.update_stats(rating2) # type: ignore
+        
+        return True
+    
+    def resolve_players(self, names) -> dict[str, Player]:
+        """Return the players with the given names, creating the missing ones in bulk."""
+        names = set(names)
+        players = {p.name: p for p in Player.objects.filter(name__in=names)}
+        missing = [Player(name=name) for name in sorted(names) if name not in players]
+        if missing:
+            period = Player.get_current_rating_period()
+            for player in missing:
+                player.last_rated_period = period
+            Player.objects.bulk_create(missing)
+            players.update({p.name: p for p in Player.objects.filter(name__in=[m.name for m in missing])})
 
-            p1_tournament.update_matches_played(result)
-            p2_tournament.update_matches_played(-result)
+        return players
+    
+    def create_event_tournament(self, matches: list[tuple[str, str, list[int|None]]], league: League,
+                                date: str | None = None) -> Tournament:
+        """Create the tournament of an imported event with one round per Swiss round needed."""
+        q_players = len(set(list(map(lambda x: x[0], matches)) + list(map(lambda x: x[1], matches))))
+        rounds = calculate_swiss_rounds(q_players)
+        
+        tournament = Tournament.objects.create(
+            name=da.today().strftime('%d-%m-%Y') if date is None else date,
+            date=da.today() if date is None else date,
+            league=league,
+        )
+        
+        Round.objects.bulk_create([Round(tournament=tournament, number=i + 1) for i in range(rounds)])
+        
+        return tournament
+    
+    def split_periods(self, pairs: list, rounds: list[int] | None = None) -> list[list]:
+        """Split the matches of an event into the rating periods of `period_size`, in rating order.
 
-            p1.update_matches_played(result)
-            p2.update_matches_played(-result)
+        Args:
+            rounds (list[int] | None): The round of each pair. Without them, the event is a single round.
+        """
+        if not pairs:
+            return []
+        if self.period_size == self.PERIOD_MATCH:
+            return [[pair] for pair in pairs]
+        if self.period_size == self.PERIOD_ROUND and rounds is not None:
+            periods: dict[int, list] = {}
+            for pair, round_number in zip(pairs, rounds):
+                periods.setdefault(round_number, []).append(pair)
+            return [periods[round_number] for round_number in sorted(periods)]
+        return [list(pairs)]
+    
+    def rate_rows(self, rows: list, pairs: list[tuple[int, int, list[int | None]]], rounds: list[int] | None = None) -> None:
+        """Rate model rows holding `rating`, `rd` and `sigma`, in place, one rating period after the other.
 
-            r1 = self.create_rating(name_p1, p1.rating, p1.rd, p1.sigma)
-            r2 = self.create_rating(name_p2, p2.rating, p2.rd, p2.sigma)
-            
-            # Player historic rating
-            r1_aux = self.create_rating(name_p1, p1.rating, p1.rd, p1.sigma)
-            r2_aux = self.create_rating(name_p2, p2.rating, p2.rd, p2.sigma)
-            
-            # League ratings
-            if league and p1_league and p2_league: # type: ignore
-                r1_league_aux = self.create_rating(
-                    name_p1, p1_league.rating, p1_league.rd, p1_league.sigma
-                )
-                r2_league_aux = self.create_rating(
-                    name_p2, p2_league.rating, p2_league.rd, p2_league.sigma
-                )
-                
-                r1_league = self.create_rating(
-                    name_p1, p1_league.rating, p1_league.rd, p1_league.sigma
-                )
-                r2_league = self.create_rating(
-                    name_p2, p2_league.rating, p2_league.rd, p2_league.sigma
-                )
-            
+        `pairs` address the rows by their position in `rows`, see `split_periods` for `rounds`.
+        """
+        for period in self.split_periods(pairs, rounds):
+            with profile_stage('period'):
+                self.rate_period_rows(rows, period)
+    
+    def rate_period_rows(self, rows: list, pairs: list[tuple[int, int, list[int | None]]]) -> None:
+        """Rate the rows of the players in `pairs` once, with every match of the period in their
+        series and rated against the ratings the rows had before the period.
+        """
+        outcomes = {1: Rating.WIN, 0: Rating.DRAW, -1: Rating.LOSS}
+        if len(pairs) == 1:
+            i1, i2, games = pairs[0]
+            rating1, rating2 = self.rate_pair(rows[i1], rows[i2], [outcomes[game] for game in games if game in outcomes])
+            rows[i1].update_stats(rating1)
+            rows[i2].update_stats(rating2)
+            return
+        
+        scaled = {}
+        series: dict[int, list] = {}
+        for i1, i2, games in pairs:
+            for index in (i1, i2):
+                if index not in scaled:
+                    scaled[index] = ((rows[index].rating - self.rating) / self.RATIO, rows[index].rd / self.RATIO)
+                    series[index] = []
+            for game in games:
+                if game in outcomes:
+                    series[i1].append((outcomes[game], *scaled[i2]))
+                    series[i2].append((1 - outcomes[game], *scaled[i1]))
+        
+        for index, (mu, phi) in scaled.items():
+            mu, phi, sigma = self.rate_scaled(mu, phi, rows[index].sigma, series[index])
+            rows[index].update_stats(self.create_rating(None, mu * self.RATIO + self.rating, phi * self.RATIO, sigma))
+    
+    def rate_event(self, matches: list[tuple[Player | None, Player | None, list[int | None]]], context: dict,
+                   periods: dict[str, int | None] | None = None, rounds: list[int] | None = None) -> None:
+        """Rate the matches of an event in every scope of the service.
+
+        The players who miss the event are not touched, their RD is inflated
+        lazily when they come back or when it is read, see `BaseRating.inflated_rd`.
+        The rows of the attendees are snapshotted after the event.
+
+        Args:
+            matches: The players of each match, None for a bye, and its games.
+            context (dict): The `tournament`, `league` and attending `players` of the event,
+                and optionally the preloaded `tournament_players` and `league_players` by player id.
+            periods (dict | None): The current rating period of each scope by name, asked
+                to the scope when missing.
+            rounds (list[int] | None): The round of each match, to rate each round as one
+                Glicko-2 period with `PERIOD_ROUND`.
+        """
+        periods = periods or {}
+        for scope in self.scopes:
+            rows = scope.get_event_rows(context)
+            if rows is None:
+                continue
             
-            # Tournament ratings
-            r1_tournament_aux = self.create_rating(
-                name_p1, p1_tournament.rating, p1_tournament.rd, p1_tournament.sigma
-            )
-            r2_tournament_aux = self.create_rating(
-                name_p2, p2_tournament.rating, p2_tournament.rd, p2_tournament.sigma
-            )
+            period = periods[scope.name] if scope.name in periods else scope.get_current_period(context)
+            if period is not None:
+                with profile_stage(f'{scope.name}.inflate'):
+                    for row in rows:
+                        row.inflate_to_period(period)
             
-            r1_tournament = self.create_rating(
-                name_p1, p1_tournament.rating, p1_tournament.rd, p1_tournament.sigma
-            )
-            r2_tournament = self.create_rating(
-                name_p2, p2_tournament.rating, p2_tournament.rd, p2_tournament.sigma
-            )
+            index = {getattr(row, scope.player_key): i for i, row in enumerate(rows)}
+            start_ratings = [row.rating for row in rows]
             
-            p1_series = {'historic': [], 'league': [], 'tournament': []}
-            p2_series = {'historic': [], 'league': [], 'tournament': []}
-            for result in games:
-                if result == 1:
-                    p1_series['historic'].append((Rating.WIN, r2_aux))
-                    p2_series['historic'].append((Rating.LOSS, r1_aux))
-                    if league and p1_league and p2_league and r1_league_aux and r2_league_aux: # type: ignore
-                        p1_series['league'].append((Rating.WIN, r2_league_aux))
-                        p2_series['league'].append((Rating.LOSS, r1_league_aux))
-                    p1_series['tournament'].append((Rating.WIN, r2_tournament_aux))
-                    p2_series['tournament'].append((Rating.LOSS, r1_tournament_aux))
-                
-                elif result == 0:
-                    p1_series['historic'].append((Rating.DRAW, r2_aux))
-                    p2_series['historic'].append((Rating.DRAW, r1_aux))
-                    if league and p1_league and p2_league and r1_league_aux and r2_league_aux: # type: ignore
-                        p1_series['league'].append((Rating.DRAW, r2_league_aux))
-                        p2_series['league'].append((Rating.DRAW, r1_league_aux))
-                    p1_series['tournament'].append((Rating.DRAW, r2_tournament_aux))
-                    p2_series['tournament'].append((Rating.DRAW, r1_tournament_aux))
-                
-                elif result == -1:
-                    p1_series['historic'].append((Rating.LOSS, r2_aux))
-                    p2_series['historic'].append((Rating.WIN, r1_aux))
-                    if league and p1_league and p2_league and r1_league_aux and r2_league_aux: # type: ignore
-                        p1_series['league'].append((Rating.LOSS, r2_league_aux))
-                        p2_series['league'].append((Rating.WIN, r1_league_aux))
-                    p1_series['tournament'].append((Rating.LOSS, r2_tournament_aux))
-                    p2_series['tournament'].append((Rating.WIN, r1_tournament_aux))
-
-            p1.update_stats(self.rate(r1, p1_series['historic']))
-            p2.update_stats(self.rate(r2, p2_series['historic']))
-
-            if league and p1_league and p2_league and r1_league and r2_league: # type: ignore
-                p1_league.update_stats(self.rate(r1_league, p1_series['league']))
-                p2_league.update_stats(self.rate(r2_league, p2_series['league']))
+            pairs, pair_rounds = [], []
+            for position, (p1, p2, games) in enumerate(matches):
+                if p1 is None or p2 is None:
+                    continue
+                i1, i2 = index[p1.id], index[p2.id] # type: ignore
+                result = sum_bo3_results(games)
+                rows[i1].update_matches_played(result)
+                rows[i2].update_matches_played(-result)
+                pairs.append((i1, i2, games))
+                pair_rounds.append(rounds[position] if rounds is not None else 1)
             
-            p1_tournament.update_stats(self.rate(r1_tournament, p1_series['tournament']))
-            p2_tournament.update_stats(self.rate(r2_tournament, p2_series['tournament']))
+            with profile_stage(f'{scope.name}.rate'):
+                self.rate_rows(rows, pairs, pair_rounds)
             
-            return match
-        
+            if scope.tracks_tendency:
+                for row, start_rating in zip(rows, start_ratings):
+                    row.determine_last_tendency(start_rating)
+            if period is not None:
+                for row in rows:
+                    row.set_rating_period(period + 1)
+            if scope.takes_snapshots:
+                with profile_stage(f'{scope.name}.snapshots'):
+                    for row in rows:
+                        RatingSnapshot.take(row, context['tournament'], scope.name, getattr(row, scope.player_key))
     
     def rate_league_event(self, matches: list[tuple[str, str, list[int|None]]], league: League, tournament: Tournament | None = None, no_diff_on_drawn: bool = False,
                           date: str | None = None) -> None:
-        with transaction.atomic():
-            q_players = len(set(list(map(lambda x: x[0], matches)) + list(map(lambda x: x[1], matches))))
+        """Create and rate the matches of an event.
+
+        Every player, league row, tournament row and round the event needs is
+        loaded or created in bulk up front, so rating the matches does not run
+        any lookup query, and every rating change is buffered in a
+        `RatingUnitOfWork` so each row is written once at the end.
+        """
+        with profile_stage('rate_league_event'), transaction.atomic():
             # Create a new tournament if necesary
             if tournament is None:
-                rounds = calculate_swiss_rounds(q_players)
-                
-                tournament = Tournament.objects.create(
-                    name=da.today().strftime('%d-%m-%Y') if date is None else date,
-                    date=da.today() if date is None else date,
-                    league=league,
-                )
-                
-                for i in range(rounds):
-                    tournament.rounds.create(number=i + 1) # type: ignore
+                with profile_stage('create_tournament'):
+                    tournament = self.create_event_tournament(matches, league, date)
+            
+            with profile_stage('resolve_players'):
+                by_name = self.resolve_players(name for p1, p2, _ in matches for name in (p1, p2) if name != 'Bye')
+                matches = [(by_name.get(name_p1), by_name.get(name_p2), games) for name_p1, name_p2, games in matches] # type: ignore
+            
+            with profile_stage('create_matches'):
+                tournament.preload_rounds()
+                created = Match.objects.bulk_create([tournament.create_match(p1, p2, games, commit=False) for p1, p2, games in matches]) # type: ignore
             
-            players_start_ratings = {}
-            league_players_start_ratings = {}
-            players_ids = []
+            with profile_stage('load_rows'):
+                players = list(by_name.values())
+                context = {
+                    'tournament': tournament,
+                    'league': league,
+                    'players': players,
+                    'league_players': league.get_or_create_league_players(players),
+                    'tournament_players': tournament.get_or_create_tournament_ratings(players),
+                }
+                period = Player.get_current_rating_period() + 1
             
-            # For each match
-            for name_p1, name_p2, games in matches:
-                p1 = Player.objects.get_or_create(name=name_p1)[0] if name_p1 != 'Bye' else None
-                p2 = Player.objects.get_or_create(name=name_p2)[0] if name_p2 != 'Bye' else None
-                
-                p1_league = LeaguePlayer.objects.get_or_create(player=p1, league=league)[0] if p1 else None
-                p2_league = LeaguePlayer.objects.get_or_create(player=p2, league=league)[0] if p2 else None
-
-                self.rate_1vs1(p1, p2, games, tournament, p1_league, p2_league, league)
-
-                if p1 is not None and name_p1 not in players_start_ratings.keys():
-                    players_start_ratings[name_p1] = p1.rating
-                    if p1_league is not None and name_p1 not in league_players_start_ratings.keys():
-                        league_players_start_ratings[name_p1] = p1_league.rating
-                    players_ids.append(p1.id) # type: ignore
-                if p2 is not None and name_p2 not in players_start_ratings.keys():
-                    players_start_ratings[name_p2] = p2.rating
-                    if p2_league is not None and name_p2 not in league_players_start_ratings.keys():
-                        league_players_start_ratings[name_p2] = p2_league.rating
-                    players_ids.append(p2.id) # type: ignore
-                
-            for player in Player.objects.all():
-                player.determine_last_tendency(players_start_ratings.get(player.name, player.rating))
-                
-                if player.id not in players_ids: # type: ignore
-                    r = self.create_rating(
-                        player.name, player.rating, player.rd, player.sigma,
-                    )
-                    r = self.rate(r, [])
-                    player.update_stats(r)
-                    
-            for league_player in LeaguePlayer.objects.filter(league=league):
-                league_player.determine_last_tendency(league_players_start_ratings.get(league_player.player.name, league_player.rating))
-                
-                if league_player.player.id not in players_ids: # type: ignore
-                    r = self.create_rating(
-                        league_player.player.name, league_player.rating, league_player.rd, league_player.sigma,
-                    )
-                    r = self.rate(r, [])
-                    league_player.update_stats(r)
+            with profile_stage('rate_event'), RatingUnitOfWork():
+                self.rate_event(matches, context, rounds=[match.round.number for match in created]) # type: ignore
             
-            tournament.set_winner()
-            tournament.clean_empty_rounds()
+            with profile_stage('finish_tournament'):
+                tournament.rating_period = period
+                tournament.save(update_fields=['rating_period'])
+                tournament.set_winner()
+                tournament.clean_empty_rounds()
@@ -1,7 +1,10 @@
 import math
+import unicodedata
 from django.conf import settings
 
 class Rating(object):
+    __slots__ = ('name', 'rating', 'rd', 'sigma')
+
     #: The actual score for win
     WIN = settings.WIN
     #: The actual score for draw
@@ -15,6 +18,8 @@ class Rating(object):
     SIGMA = settings.SIGMA
     TAU = settings.TAU
     EPSILON = settings.EPSILON
+    #: Conversion factor between the original scale and the Glicko-2 scale
+    RATIO = 173.7178
     
     def __init__(self, name, rating=settings.DEFAULT_RATING, rd=settings.DEFAULT_RD, sigma=settings.SIGMA):
         self.name = name
@@ -41,6 +46,42 @@ def get_games_won_per_player(games: list[int | None]) -> tuple[int, int]:
     return p1_wins, p2_wins
 
 
+def games_from_scores(player1_score: int, player2_score: int) -> list[int | None]:
+    """
+    Returns the list of game results of a best of three from the games won by each player,
+    the inverse of `get_games_won_per_player` for the results stored in a `Match`.
+    """
+    played_games = player1_score + player2_score
+    total_score = player1_score - player2_score
+    
+    if total_score == 0 and played_games == 0:
+        # 0-0
+        return [0, None, None]
+    elif total_score == 1 and played_games == 1:
+        # 1-0
+        return [1, 0, None]
+    elif total_score == -1 and played_games == 1:
+        # 0-1
+        return [-1, 0, None]
+    elif total_score == 0 and played_games == 2:
+        # 1-1
+        return [1, -1, 0]
+    elif total_score == 2 and played_games == 2:
+        # 2-0
+        return [1, 1, 0]
+    elif total_score == -2 and played_games == 2:
+        # 0-2
+        return [-1, -1, 0]
+    elif total_score == 1 and played_games == 3:
+        # 2-1
+        return [1, -1, 1]
+    elif total_score == -1 and played_games == 3:
+        # 1-2
+        return [-1, 1, -1]
+    
+    return [None, None, None]
+
+
 def sum_bo3_results(games: list) -> int:
         cont = 0
         for game in games:
@@ -58,4 +99,13 @@ def calculate_swiss_rounds(num_players: int) -> int:
     """
     if num_players < 2:
         return 0
-    return math.ceil(math.log2(num_players))
\ No newline at end of file
+    return math.ceil(math.log2(num_players))
+
+
+def normalize_name(name: str) -> str:
+    """
+    Returns `name` without accents, case folded and with its whitespace collapsed,
+    so "José  Pérez" and "jose perez" are searched as the same name.
+    """
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).casefold().split())
@@ -0,0 +1,124 @@
+import hashlib
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.leagues.models import League, LeaguePlayer
+from apps.players.models import Player, RatingPeriodCache
+from apps.tournaments.models import Tournament, TournamentPlayer
+from .glicko2_batch_service import Glicko2BatchService
+from .helper import Rating
+
+
+class MatchupService(object):
+    """Expected scores and matchup quality of every pair of a group of players.
+
+    The matrices are computed at once with `Glicko2BatchService` and cached. The
+    cache key holds the version of the ratings, bumped by `invalidate` whenever
+    rating rows are written, and the current rating period of the scope, so a
+    rating change or a new event makes a new entry. The ratings are only read
+    to compute the matrices of a new entry.
+    """
+    #: Seconds a computed pair of matrices is kept in the cache.
+    CACHE_TIMEOUT = 60 * 60
+    #: The cache key of the version of the ratings.
+    VERSION_KEY = 'matchups:version'
+    #: Decimals of the values returned.
+    PRECISION = 6
+
+    def __init__(self, glicko_service: Glicko2BatchService | None = None):
+        self.glicko_service = glicko_service or Glicko2BatchService()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Bump the version of the ratings, so the cached matrices are computed again from
+        the new ratings: now, and again when the current transaction commits, as others
+        may have cached the ratings before the commit meanwhile.
+        """
+        cls.bump_version()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(cls.bump_version)
+
+    @classmethod
+    def bump_version(cls) -> None:
+        """Add one to the version of the ratings, starting it when it is not in the cache."""
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cls.get_version()
+
+    @classmethod
+    def get_version(cls) -> int:
+        """Return the version of the ratings. A lost version starts again from the clock,
+        above the versions it had before.
+        """
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, time.time_ns(), None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+
+    def get_ratings(self, player_ids: list[int], league: League | None = None, tournament: Tournament | None = None,
+                    periods: RatingPeriodCache | None = None) -> list[tuple[float, float]]:
+        """Return the rating and current RD of each player in the scope, in the order of `player_ids`.
+
+        Players without a row in the league or the tournament have the ratings of a new player.
+
+        Raises:
+            Player.DoesNotExist: When a player does not exist.
+        """
+        if tournament is not None:
+            rows = {row.player_id: row for row in TournamentPlayer.objects.filter(tournament=tournament, player_id__in=player_ids)} # type: ignore
+        elif league is not None:
+            rows = {row.player_id: row for row in LeaguePlayer.objects.filter(league=league, player_id__in=player_ids).select_related('league')} # type: ignore
+        else:
+            rows = Player.objects.in_bulk(player_ids)
+
+        if len(rows) < len(set(player_ids)):
+            missing = set(player_ids) - rows.keys() - set(Player.objects.filter(id__in=player_ids).values_list('id', flat=True))
+            if missing:
+                raise Player.DoesNotExist(f'Players with ids {sorted(missing)} do not exist')
+
+        periods = periods if periods is not None else RatingPeriodCache()
+        return [
+            (rows[player_id].rating, rows[player_id].inflated_rd(periods.get_period(rows[player_id])))
+            if player_id in rows else (Rating.DEFAULT_RATING, Rating.DEFAULT_RD)
+            for player_id in player_ids
+        ]
+
+    def get_matrices(self, player_ids: list[int], league: League | None = None, tournament: Tournament | None = None) -> dict:
+        """Return the expected score and quality matrices of the players, in the order of `player_ids`.
+
+        Returns:
+            dict: The `player_ids`, the `expected_scores` where `[i][j]` is the expected
+            score of player `i` against player `j`, and the symmetric `quality`.
+        """
+        # The current rating period of the scope inflates the RD of the inactive players.
+        periods = RatingPeriodCache()
+        if tournament is not None:
+            scope, period = ('tournament', tournament.pk), None
+        elif league is not None:
+            scope = ('league', league.pk)
+            period = periods.setdefault((LeaguePlayer, league.pk), league.get_current_rating_period())
+        else:
+            scope, period = ('historic',), periods.setdefault(Player, Player.get_current_rating_period())
+        version = self.get_version()
+        key = 'matchups:' + hashlib.sha1(repr((scope, period, version, list(player_ids))).encode()).hexdigest()
+
+        matrices = cache.get(key)
+        if matrices is None:
+            ratings = self.get_ratings(player_ids, league, tournament, periods)
+            values = np.array(ratings, dtype=np.float64).reshape(-1, 2)
+            expected = self.glicko_service.expected_score_matrix(
+                (values[:, 0] - self.glicko_service.rating) / self.glicko_service.RATIO, values[:, 1] / self.glicko_service.RATIO,
+            )
+            matrices = {
+                'player_ids': list(player_ids),
+                'expected_scores': expected.round(self.PRECISION).tolist(),
+                'quality': self.glicko_service.quality_matrix(expected).round(self.PRECISION).tolist(),
+            }
+            cache.set(key, matrices, self.CACHE_TIMEOUT)
+
+        return matrices
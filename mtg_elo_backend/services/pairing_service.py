@@ -0,0 +1,247 @@
+from collections import deque
+
+import numpy as np
+
+from apps.players.models import Player
+from apps.tournaments.models import Match, Tournament
+from .matchup_service import MatchupService
+
+
+class SwissPairingService(object):
+    """Pair the next round of a Swiss tournament.
+
+    The standings, the previous opponents and the byes come from one query on
+    the matches of the tournament, and the pairing is done in memory. Players
+    are paired inside their match points group first, and then with the most
+    even opponent by the quality matrix of `Glicko2BatchService`, never twice
+    against the same opponent unless there is no other way. When the
+    backtracking search gives up, a maximum matching of the pairs that are not
+    rematches leaves only the rematches that cannot be avoided.
+    """
+    WIN_POINTS = 3
+    DRAW_POINTS = 1
+    #: Cost of a match points of difference between opponents, above any quality difference.
+    POINTS_WEIGHT = 2
+    #: Backtracking steps before falling back to the pairing with the fewest rematches.
+    MAX_STEPS = 100_000
+
+    def __init__(self, matchup_service: MatchupService | None = None):
+        self.matchup_service = matchup_service or MatchupService()
+
+    def get_standings(self, tournament: Tournament) -> tuple[list[Player], dict[int, int], dict[int, set[int]], set[int], int]:
+        """Return the players of the tournament, their match points, their previous opponents,
+        the players who already had a bye and the number of the last round played.
+        """
+        players = {tp.player.id: tp.player for tp in tournament.ratings.select_related('player')} # type: ignore
+        points: dict[int, int] = {}
+        opponents: dict[int, set[int]] = {}
+        byes: set[int] = set()
+        last_round = 0
+
+        for player1_id, player2_id, winner_id, round_number in Match.objects.filter(round__tournament=tournament).values_list(
+            'player1_id', 'player2_id', 'winner_id', 'round__number',
+        ):
+            last_round = max(last_round, round_number)
+            for player_id, opponent_id in ((player1_id, player2_id), (player2_id, player1_id)):
+                if player_id is None:
+                    continue
+                opponents.setdefault(player_id, set())
+                if opponent_id is None:
+                    byes.add(player_id)
+                else:
+                    opponents[player_id].add(opponent_id)
+                if winner_id == player_id:
+                    points[player_id] = points.get(player_id, 0) + self.WIN_POINTS
+                elif winner_id is None and opponent_id is not None:
+                    points[player_id] = points.get(player_id, 0) + self.DRAW_POINTS
+
+        missing = opponents.keys() - players.keys()
+        if missing:
+            players.update(Player.objects.in_bulk(missing))
+
+        return list(players.values()), points, opponents, byes, last_round
+
+    def pair(self, tournament: Tournament) -> tuple[int, list[tuple[Player, Player | None]], list[int]]:
+        """Return the number of the next round, its pairings, best ranked tables first,
+        and the tables, numbered from 1, where the players already met.
+
+        With an odd number of players, the lowest ranked player without a bye
+        gets one, in the last table.
+        """
+        players, points, opponents, byes, last_round = self.get_standings(tournament)
+        order = sorted(players, key=lambda p: (-points.get(p.id, 0), -p.rating, p.id)) # type: ignore
+
+        bye = None
+        if len(order) % 2:
+            bye = next((p for p in reversed(order) if p.id not in byes), order[-1]) # type: ignore
+            order.remove(bye)
+
+        pairings: list[tuple[Player, Player | None]] = []
+        rematches: list[int] = []
+        if order:
+            index = {p.id: i for i, p in enumerate(order)} # type: ignore
+            forbidden = [{index[o] for o in opponents.get(p.id, ()) if o in index} for p in order] # type: ignore
+            quality = np.array(self.matchup_service.get_matrices([p.id for p in order])['quality']) # type: ignore
+            match_points = np.array([points.get(p.id, 0) for p in order], dtype=np.float64) # type: ignore
+            cost = self.POINTS_WEIGHT * np.abs(match_points[:, np.newaxis] - match_points[np.newaxis, :]) - quality
+            candidates = np.argsort(cost, axis=1, kind='stable')
+
+            matched = self.match(candidates, forbidden)
+            if matched is None:
+                matched = self.match_fewest_rematches(candidates, forbidden)
+            pairings = [(order[i], order[j]) for i, j in matched] # type: ignore
+            rematches = [table for table, (i, j) in enumerate(matched, start=1) if j in forbidden[i]]
+        if bye is not None:
+            pairings.append((bye, None))
+
+        return last_round + 1, pairings, rematches
+
+    def match(self, candidates: np.ndarray, forbidden: list[set[int]]) -> list[tuple[int, int]] | None:
+        """Pair every player with the first free candidate of their row, backtracking when
+        a player is left without a valid opponent.
+
+        Args:
+            candidates (np.ndarray): For each player, every player by preference.
+            forbidden (list[set[int]]): For each player, the opponents they cannot play.
+
+        Returns:
+            list[tuple[int, int]] | None: The pairs in the order they were made, or None when
+            there is no pairing, or it was not found in `MAX_STEPS`.
+        """
+        size = len(candidates)
+        rows = candidates.tolist()
+        partner = [-1] * size
+        cursor = [0] * size
+        chosen: list[int] = []
+        player = 0
+
+        for _ in range(self.MAX_STEPS):
+            while player < size and partner[player] != -1:
+                player += 1
+            if player == size:
+                return [(i, partner[i]) for i in chosen]
+
+            row = rows[player]
+            while cursor[player] < size:
+                opponent = row[cursor[player]]
+                cursor[player] += 1
+                if opponent != player and partner[opponent] == -1 and opponent not in forbidden[player]:
+                    partner[player], partner[opponent] = opponent, player
+                    chosen.append(player)
+                    break
+            else:
+                # Undo the last pairing and try its next candidate.
+                cursor[player] = 0
+                if not chosen:
+                    return None
+                player = chosen.pop()
+                partner[partner[player]] = partner[player] = -1
+
+        return None
+
+    def match_fewest_rematches(self, candidates: np.ndarray, forbidden: list[set[int]]) -> list[tuple[int, int]]:
+        """Pair every player with as few rematches as possible.
+
+        The players are paired with their first free candidate without
+        backtracking, and the pairing is grown to a maximum matching of the
+        allowed opponents by augmenting paths. The players left unpaired have
+        all met each other, so they are paired by preference as rematches.
+
+        Args:
+            candidates (np.ndarray): For each player, every player by preference.
+            forbidden (list[set[int]]): For each player, the opponents they should not play again.
+
+        Returns:
+            list[tuple[int, int]]: The pairs, in the order of their best ranked player.
+        """
+        size = len(candidates)
+        rows = candidates.tolist()
+        allowed = [[opponent for opponent in rows[player] if opponent != player and opponent not in forbidden[player]]
+                   for player in range(size)]
+        partner = [-1] * size
+
+        for player in range(size):
+            if partner[player] == -1:
+                opponent = next((opponent for opponent in allowed[player] if partner[opponent] == -1), -1)
+                if opponent != -1:
+                    partner[player], partner[opponent] = opponent, player
+        for player in range(size):
+            if partner[player] == -1:
+                self.augment(allowed, partner, player)
+
+        for player in range(size):
+            if partner[player] == -1:
+                opponent = next(opponent for opponent in rows[player] if opponent != player and partner[opponent] == -1)
+                partner[player], partner[opponent] = opponent, player
+
+        return [(player, partner[player]) for player in range(size) if player < partner[player]]
+
+    @staticmethod
+    def augment(allowed: list[list[int]], partner: list[int], root: int) -> bool:
+        """Pair the unpaired `root` along an augmenting path of Edmonds' blossom algorithm,
+        if there is one, keeping every paired player paired.
+
+        Args:
+            allowed (list[list[int]]): For each player, the opponents they can play.
+            partner (list[int]): For each player, their opponent or -1, updated in place.
+            root (int): An unpaired player.
+
+        Returns:
+            bool: Whether `root` was paired.
+        """
+        size = len(partner)
+        parent = [-1] * size
+        base = list(range(size))
+        used = [False] * size
+        used[root] = True
+        queue = deque([root])
+
+        def lowest_common_base(a: int, b: int) -> int:
+            seen = [False] * size
+            while True:
+                a = base[a]
+                seen[a] = True
+                if partner[a] == -1:
+                    break
+                a = parent[partner[a]]
+            while not seen[base[b]]:
+                b = parent[partner[base[b]]]
+            return base[b]
+
+        def mark_path(player: int, blossom_base: int, child: int, blossom: list[bool]) -> None:
+            while base[player] != blossom_base:
+                blossom[base[player]] = blossom[base[partner[player]]] = True
+                parent[player] = child
+                child = partner[player]
+                player = parent[partner[player]]
+
+        while queue:
+            player = queue.popleft()
+            for opponent in allowed[player]:
+                if base[player] == base[opponent] or partner[player] == opponent:
+                    continue
+                if opponent == root or (partner[opponent] != -1 and parent[partner[opponent]] != -1):
+                    # An odd cycle: contract it into its base.
+                    blossom_base = lowest_common_base(player, opponent)
+                    blossom = [False] * size
+                    mark_path(player, blossom_base, opponent, blossom)
+                    mark_path(opponent, blossom_base, player, blossom)
+                    for other in range(size):
+                        if blossom[base[other]]:
+                            base[other] = blossom_base
+                            if not used[other]:
+                                used[other] = True
+                                queue.append(other)
+                elif parent[opponent] == -1:
+                    parent[opponent] = player
+                    if partner[opponent] == -1:
+                        # Flip the pairs along the path back to the root.
+                        while opponent != -1:
+                            previous = partner[parent[opponent]]
+                            partner[opponent], partner[parent[opponent]] = parent[opponent], opponent
+                            opponent = previous
+                        return True
+                    used[partner[opponent]] = True
+                    queue.append(partner[opponent])
+
+        return False
@@ -0,0 +1,102 @@
+import heapq
+import time
+from bisect import bisect_left
+
+from django.db.models import Count, Max
+
+from apps.players.models import Player
+from .helper import normalize_name
+
+
+class PlayerSearchIndex(object):
+    """A sorted index of the words of every player name, searched by prefix.
+
+    Every word of a normalized name is a key, so "per" finds "José Pérez" too.
+    A query matches the players whose words start with each word of the query.
+    """
+
+    def __init__(self, players):
+        self.players: dict[int, tuple[str, int, str]] = {}
+        entries = []
+        for player_id, name, rating in players:
+            normalized = normalize_name(name)
+            self.players[player_id] = (name, rating, normalized)
+            entries.extend((word, player_id) for word in set(normalized.split()))
+        entries.sort()
+        self.words = [word for word, _ in entries]
+        self.ids = [player_id for _, player_id in entries]
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """Return up to `limit` players matching `query`, ranked.
+
+        The exact name goes first, then the names starting with the query, then
+        the ones where the query starts a later word. Ties go to the higher rating.
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        first, *rest = query.split()
+
+        start = bisect_left(self.words, first)
+        end = bisect_left(self.words, first + '\U0010ffff', start)
+        ranked = []
+        for player_id in set(self.ids[start:end]):
+            name, rating, normalized = self.players[player_id]
+            words = normalized.split()
+            if all(any(word.startswith(part) for word in words) for part in rest):
+                rank = 0 if normalized == query else 1 if normalized.startswith(query) else 2
+                ranked.append((rank, -rating, name, player_id))
+
+        return [
+            {'id': player_id, 'name': name, 'rating': -rating}
+            for _, rating, name, player_id in heapq.nsmallest(limit, ranked)
+        ]
+
+
+class PlayerSearchService(object):
+    """Typeahead of player names from an in-process `PlayerSearchIndex`.
+
+    The index is built once per process and rebuilt when the players change:
+    right away for changes made by this process, and within `CHECK_INTERVAL`
+    seconds for new or deleted players of other processes, which change the
+    count or the last id of the table. Renames and ratings of other processes
+    are picked up when the index is `MAX_AGE` seconds old.
+    """
+    #: Seconds between checks of the players table for changes.
+    CHECK_INTERVAL = 1.
+    #: Seconds after which the index is rebuilt anyway.
+    MAX_AGE = 5 * 60.
+    #: The largest number of players returned.
+    MAX_LIMIT = 50
+
+    _index: PlayerSearchIndex | None = None
+    _signature: dict | None = None
+    _built_at = 0.
+    _checked_at = 0.
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Rebuild the index on the next search."""
+        cls._index = None
+
+    def get_signature(self) -> dict:
+        return Player.objects.aggregate(count=Count('id'), last=Max('id'))
+
+    def get_index(self) -> PlayerSearchIndex:
+        cls = type(self)
+        now = time.monotonic()
+        if cls._index is not None and now - cls._built_at < self.MAX_AGE:
+            if now - cls._checked_at < self.CHECK_INTERVAL:
+                return cls._index
+            cls._checked_at = now
+            if self.get_signature() == cls._signature:
+                return cls._index
+
+        signature = self.get_signature()
+        cls._index = PlayerSearchIndex(Player.objects.values_list('id', 'name', 'rating').iterator())
+        cls._signature, cls._built_at, cls._checked_at = signature, now, now
+        return cls._index
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """Return up to `limit` players whose name matches `query`, best matches first."""
+        return self.get_index().search(query, min(limit, self.MAX_LIMIT))
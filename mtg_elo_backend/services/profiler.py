@@ -0,0 +1,133 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.db import connection
+
+
+_current: ContextVar['RatingProfiler | None'] = ContextVar('rating_profiler', default=None)
+_disabled = nullcontext()
+
+
+def profile_stage(name: str):
+    """Return a context manager measuring the stage `name` in the active profiler.
+
+    Without an active profiler it is a shared no-op context, so the stages can
+    stay in the hot path of the rating engine.
+
+    Usage:
+        with profile_stage('resolve_players'):
+            ...
+    """
+    profiler = _current.get()
+    return profiler.stage(name) if profiler is not None else _disabled
+
+
+class RatingProfiler(object):
+    """Wall time, SQL queries and rows written of each stage of a rating run.
+
+    While a profiler is active, every `profile_stage` records its time, the queries
+    run on the default database connection and the rows those queries inserted,
+    updated or deleted. Nested stages are recorded under the path of their parents,
+    and the values of a stage include the ones of its children.
+
+    Usage:
+        with RatingProfiler() as profiler:
+            glicko_service.rate_league_event(...)
+        profiler.report()
+    """
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+        self.queries = 0
+        self._rows = 0
+        self._writes: list = []
+        self._path: list[str] = []
+        self._token = None
+        self._wrapper = None
+
+    @staticmethod
+    def current() -> 'RatingProfiler | None':
+        """Return the active profiler, if any."""
+        return _current.get()
+
+    def __enter__(self) -> 'RatingProfiler':
+        self._token = _current.set(self)
+        self._wrapper = connection.execute_wrapper(self.count_query)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._wrapper.__exit__(exc_type, exc_value, traceback) # type: ignore
+        _current.reset(self._token) # type: ignore
+        self._token = self._wrapper = None
+
+    @property
+    def rows(self) -> int:
+        """The rows inserted, updated or deleted so far."""
+        # SQLite only counts the rows of an INSERT ... RETURNING once they are fetched,
+        # after the query returns, so the cursors are read when the count is needed.
+        self._rows += sum(max(cursor.rowcount, 0) for cursor in self._writes)
+        self._writes.clear()
+        return self._rows
+
+    def count_query(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        self.queries += 1
+        if sql.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self._writes.append(context['cursor'])
+        return result
+
+    @contextmanager
+    def stage(self, name: str):
+        self._path.append(name)
+        path = '/'.join(self._path)
+        # Registered on entry, so a stage is listed before its children.
+        stage = self.stages.setdefault(path, {'stage': path, 'calls': 0, 'seconds': 0., 'max_seconds': 0., 'queries': 0, 'rows': 0})
+        start, queries, rows = time.perf_counter(), self.queries, self.rows
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._path.pop()
+            stage['calls'] += 1
+            stage['seconds'] += seconds
+            stage['max_seconds'] = max(stage['max_seconds'], seconds)
+            stage['queries'] += self.queries - queries
+            stage['rows'] += self.rows - rows
+
+    def report(self) -> list[dict]:
+        """Return the recorded stages in the order they were first entered."""
+        return list(self.stages.values())
+
+    def table(self) -> str:
+        """Return the report as a text table, the stages indented under their parents."""
+        lines = [f'{"stage":<44} {"calls":>7} {"seconds":>10} {"max":>9} {"queries":>8} {"rows":>8}']
+        for stage in self.report():
+            *parents, name = stage['stage'].split('/')
+            lines.append(
+                f'{"  " * len(parents) + name:<44} {stage["calls"]:>7} {stage["seconds"]:>10.4f} {stage["max_seconds"]:>9.4f}'
+                f' {stage["queries"]:>8} {stage["rows"]:>8}'
+            )
+        lines.append(f'{"total":<44} {"":>7} {"":>10} {"":>9} {self.queries:>8} {self.rows:>8}')
+        return '\n'.join(lines)
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as file:
+            json.dump({'queries': self.queries, 'rows': self.rows, 'stages': self.report()}, file, indent=2)
+
+    def write(self, path: str, stdout, style) -> None:
+        """Write the table of the report to `stdout` when `path` is `-`, or save the report
+        to the file `path`, as the `--profile` option of the rating commands does.
+
+        Args:
+            path (str): `-` or the path of the JSON file.
+            stdout: The output of the management command.
+            style: The style of the management command.
+        """
+        if path == '-':
+            stdout.write(self.table())
+        else:
+            self.save(path)
+            stdout.write(style.SUCCESS(f'Saved the profile to: {path}'))
@@ -0,0 +1,123 @@
+from apps.players.models import BaseRating, Player
+
+
+class RatingScope(object):
+    """A family of ratings updated by every match, like the historic `Player`
+    rating or the rating inside a league or a tournament.
+
+    The rating engines only talk to scopes through this interface, so a new
+    scope (a per-`Format` rating, for instance) is one subclass decorated with
+    `register_scope` instead of another copy of the rating code.
+    """
+    #: The name of the scope, used as key in the engines.
+    name = ''
+    #: The attribute of the rows holding the id of their player.
+    player_key = 'player_id'
+    #: Whether the rows of the scope track `last_tendency` after each event.
+    tracks_tendency = False
+    #: Whether a `RatingSnapshot` of the rows is taken after each event.
+    takes_snapshots = True
+
+    def get_rows(self, p1: Player | None, p2: Player | None, context: dict) -> tuple[BaseRating | None, BaseRating | None] | None:
+        """Return the rows of both players of a match in this scope.
+
+        Args:
+            context (dict): The `tournament`, `league`, `p1_league` and `p2_league` of the match,
+                and optionally the preloaded `tournament_players` by player id.
+
+        Returns:
+            The rows of both players, with None for a missing one, or None when
+            the scope does not apply to the match.
+        """
+        raise NotImplementedError
+
+    def get_event_rows(self, context: dict) -> list[BaseRating] | None:
+        """Return the rows of the attendees of an event, creating the missing ones,
+        or None when the scope does not apply to it.
+
+        Args:
+            context (dict): The `tournament`, `league` and attending `players` of the event, and
+                optionally the preloaded `league_players` and `tournament_players` by player id.
+        """
+        raise NotImplementedError
+
+    def get_current_period(self, context: dict) -> int | None:
+        """Return the current rating period of the scope, or None when the scope
+        does not inflate the RD of inactive players.
+        """
+        return None
+
+
+_scopes: list[RatingScope] = []
+
+
+def register_scope(scope_class: type[RatingScope]) -> type[RatingScope]:
+    """Class decorator adding a scope to the ones rated by default."""
+    _scopes.append(scope_class())
+    return scope_class
+
+
+def get_scopes() -> list[RatingScope]:
+    """Return the registered scopes, in registration order."""
+    return list(_scopes)
+
+
+@register_scope
+class HistoricScope(RatingScope):
+    name = 'historic'
+    player_key = 'id'
+    tracks_tendency = True
+
+    def get_rows(self, p1, p2, context):
+        return p1, p2
+
+    def get_event_rows(self, context):
+        return list(context['players'])
+
+    def get_current_period(self, context):
+        return Player.get_current_rating_period()
+
+
+@register_scope
+class LeagueScope(RatingScope):
+    name = 'league'
+    tracks_tendency = True
+
+    def get_rows(self, p1, p2, context):
+        if not context.get('league'):
+            return None
+        return context.get('p1_league'), context.get('p2_league')
+
+    def get_event_rows(self, context):
+        if not context.get('league'):
+            return None
+        if 'league_players' in context:
+            league_players = context['league_players']
+        else:
+            league_players = context['league'].get_or_create_league_players(context['players'])
+        return [league_players[p.id] for p in context['players']]
+
+    def get_current_period(self, context):
+        if not context.get('league'):
+            return None
+        return context['league'].get_current_rating_period()
+
+
+@register_scope
+class TournamentScope(RatingScope):
+    name = 'tournament'
+    # The rows already belong to a single tournament.
+    takes_snapshots = False
+
+    def get_rows(self, p1, p2, context):
+        tournament = context['tournament']
+        if 'tournament_players' in context:
+            return tuple(context['tournament_players'].get(p.id) if p else None for p in (p1, p2))
+        return tuple(tournament.get_or_create_tournament_rating(player=p)[0] if p else None for p in (p1, p2))
+
+    def get_event_rows(self, context):
+        if 'tournament_players' in context:
+            tournament_players = context['tournament_players']
+        else:
+            tournament_players = context['tournament'].get_or_create_tournament_ratings(context['players'])
+        return [tournament_players[p.id] for p in context['players']]
@@ -0,0 +1,170 @@
+from array import array
+from typing import Hashable, Iterable
+
+import numpy as np
+
+from .helper import Rating
+
+
+class RatingView(object):
+    """Single player access to a row of a `RatingTable`.
+
+    It quacks like `Rating`, so it can be passed to `Glicko2Service.rate()`
+    without allocating a new object per step.
+    """
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: 'RatingTable', index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self) -> Hashable:
+        return self.table.keys[self.index]
+
+    @property
+    def rating(self) -> float:
+        return self.table.ratings[self.index]
+
+    @rating.setter
+    def rating(self, value: float) -> None:
+        self.table.ratings[self.index] = value
+        self.table.mus[self.index] = (value - self.table.default_rating) / self.table.ratio
+
+    @property
+    def rd(self) -> float:
+        return self.table.rds[self.index]
+
+    @rd.setter
+    def rd(self, value: float) -> None:
+        self.table.rds[self.index] = value
+        self.table.phis[self.index] = value / self.table.ratio
+
+    @property
+    def sigma(self) -> float:
+        return self.table.sigmas[self.index]
+
+    @sigma.setter
+    def sigma(self, value: float) -> None:
+        self.table.sigmas[self.index] = value
+
+    @property
+    def mu(self) -> float:
+        return self.table.mus[self.index]
+
+    @property
+    def phi(self) -> float:
+        return self.table.phis[self.index]
+
+    def __repr__(self):
+        c = type(self)
+        args = (c.__module__, c.__name__, self.rating, self.rd, self.sigma)
+        return '%s.%s(mu=%.3f, phi=%.3f, sigma=%.3f)' % args
+
+
+class RatingTable(object):
+    """Struct-of-arrays storage for the ratings of many players.
+
+    Rows are addressed by any hashable key: a player id, or a `(scope, id)`
+    tuple so the historic, league and tournament scopes can share a table.
+    The Glicko-2 scale values (`mus` and `phis`) are kept alongside the
+    original ones, so scale conversions happen once per period instead of
+    once per opponent.
+    """
+    RATIO = Rating.RATIO
+
+    def __init__(self, default_rating: float = Rating.DEFAULT_RATING, default_rd: float = Rating.DEFAULT_RD,
+                 default_sigma: float = Rating.SIGMA, ratio: float = RATIO):
+        self.default_rating = default_rating
+        self.default_rd = default_rd
+        self.default_sigma = default_sigma
+        self.ratio = ratio
+
+        self.keys: list[Hashable] = []
+        self.indexes: dict[Hashable, int] = {}
+        self.ratings = array('d')
+        self.rds = array('d')
+        self.sigmas = array('d')
+        self.mus = array('d')
+        self.phis = array('d')
+
+    @classmethod
+    def from_rows(cls, rows: Iterable, key: str = 'id', **kwargs) -> 'RatingTable':
+        """Build a table from model rows holding `rating`, `rd` and `sigma`, keyed by `key`."""
+        table = cls(**kwargs)
+        for row in rows:
+            table.add(getattr(row, key), row.rating, row.rd, row.sigma)
+
+        return table
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.indexes
+
+    def __getitem__(self, key: Hashable) -> RatingView:
+        return RatingView(self, self.indexes[key])
+
+    def add(self, key: Hashable, rating: float | None = None, rd: float | None = None, sigma: float | None = None) -> int:
+        """Append a row for `key` and return its index. Missing values take the table defaults."""
+        if key in self.indexes:
+            raise KeyError(f'{key!r} is already in the table')
+
+        rating = self.default_rating if rating is None else rating
+        rd = self.default_rd if rd is None else rd
+        index = len(self.keys)
+
+        self.keys.append(key)
+        self.indexes[key] = index
+        self.ratings.append(rating)
+        self.rds.append(rd)
+        self.sigmas.append(self.default_sigma if sigma is None else sigma)
+        self.mus.append((rating - self.default_rating) / self.ratio)
+        self.phis.append(rd / self.ratio)
+
+        return index
+
+    def index_of(self, key: Hashable, create: bool = False) -> int:
+        """Return the index of `key`, appending a default row first if `create` is set."""
+        if create and key not in self.indexes:
+            return self.add(key)
+        return self.indexes[key]
+
+    def view(self, key: Hashable) -> RatingView:
+        return self[key]
+
+    def column(self, name: str) -> np.ndarray:
+        """Zero-copy NumPy view over one of the columns. Do not append rows while holding it."""
+        return np.frombuffer(getattr(self, name), dtype=np.float64)
+
+    def scale_down(self) -> None:
+        """Recompute the Glicko-2 scale columns from the original scale ones."""
+        self.column('mus')[:] = (self.column('ratings') - self.default_rating) / self.ratio
+        self.column('phis')[:] = self.column('rds') / self.ratio
+
+    def scale_up(self) -> None:
+        """Recompute the original scale columns from the Glicko-2 scale ones."""
+        self.column('ratings')[:] = self.column('mus') * self.ratio + self.default_rating
+        self.column('rds')[:] = self.column('phis') * self.ratio
+
+    def update(self, ratings, rds, sigmas) -> None:
+        """Replace every row with new original scale values and keep the Glicko-2 scale in sync."""
+        self.column('ratings')[:] = ratings
+        self.column('rds')[:] = rds
+        self.column('sigmas')[:] = sigmas
+        self.scale_down()
+
+    def dump_to_rows(self, rows: Iterable, key: str = 'id') -> list:
+        """Copy the table values into the model rows whose `key` is in the table and return them."""
+        updated = []
+        for row in rows:
+            index = self.indexes.get(getattr(row, key))
+            if index is None:
+                continue
+            row.rating = self.ratings[index]
+            row.rd = self.rds[index]
+            row.sigma = self.sigmas[index]
+            updated.append(row)
+
+        return updated
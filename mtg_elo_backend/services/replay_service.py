@@ -0,0 +1,222 @@
+import copy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import groupby, repeat
+from operator import itemgetter
+
+import django
+from django.db import transaction
+
+from apps.leagues.models import League, LeaguePlayer
+from apps.players.models import Player
+from apps.tournaments.models import Match, RatingSnapshot, Tournament, TournamentPlayer
+from .glicko2_service import Glicko2Service
+from .helper import games_from_scores
+from .rating_scopes import HistoricScope, LeagueScope
+from .unit_of_work import RatingUnitOfWork
+
+
+def replay_league(glicko_service: 'Glicko2Service', league_id: int) -> tuple[int, int, dict[int, tuple], list[tuple]]:
+    """Replay the league scope of one league without writing to the database.
+
+    League ratings never depend on the matches of other leagues, so every league
+    can be replayed on its own, with its own database connection.
+
+    Returns:
+        tuple: The id of the league, its rating period after the replay, the
+        `RatingSnapshot.SNAPSHOT_FIELDS` of each player by id, and the
+        `(tournament_id, player_id, fields)` of every snapshot.
+    """
+    glicko_service = copy.copy(glicko_service)
+    glicko_service.scopes = [LeagueScope()]
+    league = League.objects.get(id=league_id)
+    tournaments = Tournament.objects.filter(league=league).in_bulk()
+    players: dict[int, Player] = {}
+    rows: dict[int, LeaguePlayer] = {}
+
+    period = 0
+    with RatingUnitOfWork() as unit_of_work:
+        for tournament_id, matches in ReplayService().iter_events(Match.objects.filter(round__tournament__league=league)):
+            for player_id in {player_id for p1, p2, *_ in matches for player_id in (p1, p2) if player_id is not None}:
+                if player_id not in players:
+                    players[player_id] = Player(id=player_id)
+                    rows[player_id] = LeaguePlayer(league=league, player_id=player_id, last_rated_period=period)
+            attendees = list({p: players[p] for p1, p2, *_ in matches for p in (p1, p2) if p is not None}.values())
+
+            glicko_service.rate_event(
+                [(players.get(p1), players.get(p2), games) for p1, p2, games, _ in matches], # type: ignore
+                {'tournament': tournaments[tournament_id], 'league': league, 'players': attendees, 'league_players': rows},
+                {LeagueScope.name: period}, [round_number for *_, round_number in matches],
+            )
+            period += 1
+
+        snapshots = [
+            (snapshot.tournament_id, snapshot.player_id, tuple(getattr(snapshot, f) for f in RatingSnapshot.SNAPSHOT_FIELDS)) # type: ignore
+            for snapshot in unit_of_work.pending(RatingSnapshot)
+        ]
+        unit_of_work.discard()
+
+    return league_id, period, {
+        player_id: tuple(getattr(row, field) for field in RatingSnapshot.SNAPSHOT_FIELDS) for player_id, row in rows.items()
+    }, snapshots
+
+
+class ReplayService(object):
+    """Rebuild every rating from the matches stored in the database.
+
+    The matches are streamed ordered by tournament date and round, every
+    rating row is kept in memory while the events are rated, and the final
+    state is written back with bulk operations in a single transaction. A
+    change of the rating parameters or a fix of a result is then a replay
+    instead of a `restart_database` and a new import of every event.
+    """
+    #: Matches fetched from the database per round trip.
+    CHUNK_SIZE = 2000
+
+    def __init__(self, glicko_service: Glicko2Service | None = None):
+        self.glicko_service = glicko_service or Glicko2Service()
+
+    def iter_events(self, matches=None, event_ordering: tuple[str, ...] = ('round__tournament__date',)):
+        """Yield the id of each tournament with its matches as `(player1_id, player2_id, games, round_number)`,
+        in the order the events are rated.
+
+        The games are taken from `Match.games`, or rebuilt from the scores for
+        the matches stored before it existed.
+
+        Args:
+            matches (QuerySet | None): The matches to stream, all of them when None.
+            event_ordering (tuple[str, ...]): The fields ordering the tournaments.
+        """
+        if matches is None:
+            matches = Match.objects.all()
+        rows = matches.order_by(*event_ordering, 'round__tournament_id', 'round__number', 'id').values_list(
+            'round__tournament_id', 'player1_id', 'player2_id', 'player1_score', 'player2_score', 'games', 'round__number',
+        ).iterator(chunk_size=self.CHUNK_SIZE)
+
+        for tournament_id, matches in groupby(rows, key=itemgetter(0)):
+            yield tournament_id, [
+                (player1_id, player2_id, games if games is not None else games_from_scores(player1_score, player2_score), round_number)
+                for _, player1_id, player2_id, player1_score, player2_score, games, round_number in matches
+            ]
+
+    def replay(self, parallel_leagues: bool = False, max_workers: int | None = None) -> dict[str, int]:
+        """Reset every rating and rate again every event stored in the database.
+
+        Args:
+            parallel_leagues (bool): Replay the league scope of each league in a worker process
+                with `replay_league`, while this process replays the historic and tournament
+                scopes in one ordered pass. Everything is written in the same transaction.
+            max_workers (int | None): The size of the process pool, one per CPU when None.
+                With 1 the leagues are replayed in this process.
+
+        Returns:
+            dict[str, int]: The number of events and matches replayed.
+        """
+        glicko_service = self.glicko_service
+        if parallel_leagues:
+            glicko_service = copy.copy(self.glicko_service)
+            glicko_service.scopes = [scope for scope in self.glicko_service.scopes if scope.name != LeagueScope.name]
+
+        executor = None
+        if parallel_leagues and max_workers != 1:
+            # Spawned workers do not inherit the database connection of this process.
+            executor = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup)
+
+        with executor or nullcontext(), transaction.atomic(), RatingUnitOfWork():
+            if parallel_leagues:
+                # The workers start right away, the results are merged after the ordered pass.
+                league_ids = list(League.objects.values_list('id', flat=True))
+                replayed_leagues = (executor.map if executor else map)(replay_league, repeat(self.glicko_service), league_ids)
+
+            players = Player.objects.in_bulk()
+            tournaments = Tournament.objects.select_related('league').in_bulk()
+            league_players = {(lp.league_id, lp.player_id): lp for lp in LeaguePlayer.objects.all()} # type: ignore
+            tournament_players = {(tp.tournament_id, tp.player_id): tp for tp in TournamentPlayer.objects.all()} # type: ignore
+
+            for row in (*players.values(), *league_players.values(), *tournament_players.values()):
+                row.reset_stats(None)
+            for tournament in tournaments.values():
+                tournament.rating_period = None
+            RatingSnapshot.objects.all().delete()
+
+            period = 0
+            league_periods: dict[int, int] = {}
+            events = matches_count = 0
+            for tournament_id, matches in self.iter_events():
+                tournament = tournaments[tournament_id]
+                league_id = tournament.league_id # type: ignore
+                rounds = [round_number for *_, round_number in matches]
+                matches = [(players.get(p1), players.get(p2), games) for p1, p2, games, _ in matches] # type: ignore
+                attendees = list({p.id: p for p1, p2, _ in matches for p in (p1, p2) if p is not None}.values()) # type: ignore
+
+                context = {
+                    'tournament': tournament,
+                    'league': tournament.league if league_id else None,
+                    'players': attendees,
+                    'tournament_players': self._get_rows(tournament_players, TournamentPlayer, 'tournament', tournament, attendees),
+                }
+                periods = {HistoricScope.name: period}
+                self._start_periods(attendees, period)
+                if league_id and not parallel_leagues:
+                    context['league_players'] = self._get_rows(league_players, LeaguePlayer, 'league', tournament.league, attendees)
+                    periods[LeagueScope.name] = league_periods.get(league_id, 0)
+                    league_periods[league_id] = periods[LeagueScope.name] + 1
+                    self._start_periods(context['league_players'].values(), periods[LeagueScope.name])
+
+                glicko_service.rate_event(matches, context, periods, rounds)
+
+                period += 1
+                tournament.rating_period = period
+                if tournament.winner_id is None and attendees: # type: ignore
+                    tournament.winner = max(context['tournament_players'].values(), key=lambda tp: tp.rating).player
+
+                events += 1
+                matches_count += len(matches)
+
+            if parallel_leagues:
+                for league_id, league_period, rows, snapshots in replayed_leagues:
+                    league_periods[league_id] = league_period
+                    self._merge_league(league_players, league_id, rows, snapshots)
+
+            # The players who never played start at the current period, like a new player.
+            self._start_periods(players.values(), period)
+            for (scope_id, _), league_player in league_players.items():
+                self._start_periods([league_player], league_periods.get(scope_id, 0))
+
+            Tournament.objects.bulk_update(tournaments.values(), ['rating_period', 'winner'], batch_size=RatingUnitOfWork.BATCH_SIZE)
+
+        return {'events': events, 'matches': matches_count}
+
+    def _merge_league(self, league_players: dict, league_id: int, rows: dict[int, tuple], snapshots: list[tuple]) -> None:
+        """Copy the league rows and snapshots replayed by `replay_league` into the unit of work."""
+        for player_id, values in rows.items():
+            row = league_players.setdefault((league_id, player_id), LeaguePlayer(league_id=league_id, player_id=player_id))
+            for field, value in zip(RatingSnapshot.SNAPSHOT_FIELDS, values):
+                setattr(row, field, value)
+            row.save_fields(*RatingSnapshot.SNAPSHOT_FIELDS)
+
+        for tournament_id, player_id, values in snapshots:
+            RatingSnapshot(
+                tournament_id=tournament_id, player_id=player_id, scope=LeagueScope.name,
+                **dict(zip(RatingSnapshot.SNAPSHOT_FIELDS, values)),
+            ).save_fields(*RatingSnapshot.SNAPSHOT_FIELDS)
+
+    def _get_rows(self, rows: dict, model: type, scope_field: str, scope, attendees: list[Player]) -> dict:
+        """Return the rows of the attendees in `scope` keyed by player id, adding the missing
+        ones to `rows`. New rows are inserted when the unit of work is flushed.
+        """
+        by_player = {}
+        for player in attendees:
+            key = (scope.id, player.id) # type: ignore
+            if key not in rows:
+                rows[key] = model(**{scope_field: scope, 'player': player})
+                rows[key].reset_stats(None)
+            by_player[player.id] = rows[key] # type: ignore
+        return by_player
+
+    def _start_periods(self, rows, period: int) -> None:
+        """Start counting the missed periods of the rows rated for the first time at `period`."""
+        for row in rows:
+            if row.last_rated_period is None:
+                row.set_rating_period(period)
@@ -0,0 +1,162 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import django
+import numpy as np
+
+from apps.tournaments.models import Tournament
+from .glicko2_batch_service import Glicko2BatchService
+from .helper import calculate_swiss_rounds
+from .matchup_service import MatchupService
+from .pairing_service import SwissPairingService
+
+
+def simulate_batch(match_odds: np.ndarray, points: np.ndarray, rounds: int, top_cut: int, size: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Play `size` times the remaining Swiss rounds and the top cut of a tournament.
+
+    Every simulation is a row of the arrays, so each round is a handful of NumPy
+    operations over the whole batch. A Swiss round pairs the players in order of
+    match points, with a random tie-break and no rematch check, and the top cut is
+    a single elimination bracket seeded by the final standings.
+
+    Args:
+        match_odds (np.ndarray): `P[i, j]`, the probability of `i` winning a match against `j`.
+        points (np.ndarray): The match points of each player before the simulation.
+        rounds (int): The Swiss rounds left.
+        top_cut (int): The players in the single elimination bracket, a power of 2.
+        size (int): The number of simulations.
+        seed (int): The seed of the random generator of the batch.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: How many times each player made the top cut and won.
+    """
+    rng = np.random.default_rng(seed)
+    count = len(points)
+    rows = np.arange(size)[:, np.newaxis]
+    standings = np.tile(np.asarray(points, dtype=np.int16), (size, 1))
+
+    # Sorting small integer keys is a radix sort, much faster than sorting floats.
+    max_points = int(standings.max(initial=0)) + SwissPairingService.WIN_POINTS * rounds
+    tie_break = np.iinfo(np.int16).max // (max_points + 1)
+
+    def rank() -> np.ndarray:
+        keys = (max_points - standings) * tie_break + rng.integers(0, tie_break, (size, count), dtype=np.int16)
+        return np.argsort(keys, axis=1, kind='stable')
+
+    for _ in range(rounds):
+        order = rank()
+        if count % 2:
+            standings[rows[:, 0], order[:, -1]] += SwissPairingService.WIN_POINTS
+            order = order[:, :-1]
+        players, opponents = order[:, 0::2], order[:, 1::2]
+        won = rng.random(players.shape) < match_odds[players, opponents]
+        standings[rows, players] += SwissPairingService.WIN_POINTS * won
+        standings[rows, opponents] += SwissPairingService.WIN_POINTS * ~won
+
+    seeds = rank()[:, :top_cut]
+    top_cut_count = np.bincount(seeds.ravel(), minlength=count)
+
+    # Seed the bracket so that the first seed meets the second one only in the final.
+    bracket = np.array([0])
+    while len(bracket) < top_cut:
+        bracket = np.stack([bracket, 2 * len(bracket) - 1 - bracket], axis=1).ravel()
+    alive = seeds[:, bracket]
+    while alive.shape[1] > 1:
+        players, opponents = alive[:, 0::2], alive[:, 1::2]
+        won = rng.random(players.shape) < match_odds[players, opponents]
+        alive = np.where(won, players, opponents)
+
+    return top_cut_count, np.bincount(alive.ravel(), minlength=count)
+
+
+class TournamentSimulationService(object):
+    """Estimate the odds of the players of a tournament by Monte Carlo simulation.
+
+    The rest of the tournament is played many times from the current standings
+    with the match odds of the Glicko-2 ratings, in batches of simulations that
+    can be spread over a process pool.
+    """
+    SIMULATIONS = 20_000
+    BATCH_SIZE = 5_000
+    TOP_CUT = 8
+
+    def __init__(self, glicko_service: Glicko2BatchService | None = None, max_workers: int | None = 1):
+        """
+        Args:
+            glicko_service (Glicko2BatchService | None): The engine of the expected scores.
+            max_workers (int | None): The size of the process pool, one per CPU when None.
+                With 1, the default, the batches are simulated in this process.
+        """
+        self.glicko_service = glicko_service or Glicko2BatchService()
+        self.matchup_service = MatchupService(self.glicko_service)
+        self.pairing_service = SwissPairingService(self.matchup_service)
+        self.max_workers = max_workers
+
+    def get_match_odds(self, player_ids: list[int]) -> np.ndarray:
+        """Return `P[i, j]`, the probability of `i` winning a best of three against `j`.
+
+        The game odds are the symmetric `expect_score` of the players.
+        """
+        values = np.array(self.matchup_service.get_ratings(player_ids), dtype=np.float64).reshape(-1, 2)
+        expected = self.glicko_service.expected_score_matrix(
+            (values[:, 0] - self.glicko_service.rating) / self.glicko_service.RATIO, values[:, 1] / self.glicko_service.RATIO,
+        )
+        game = (expected + 1 - expected.T) / 2
+        return game ** 2 * (3 - 2 * game)
+
+    def simulate(self, tournament: Tournament, simulations: int = SIMULATIONS, rounds: int | None = None, seed: int | None = None) -> dict:
+        """Simulate the remaining rounds of `tournament` and its top cut.
+
+        Args:
+            simulations (int): The number of simulations.
+            rounds (int | None): The total Swiss rounds, from `calculate_swiss_rounds` when None.
+            seed (int | None): The seed of the simulations, for reproducible odds.
+
+        Returns:
+            dict: The `simulations`, the `rounds_left`, the size of the `top_cut` and the
+            `players` with their `points` and their `top_cut` and `win` probabilities,
+            most likely winner first.
+        """
+        players, points, _, _, last_round = self.pairing_service.get_standings(tournament)
+        if rounds is None:
+            rounds = calculate_swiss_rounds(len(players))
+        rounds_left = max(rounds - last_round, 0)
+        top_cut = 1 << (min(self.TOP_CUT, len(players)).bit_length() - 1) if players else 0
+
+        player_ids = [player.id for player in players] # type: ignore
+        initial_points = np.array([points.get(player_id, 0) for player_id in player_ids], dtype=np.float64)
+        top_cut_count = np.zeros(len(players), dtype=np.int64)
+        win_count = np.zeros(len(players), dtype=np.int64)
+
+        if players:
+            match_odds = self.get_match_odds(player_ids)
+            sizes = [min(self.BATCH_SIZE, simulations - start) for start in range(0, simulations, self.BATCH_SIZE)]
+            seeds = np.random.SeedSequence(seed).generate_state(len(sizes)).tolist()
+            for batch_top_cut, batch_wins in self.run_batches(match_odds, initial_points, rounds_left, top_cut, sizes, seeds):
+                top_cut_count += batch_top_cut
+                win_count += batch_wins
+
+        results = [
+            {
+                'id': player.id, # type: ignore
+                'name': player.name,
+                'points': int(initial_points[index]),
+                'top_cut': top_cut_count[index] / simulations,
+                'win': win_count[index] / simulations,
+            }
+            for index, player in enumerate(players)
+        ]
+        results.sort(key=lambda result: (-result['win'], -result['top_cut'], result['name']))
+
+        return {'simulations': simulations, 'rounds_left': rounds_left, 'top_cut': top_cut, 'players': results}
+
+    def run_batches(self, match_odds: np.ndarray, points: np.ndarray, rounds: int, top_cut: int, sizes: list[int], seeds: list[int]):
+        """Run `simulate_batch` for each batch, in the process pool when there are several."""
+        arguments = (repeat(match_odds), repeat(points), repeat(rounds), repeat(top_cut), sizes, seeds)
+        if self.max_workers == 1 or len(sizes) < 2:
+            return list(map(simulate_batch, *arguments))
+
+        # Spawned workers do not inherit the database connection of this process.
+        with ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup) as executor:
+            return list(executor.map(simulate_batch, *arguments))
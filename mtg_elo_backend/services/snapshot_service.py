@@ -0,0 +1,98 @@
+from datetime import date as da
+
+from django.db.models import F, Max, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.leagues.models import League
+from apps.players.models import BaseRating
+from apps.tournaments.models import RatingSnapshot, Tournament
+from .helper import Rating
+from .rating_scopes import HistoricScope, LeagueScope
+
+
+class SnapshotService(object):
+    """Answer historical rating questions from the `RatingSnapshot` table.
+
+    A snapshot holds the rating of a participant right after a rated tournament,
+    so the rating of anyone at any point of the history is their latest snapshot
+    before it, one indexed query instead of a replay.
+    """
+
+    def get_scope(self, league: League | None) -> str:
+        """Return the scope of the snapshots of `league`, or the historic one when None."""
+        return LeagueScope.name if league is not None else HistoricScope.name
+
+    def get_period_as_of(self, date: da, league: League | None = None) -> int:
+        """Return the rating period of the scope once the tournaments played up to `date` were rated."""
+        tournaments = Tournament.objects.filter(date__lte=date, rating_period__isnull=False)
+        if league is not None:
+            return tournaments.filter(league=league).count()
+        return tournaments.aggregate(period=Max('rating_period'))['period'] or 0
+
+    def leaderboard_as_of(self, date: da, league: League | None = None) -> QuerySet[RatingSnapshot]:
+        """Return the latest snapshot of every player up to `date`, best rated first.
+
+        Args:
+            date (date): The last day of the tournaments taken into account.
+            league (League | None): The league of the leaderboard, the historic one when None.
+        """
+        snapshots = RatingSnapshot.objects.filter(scope=self.get_scope(league), tournament__date__lte=date)
+        if league is not None:
+            snapshots = snapshots.filter(tournament__league=league)
+
+        latest = snapshots.filter(player=OuterRef('player')).order_by('-tournament__rating_period').values('id')[:1]
+        return snapshots.filter(id=Subquery(latest)).select_related('player').order_by('-rating', 'rd')
+
+    def event_deltas(self, tournament: Tournament, scope: str = HistoricScope.name) -> QuerySet[RatingSnapshot]:
+        """Return the snapshots of the participants of `tournament` annotated with the
+        `previous_rating` they had before it and their `rating_delta`, biggest gain first.
+        """
+        previous = self.snapshots_before(tournament.rating_period, scope, league_id=tournament.league_id) # type: ignore
+        previous = previous.filter(player=OuterRef('player')).order_by('-tournament__rating_period').values('rating')[:1]
+        return RatingSnapshot.objects.filter(tournament=tournament, scope=scope).annotate(
+            previous_rating=Coalesce(Subquery(previous), Value(Rating.DEFAULT_RATING)),
+        ).annotate(rating_delta=F('rating') - F('previous_rating')).select_related('player').order_by('-rating_delta', 'player__name')
+
+    def player_event_deltas(self, player_id: int, tournament_ids=None) -> dict[int, int]:
+        """Return the historic rating change of a player in each of their rated tournaments, by tournament id.
+
+        Args:
+            tournament_ids (Iterable[int] | None): The tournaments returned, all of them when None.
+        """
+        snapshots = RatingSnapshot.objects.filter(player_id=player_id, scope=HistoricScope.name).order_by('tournament__rating_period')
+        tournament_ids = set(tournament_ids) if tournament_ids is not None else None
+        deltas, previous = {}, Rating.DEFAULT_RATING
+        for tournament_id, rating in snapshots.values_list('tournament_id', 'rating'):
+            if tournament_ids is None or tournament_id in tournament_ids:
+                deltas[tournament_id] = rating - previous
+            previous = rating
+        return deltas
+
+    def snapshots_before(self, period: int, scope: str, player_ids=None, league_id: int | None = None) -> QuerySet[RatingSnapshot]:
+        """Return the snapshots of `scope` taken by the tournaments rated before the historic `period`.
+
+        Args:
+            player_ids (Iterable[int] | None): The players of the snapshots, all of them when None.
+            league_id (int | None): The league of the snapshots, required for the league scope.
+        """
+        snapshots = RatingSnapshot.objects.filter(scope=scope, tournament__rating_period__lt=period)
+        if player_ids is not None:
+            snapshots = snapshots.filter(player_id__in=player_ids)
+        if scope == LeagueScope.name:
+            snapshots = snapshots.filter(tournament__league_id=league_id)
+        return snapshots
+
+    def restore_rows(self, rows: list[BaseRating], snapshots: QuerySet[RatingSnapshot], period: int) -> None:
+        """Restore each row from its latest snapshot in `snapshots`, or to the defaults of
+        a row created at `period` when it has none.
+        """
+        latest = {}
+        for snapshot in snapshots.order_by('player_id', '-tournament__rating_period'):
+            latest.setdefault(snapshot.player_id, snapshot) # type: ignore
+
+        for row in rows:
+            player_id = getattr(row, 'player_id', row.pk)
+            if player_id in latest:
+                latest[player_id].restore_to(row)
+            else:
+                row.reset_stats(period)
@@ -0,0 +1,101 @@
+import copy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import django
+from django.db import transaction
+
+from apps.players.models import BaseRating, Player
+from apps.tournaments.models import Match, TournamentPlayer
+from .glicko2_service import Glicko2Service
+from .matchup_service import MatchupService
+from .rating_scopes import TournamentScope
+from .replay_service import ReplayService
+from .unit_of_work import RatingUnitOfWork
+
+
+def rate_tournament(glicko_service: Glicko2Service, matches: list[tuple[int | None, int | None, list[int | None], int]]) -> dict[int, tuple]:
+    """Rate the tournament scope of one tournament from its matches, without touching the database.
+
+    Returns:
+        dict[int, tuple]: The `BaseRating.RATING_FIELDS` of each player of the tournament by id.
+    """
+    players = {player_id: Player(id=player_id) for p1, p2, *_ in matches for player_id in (p1, p2) if player_id is not None}
+    rows = {player_id: TournamentPlayer(player_id=player_id) for player_id in players}
+    context = {'tournament': None, 'players': list(players.values()), 'tournament_players': rows}
+
+    with RatingUnitOfWork() as unit_of_work:
+        glicko_service.rate_event(
+            [(players.get(p1), players.get(p2), games) for p1, p2, games, _ in matches], # type: ignore
+            context, rounds=[round_number for *_, round_number in matches],
+        )
+        unit_of_work.discard()
+
+    return {player_id: tuple(getattr(row, field) for field in BaseRating.RATING_FIELDS) for player_id, row in rows.items()}
+
+
+class TournamentScopeService(object):
+    """Recompute the `TournamentPlayer` ratings of many tournaments at once.
+
+    The rows of a tournament start from the defaults and only depend on its own
+    matches, so every tournament is rated in a worker process of its own and the
+    results are written back with one bulk operation.
+    """
+
+    def __init__(self, glicko_service: Glicko2Service | None = None, max_workers: int | None = None):
+        """
+        Args:
+            glicko_service (Glicko2Service | None): The engine, rating only the tournament scope.
+            max_workers (int | None): The size of the process pool, one per CPU when None.
+                With 1 the tournaments are rated in this process.
+        """
+        self.glicko_service = copy.copy(glicko_service or Glicko2Service())
+        self.glicko_service.scopes = [TournamentScope()]
+        self.max_workers = max_workers
+
+    def recompute(self, tournament_ids=None) -> dict[str, int]:
+        """Rate again the tournament scope of the given tournaments, or of every one when None.
+
+        Returns:
+            dict[str, int]: The number of tournaments and rows recomputed.
+        """
+        matches = Match.objects.all() if tournament_ids is None else Match.objects.filter(round__tournament_id__in=tournament_ids)
+        events = list(ReplayService().iter_events(matches))
+        results = dict(zip([tournament_id for tournament_id, _ in events], self.rate_all([event for _, event in events])))
+
+        with transaction.atomic():
+            self.write(results)
+
+        return {'tournaments': len(results), 'rows': sum(len(ratings) for ratings in results.values())}
+
+    def rate_all(self, events: list[list]) -> list[dict[int, tuple]]:
+        """Rate the matches of each event with `rate_tournament`, in the process pool."""
+        if self.max_workers == 1 or len(events) < 2:
+            return list(map(rate_tournament, repeat(self.glicko_service), events))
+
+        # Spawned workers do not inherit the database connection of this process.
+        with ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup) as executor:
+            return list(executor.map(rate_tournament, repeat(self.glicko_service), events))
+
+    def write(self, results: dict[int, dict[int, tuple]]) -> None:
+        """Write the rated rows of each tournament, creating the missing ones."""
+        rows = {
+            (tp.tournament_id, tp.player_id): tp # type: ignore
+            for tp in TournamentPlayer.objects.filter(tournament_id__in=results.keys())
+        }
+        existing, missing = [], []
+        for tournament_id, ratings in results.items():
+            for player_id, values in ratings.items():
+                row = rows.get((tournament_id, player_id))
+                if row is None:
+                    row = TournamentPlayer(tournament_id=tournament_id, player_id=player_id)
+                    missing.append(row)
+                else:
+                    existing.append(row)
+                for field, value in zip(BaseRating.RATING_FIELDS, values):
+                    setattr(row, field, value)
+
+        TournamentPlayer.objects.bulk_update(existing, BaseRating.RATING_FIELDS, batch_size=RatingUnitOfWork.BATCH_SIZE)
+        TournamentPlayer.objects.bulk_create(missing, batch_size=RatingUnitOfWork.BATCH_SIZE)
+        MatchupService.invalidate()
@@ -0,0 +1,87 @@
+from contextvars import ContextVar
+
+from django.db import models
+
+from .profiler import profile_stage
+
+
+_current: ContextVar['RatingUnitOfWork | None'] = ContextVar('rating_unit_of_work', default=None)
+
+
+class RatingUnitOfWork(object):
+    """Write buffer for rating rows.
+
+    While a unit of work is active, `BaseRating` registers the fields it
+    changes here instead of saving the row. On exit every model is written
+    with one `bulk_update` per set of changed fields, so a row updated by
+    several matches is written once, with only the columns that changed.
+
+    Usage:
+        with RatingUnitOfWork():
+            glicko_service.rate_match(...)
+
+    Rows are tracked per instance: load each row once per unit of work.
+    Unsaved rows are inserted with one `bulk_create` per model instead.
+    """
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self._rows: dict[int, tuple[models.Model, set[str]]] = {}
+        self._token = None
+
+    @staticmethod
+    def current() -> 'RatingUnitOfWork | None':
+        """Return the active unit of work, if any."""
+        return _current.get()
+
+    def __enter__(self) -> 'RatingUnitOfWork':
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        _current.reset(self._token) # type: ignore
+        self._token = None
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def register(self, row: models.Model, *fields: str) -> None:
+        """Mark `fields` of `row` as changed."""
+        entry = self._rows.get(id(row))
+        if entry is None:
+            self._rows[id(row)] = (row, set(fields))
+        else:
+            entry[1].update(fields)
+
+    def pending(self, model: type) -> list[models.Model]:
+        """Return the registered rows of `model`, in registration order."""
+        return [row for row, _ in self._rows.values() if isinstance(row, model)]
+
+    def discard(self) -> None:
+        """Forget every registered row without writing it."""
+        self._rows.clear()
+
+    def flush(self) -> int:
+        """Write every registered row and forget them. Returns the number of rows written."""
+        from .matchup_service import MatchupService
+        groups: dict[tuple[type, frozenset[str]], list[models.Model]] = {}
+        new_rows: dict[type, list[models.Model]] = {}
+        for row, fields in self._rows.values():
+            if row.pk is None:
+                new_rows.setdefault(type(row), []).append(row)
+            else:
+                groups.setdefault((type(row), frozenset(fields)), []).append(row)
+
+        written = 0
+        with profile_stage('flush'):
+            for model, rows in new_rows.items():
+                written += len(model.objects.bulk_create(rows, batch_size=self.BATCH_SIZE)) # type: ignore
+            for (model, fields), rows in groups.items():
+                written += model.objects.bulk_update(rows, sorted(fields), batch_size=self.BATCH_SIZE) # type: ignore
+
+        self._rows.clear()
+        if written:
+            MatchupService.invalidate()
+        return written